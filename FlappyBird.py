@@ -1,9 +1,18 @@
+import argparse
+import os
 import pygame
 import random
 import sys
-import requests
+import time
+from collections import deque, namedtuple
 from io import BytesIO
 
+import asset_cache
+import replay
+
+# Startup is timed from here to the first frame
+startup_start = time.perf_counter()
+
 # --- Initialization ---
 # Initialize all the imported Pygame modules
 pygame.init()
@@ -31,6 +40,9 @@ white = (255, 255, 255)
 gravity = 0.6
 # The bird's current vertical velocity
 bird_movement = 0
+# The bird's velocity right after a jump, and its fastest fall
+jump_strength = -10
+terminal_velocity = 8
 # Flag to track if the game is over
 game_over = False
 # Flag to track if the game has started
@@ -42,47 +54,135 @@ last_pipe = pygame.time.get_ticks() - pipe_frequency
 # Player's score
 score = 0
 high_score = 0
-# Flag to track if the score has been awarded for passing a pipe
-pass_pipe = False
+# Test collisions against the pipes' and bird's pixels rather than their
+# rectangles (--pixel-collisions)
+pixel_collisions = False
 # Ground scrolling position and speed
 ground_scroll = 0
 scroll_speed = 4
 
+# --- Input ---
+# Everything a frame reads from the mouse, keyboard and clock, sampled once
+# at the start of the frame so a recording can supply it instead (see replay.py)
+Controls = namedtuple("Controls", "jump mouse_down mouse_pos start ticks")
+controls = Controls(False, False, (0, 0), False, 0)
+# How a frame's Controls are stored in a recording: flag bits (1 jump,
+# 2 mouse button, 4 start), mouse x, mouse y, ticks
+record_format = "<BhhI"
+profile_sections = ("update", "collision", "draw", "flip")
+
+
+# --- Assets ---
+sprites_url = 'https://raw.githubusercontent.com/samuelcust/flappy-bird-assets/master/sprites/'
+background_url = sprites_url + 'background-day.png'
+ground_url = sprites_url + 'base.png'
+button_url = 'https://i.ibb.co/X4s2sW9/restart.png'
+message_url = sprites_url + 'message.png'
+gameover_url = sprites_url + 'gameover.png'
+bird_image_urls = [
+    sprites_url + 'bluebird-downflap.png',
+    sprites_url + 'bluebird-midflap.png',
+    sprites_url + 'bluebird-upflap.png'
+]
+pipe_url = sprites_url + 'pipe-green.png'
+
+# Images come from the bundled asset directory or the local cache when they
+# can, and are only downloaded when neither has them (see asset_cache.py).
+# Offline mode (--offline or FLAPPY_OFFLINE=1) never touches the network.
+offline = "--offline" in sys.argv or os.environ.get("FLAPPY_OFFLINE") == "1"
+assets = asset_cache.AssetCache(offline=offline)
+
+# Fetch every image at once up front rather than one after another
+assets.prefetch([background_url, ground_url, button_url, message_url, gameover_url,
+                 pipe_url] + bird_image_urls)
+
 
 # --- Helper function to load images from URLs ---
 def load_image_from_url(url):
     """
     Loads an image from a URL and returns it as a Pygame surface.
-    Includes error handling for network issues or invalid URLs.
+    Includes error handling for missing or invalid images.
+    """
+    image_data = assets.get(url)
+    if image_data is not None:
+        try:
+            return pygame.image.load(BytesIO(image_data)).convert_alpha()
+        except pygame.error as e:
+            print(f"Error loading image from {url}: {e}")
+    else:
+        print(f"Error loading image from {url}: not available" + (" offline" if offline else ""))
+    # Return a placeholder surface if image loading fails
+    fallback_surface = pygame.Surface((50, 50))
+    fallback_surface.fill((255, 0, 0)) # Red square as a fallback
+    return fallback_surface
+
+
+# --- Sprite Atlas ---
+class SpriteAtlas:
     """
-    try:
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()  # Raise an exception for bad status codes
-        image_data = BytesIO(response.content)
-        return pygame.image.load(image_data).convert_alpha()
-    except (requests.exceptions.RequestException, pygame.error) as e:
-        print(f"Error loading image from {url}: {e}")
-        # Return a placeholder surface if image loading fails
-        fallback_surface = pygame.Surface((50, 50))
-        fallback_surface.fill((255, 0, 0)) # Red square as a fallback
-        return fallback_surface
+    Loads each image once and keeps every scaled or flipped version of it
+    that has been asked for, so sprites share surfaces instead of each
+    loading and transforming their own.
+    """
+    def __init__(self):
+        self._surfaces = {}
 
+    def get(self, url, size=None, flip_y=False):
+        key = (url, size, flip_y)
+        surface = self._surfaces.get(key)
+        if surface is None:
+            if flip_y:
+                surface = pygame.transform.flip(self.get(url, size), False, True)
+            elif size is not None:
+                surface = pygame.transform.scale(self.get(url), size)
+            else:
+                surface = load_image_from_url(url)
+            self._surfaces[key] = surface
+        return surface
 
-# --- Load Images ---
-# Load the background, ground, and button images using the helper function
-bg_image = load_image_from_url('https://raw.githubusercontent.com/samuelcust/flappy-bird-assets/master/sprites/background-day.png')
-bg_image = pygame.transform.scale(bg_image, (screen_width, screen_height - 64))
+sprites = SpriteAtlas()
 
-ground_image = load_image_from_url('https://raw.githubusercontent.com/samuelcust/flappy-bird-assets/master/sprites/base.png')
-ground_image = pygame.transform.scale(ground_image, (screen_width, 64))
 
-button_img = load_image_from_url('https://i.ibb.co/X4s2sW9/restart.png')
+# --- Load Images ---
+# Load the background, ground, and button images using the sprite atlas
+bg_image = sprites.get(background_url, (screen_width, screen_height - 64))
+ground_image = sprites.get(ground_url, (screen_width, 64))
+button_img = sprites.get(button_url)
+message_img = sprites.get(message_url, (200, 300))
+gameover_img = sprites.get(gameover_url, (200, 50))
+bird_images = [sprites.get(url) for url in bird_image_urls]
+# Position 1 is a top pipe (flipped upside down), -1 a bottom one
+pipe_images = {
+    1: sprites.get(pipe_url, (80, 400), flip_y=True),
+    -1: sprites.get(pipe_url, (80, 400)),
+}
+pipe_masks = {position: pygame.mask.from_surface(image)
+              for position, image in pipe_images.items()}
+
+
+# --- Rotated Bird Frames ---
+# The bird tilts vel * -2 degrees while flying and points straight down once
+# the game is over. Each flap frame is rotated to every whole degree it can
+# reach once, here, instead of on every frame of play.
+def rotate_centered(image, angle):
+    """
+    The rotated image, the offset from the bird's center to draw it at and
+    its mask for pixel collisions.
+    """
+    rotated = pygame.transform.rotate(image, angle)
+    return (rotated, (-(rotated.get_width() // 2), -(rotated.get_height() // 2)),
+            pygame.mask.from_surface(rotated))
 
-message_img = load_image_from_url('https://raw.githubusercontent.com/samuelcust/flappy-bird-assets/master/sprites/message.png')
-message_img = pygame.transform.scale(message_img, (200, 300))
+bird_angles = list(range(terminal_velocity * -2, jump_strength * -2 + 1)) + [-90]
+bird_rotations = {(index, angle): rotate_centered(image, angle)
+                  for index, image in enumerate(bird_images) for angle in bird_angles}
 
-gameover_img = load_image_from_url('https://raw.githubusercontent.com/samuelcust/flappy-bird-assets/master/sprites/gameover.png')
-gameover_img = pygame.transform.scale(gameover_img, (200, 50))
+def rotated_bird(index, angle):
+    key = (index, round(angle))
+    frame = bird_rotations.get(key)
+    if frame is None:
+        frame = bird_rotations[key] = rotate_centered(bird_images[index], key[1])
+    return frame
 
 
 # --- Bird Class ---
@@ -92,21 +192,13 @@ class Bird(pygame.sprite.Sprite):
     """
     def __init__(self, x, y):
         pygame.sprite.Sprite.__init__(self)
-        self.images = []
+        self.images = bird_images
         self.index = 0
         self.counter = 0
-        # List of URLs for bird animation frames
-        bird_image_urls = [
-            'https://raw.githubusercontent.com/samuelcust/flappy-bird-assets/master/sprites/bluebird-downflap.png',
-            'https://raw.githubusercontent.com/samuelcust/flappy-bird-assets/master/sprites/bluebird-midflap.png',
-            'https://raw.githubusercontent.com/samuelcust/flappy-bird-assets/master/sprites/bluebird-upflap.png'
-        ]
-        # Load bird images from the URLs
-        for url in bird_image_urls:
-            self.images.append(load_image_from_url(url))
-
-        self.image = self.images[self.index]
-        self.rect = self.image.get_rect()
+
+        self.image, self.offset, self.mask = rotated_bird(self.index, 0)
+        # The hitbox is the unrotated frame; rotated frames are drawn centered on it
+        self.rect = self.images[self.index].get_rect()
         self.rect.center = [x, y]
         self.vel = 0 # Vertical velocity
         self.clicked = False
@@ -115,18 +207,18 @@ class Bird(pygame.sprite.Sprite):
         # --- Gravity ---
         if game_started and not game_over:
             self.vel += gravity
-            if self.vel > 8: # Terminal velocity
-                self.vel = 8
+            if self.vel > terminal_velocity:
+                self.vel = terminal_velocity
             if self.rect.bottom < screen_height - 64: # Don't fall through ground
                 self.rect.y += int(self.vel)
 
         if not game_over:
             # --- Jump ---
             # Check for mouse click or spacebar press
-            if (pygame.mouse.get_pressed()[0] == 1 or pygame.key.get_pressed()[pygame.K_SPACE]) and not self.clicked:
+            if controls.jump and not self.clicked:
                 self.clicked = True
-                self.vel = -10 # Jump strength
-            if not (pygame.mouse.get_pressed()[0] == 1 or pygame.key.get_pressed()[pygame.K_SPACE]):
+                self.vel = jump_strength
+            if not controls.jump:
                 self.clicked = False
 
             # --- Animation ---
@@ -137,37 +229,130 @@ class Bird(pygame.sprite.Sprite):
                 self.index += 1
                 if self.index >= len(self.images):
                     self.index = 0
-            self.image = self.images[self.index]
 
             # --- Rotation ---
-            self.image = pygame.transform.rotate(self.images[self.index], self.vel * -2)
+            self.image, self.offset, self.mask = rotated_bird(self.index, self.vel * -2)
         else:
             # Point the bird downwards when the game is over
-            self.image = pygame.transform.rotate(self.images[self.index], -90)
+            self.image, self.offset, self.mask = rotated_bird(self.index, -90)
+
+    def image_rect(self):
+        """Where the (rotated) image is drawn, which can be larger than the hitbox."""
+        return self.image.get_rect(topleft=(self.rect.centerx + self.offset[0],
+                                            self.rect.centery + self.offset[1]))
+
+    def draw(self, surface):
+        surface.blit(self.image, (self.rect.centerx + self.offset[0],
+                                  self.rect.centery + self.offset[1]))
 
 
 # --- Pipe Class ---
 class Pipe(pygame.sprite.Sprite):
     """
-    Represents the pipe obstacles.
+    Represents the pipe obstacles. Pipes are reused: get one with
+    spawn_pipe() and it goes back to the pool once it scrolls off screen.
     """
     def __init__(self, x, y, position):
         pygame.sprite.Sprite.__init__(self)
-        self.image = load_image_from_url('https://raw.githubusercontent.com/samuelcust/flappy-bird-assets/master/sprites/pipe-green.png')
-        self.image = pygame.transform.scale(self.image, (80, 400))
-        self.rect = self.image.get_rect()
+        self.place(x, y, position)
+
+    def place(self, x, y, position):
         # Position 1 is top, -1 is bottom
+        self.image = pipe_images[position]
+        self.mask = pipe_masks[position]
+        self.rect = self.image.get_rect()
         if position == 1:
-            self.image = pygame.transform.flip(self.image, False, True)
             self.rect.bottomleft = [x, y - 75]
         if position == -1:
             self.rect.topleft = [x, y + 75]
 
-    def update(self):
-        if game_started:
-            self.rect.x -= scroll_speed
-            if self.rect.right < 0:
-                self.kill()
+# --- Pipe Pool ---
+# Pipes that have scrolled off screen, ready to be placed again
+pipe_pool = []
+
+def spawn_pipe(x, y, position):
+    if pipe_pool:
+        pipe = pipe_pool.pop()
+        pipe.place(x, y, position)
+        return pipe
+    return Pipe(x, y, position)
+
+def release_pipe(pipe):
+    pipe_pool.append(pipe)
+
+
+# --- Pipe World ---
+class PipeWorld:
+    """
+    The live pipes, as (bottom, top) pairs in the order they were spawned.
+    Every pipe spawns at the right edge and scrolls at the same speed, so
+    spawn order is also left-to-right order: the pairs the bird has passed
+    are at the front, and collisions and scoring only ever need to look at
+    the one or two pairs next to the bird, however many are on screen.
+    """
+    def __init__(self):
+        self.pairs = deque()
+        # How many pairs at the front the bird has flown past
+        self.passed = 0
+
+    def __len__(self):
+        return len(self.pairs)
+
+    def pipes(self):
+        for bottom, top in self.pairs:
+            yield bottom
+            yield top
+
+    def spawn(self, x, gap_y):
+        self.pairs.append((spawn_pipe(x, gap_y, -1), spawn_pipe(x, gap_y, 1)))
+
+    def clear(self):
+        for pipe in self.pipes():
+            release_pipe(pipe)
+        self.pairs.clear()
+        self.passed = 0
+
+    def scroll(self, speed):
+        for bottom, top in self.pairs:
+            bottom.rect.x -= speed
+            top.rect.x -= speed
+        # Pairs leave the screen in the order they came in
+        while self.pairs and self.pairs[0][0].rect.right < 0:
+            for pipe in self.pairs.popleft():
+                release_pipe(pipe)
+            self.passed = max(self.passed - 1, 0)
+
+    def draw(self, surface):
+        for bottom, top in self.pairs:
+            surface.blit(bottom.image, bottom.rect)
+            surface.blit(top.image, top.rect)
+
+    def next_pair(self):
+        """The first pair the bird hasn't passed yet, or None."""
+        if self.passed < len(self.pairs):
+            return self.pairs[self.passed]
+        return None
+
+    def hits(self, bird, pixels=False):
+        """
+        Whether the bird touches a pipe: its hitbox against the pipes'
+        rects or, with pixels, its drawn image against theirs.
+        """
+        rect = bird.image_rect() if pixels else bird.rect
+        # The drawn image can reach back over the pair just passed
+        for i in range(max(self.passed - 1, 0), len(self.pairs)):
+            pair = self.pairs[i]
+            if pair[0].rect.right <= rect.left:
+                continue
+            if pair[0].rect.left >= rect.right:
+                break
+            for pipe in pair:
+                if not rect.colliderect(pipe.rect):
+                    continue
+                if not pixels or bird.mask.overlap(
+                        pipe.mask, (pipe.rect.x - rect.x, pipe.rect.y - rect.y)):
+                    return True
+        return False
 
 # --- Button Class ---
 class Button():
@@ -178,8 +363,7 @@ class Button():
 
     def draw(self):
         action = False
-        pos = pygame.mouse.get_pos()
-        if self.rect.collidepoint(pos) and pygame.mouse.get_pressed()[0] == 1:
+        if self.rect.collidepoint(controls.mouse_pos) and controls.mouse_down:
             action = True
         screen.blit(self.image, (self.rect.x, self.rect.y))
         return action
@@ -190,78 +374,77 @@ def draw_text(text, font, text_col, x, y):
     screen.blit(img, (x, y))
 
 def reset_game():
-    pipe_group.empty()
+    world.clear()
     flappy.rect.x = 100
     flappy.rect.y = int(screen_height / 2)
     flappy.vel = 0
     return 0
 
-# --- Sprite Groups ---
-bird_group = pygame.sprite.Group()
-pipe_group = pygame.sprite.Group()
-
+# --- Game Objects ---
+world = PipeWorld()
 flappy = Bird(100, int(screen_height / 2))
-bird_group.add(flappy)
 
 restart_button = Button(screen_width // 2 - 50, screen_height // 2 + 20, button_img)
 
-# --- Main Game Loop ---
-running = True
-while running:
-    clock.tick(fps)
+# --- Game Frame ---
+def run_frame(profiler):
+    """
+    Runs one frame of the game using the current controls.
+    """
+    global game_started, game_over, score, high_score, last_pipe, ground_scroll
 
     # --- Draw Background and Ground ---
     screen.blit(bg_image, (0, 0))
     screen.blit(ground_image, (ground_scroll, screen_height - 64))
+    profiler.lap("draw")
 
-    # --- Event Handling ---
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            running = False
-        if (event.type == pygame.MOUSEBUTTONDOWN or (event.type == pygame.KEYDOWN and event.key == pygame.K_SPACE)) and not game_started and not game_over:
-            game_started = True
+    # --- Start on click or spacebar ---
+    if controls.start and not game_started and not game_over:
+        game_started = True
 
     # --- Update Sprites ---
-    bird_group.draw(screen)
-    bird_group.update()
-    pipe_group.draw(screen)
+    flappy.draw(screen)
+    profiler.lap("draw")
+    flappy.update()
+    profiler.lap("update")
+    world.draw(screen)
+    profiler.lap("draw")
 
     # --- Game Logic ---
     if game_started and not game_over:
         # --- Score ---
-        if len(pipe_group) > 0:
-            if bird_group.sprites()[0].rect.left > pipe_group.sprites()[0].rect.left and \
-               bird_group.sprites()[0].rect.right < pipe_group.sprites()[0].rect.right and not pass_pipe:
-                pass_pipe = True
-            if pass_pipe and bird_group.sprites()[0].rect.left > pipe_group.sprites()[0].rect.right:
-                score += 1
-                pass_pipe = False
+        # A point for each pair the bird gets all the way past
+        pair = world.next_pair()
+        if pair is not None and flappy.rect.left > pair[0].rect.right:
+            score += 1
+            world.passed += 1
         
         # --- Pipe Generation ---
-        time_now = pygame.time.get_ticks()
+        time_now = controls.ticks
         if time_now - last_pipe > pipe_frequency:
             pipe_height = random.randint(-100, 100)
-            btm_pipe = Pipe(screen_width, int(screen_height / 2) + pipe_height, -1)
-            top_pipe = Pipe(screen_width, int(screen_height / 2) + pipe_height, 1)
-            pipe_group.add(btm_pipe, top_pipe)
+            world.spawn(screen_width, int(screen_height / 2) + pipe_height)
             last_pipe = time_now
 
         # --- Ground Scrolling ---
         ground_scroll -= scroll_speed
         if abs(ground_scroll) > 35:
             ground_scroll = 0
-        pipe_group.update()
+        world.scroll(scroll_speed)
+    profiler.lap("update")
 
     # --- Display Score ---
     if game_started and not game_over:
         draw_text(str(score), font, white, int(screen_width / 2), 20)
+    profiler.lap("draw")
     
     # --- Collision Detection ---
-    if pygame.sprite.groupcollide(bird_group, pipe_group, False, False) or flappy.rect.top < 0:
+    if world.hits(flappy, pixel_collisions) or flappy.rect.top < 0:
         game_over = True
     if flappy.rect.bottom >= screen_height - 64:
         game_over = True
         game_started = False
+    profiler.lap("collision")
 
     # --- Game State Management ---
     if not game_started and not game_over:
@@ -276,8 +459,93 @@ while running:
         if restart_button.draw():
             game_over = False
             score = reset_game()
+    profiler.lap("draw")
 
     pygame.display.update()
+    profiler.lap("flip")
+
+def read_controls(start):
+    """Samples the live mouse, keyboard and clock for this frame."""
+    mouse_down = pygame.mouse.get_pressed()[0] == 1
+    jump = mouse_down or bool(pygame.key.get_pressed()[pygame.K_SPACE])
+    return Controls(jump, mouse_down, pygame.mouse.get_pos(), start, pygame.time.get_ticks())
 
-pygame.quit()
-sys.exit()
+def replay_session(log):
+    """
+    Plays a recorded session back as fast as possible and returns a
+    FrameProfiler with every frame's timings.
+    """
+    global controls, last_pipe, pixel_collisions
+    random.seed(log.seed)
+    last_pipe = log.metadata["start_ticks"] - pipe_frequency
+    pixel_collisions = log.metadata.get("pixel_collisions", False)
+    profiler = replay.FrameProfiler(profile_sections)
+    for flags, mouse_x, mouse_y, ticks in log.frames():
+        controls = Controls(bool(flags & 1), bool(flags & 2), (mouse_x, mouse_y),
+                            bool(flags & 4), ticks)
+        profiler.start_frame()
+        run_frame(profiler)
+        profiler.end_frame()
+    return profiler
+
+# --- Main Game Loop ---
+def main():
+    global controls, last_pipe, pixel_collisions
+    parser = argparse.ArgumentParser(description="Flappy Bird")
+    parser.add_argument("--record", metavar="FILE",
+                        help="record this session for replay.py")
+    parser.add_argument("--seed", type=int, help="seed for the pipe heights")
+    parser.add_argument("--profile", action="store_true",
+                        help="print a per-frame timing breakdown on exit")
+    parser.add_argument("--offline", action="store_true",
+                        help="use only bundled and cached images, never the network")
+    parser.add_argument("--pixel-collisions", action="store_true",
+                        help="collide the bird's and pipes' pixels instead of their rectangles")
+    args = parser.parse_args()
+    pixel_collisions = args.pixel_collisions
+
+    print(f"Started in {time.perf_counter() - startup_start:.2f}s "
+          f"(assets: {assets.summary()})")
+
+    seed = args.seed if args.seed is not None else replay.new_seed()
+    random.seed(seed)
+    start_ticks = pygame.time.get_ticks()
+    last_pipe = start_ticks - pipe_frequency
+    recorder = None
+    if args.record:
+        recorder = replay.Recorder(args.record, "flappy", seed, record_format,
+                                   start_ticks=start_ticks, pixel_collisions=pixel_collisions)
+    profiler = replay.FrameProfiler(profile_sections) if args.profile else replay.NullProfiler()
+
+    running = True
+    while running:
+        clock.tick(fps)
+
+        # --- Event Handling ---
+        start = False
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
+            if event.type == pygame.MOUSEBUTTONDOWN or (event.type == pygame.KEYDOWN and event.key == pygame.K_SPACE):
+                start = True
+
+        controls = read_controls(start)
+        if recorder is not None:
+            flags = controls.jump | controls.mouse_down << 1 | controls.start << 2
+            recorder.record(flags, *controls.mouse_pos, controls.ticks)
+
+        profiler.start_frame()
+        run_frame(profiler)
+        profiler.end_frame()
+
+    if recorder is not None:
+        recorder.close()
+        print(f"Recorded {recorder.frames:,} frames to {args.record}")
+    if args.profile:
+        profiler.report()
+
+    pygame.quit()
+    sys.exit()
+
+if __name__ == "__main__":
+    main()
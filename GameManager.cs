@@ -14,8 +14,11 @@ would handle both the license key validation and the mod loading.
 */
 
 using System;
+using System.Buffers.Binary;
 using System.IO;
 using System.Net.Http;
+using System.Text;
+using System.Text.RegularExpressions;
 using System.Threading.Tasks;
 using System.Collections.Generic;
 // This would typically be a JSON library like Newtonsoft.Json or Unity's JsonUtility
@@ -27,7 +30,12 @@ public class GameManager
     // --- License System Variables ---
     private static readonly HttpClient httpClient = new HttpClient();
     private const string API_URL = "http://127.0.0.1:5000/validate_key"; // Our local Python server
+    private const string VERIFY_URL = "http://127.0.0.1:5000/verify_token";
+    private const string REFRESH_URL = "http://127.0.0.1:5000/refresh_tokens";
+    // The key on the first line, the server's signed token for it on the second
     private const string LICENSE_FILE = "license.dat";
+    // Swap the token for a fresh one once it is this close to expiring
+    private static readonly TimeSpan REFRESH_BEFORE = TimeSpan.FromDays(1);
     public bool IsLicensed { get; private set; } = false;
 
     // --- Modding System Variables ---
@@ -69,7 +77,14 @@ public class GameManager
     {
         if (File.Exists(LICENSE_FILE))
         {
-            string key = File.ReadAllText(LICENSE_FILE);
+            // Older license files hold just the key
+            string[] lines = File.ReadAllLines(LICENSE_FILE);
+            string key = lines.Length > 0 ? lines[0].Trim() : "";
+            string token = lines.Length > 1 ? lines[1].Trim() : "";
+            if (token != "" && await CheckToken(key, token))
+            {
+                return;
+            }
             await ValidateKey(key);
         }
     }
@@ -79,11 +94,10 @@ public class GameManager
         try
         {
             var response = await httpClient.GetStringAsync($"{API_URL}?key={key}");
-            // In a real scenario, you'd parse a JSON response.
-            if (response.Contains("\"status\": \"valid\""))
+            if (ReadJsonString(response, "status") == "valid")
             {
                 IsLicensed = true;
-                File.WriteAllText(LICENSE_FILE, key); // Save the valid key
+                SaveLicense(key, ReadJsonString(response, "token")); // Save the valid key
             }
             else
             {
@@ -97,6 +111,90 @@ public class GameManager
         }
     }
 
+    // Checks the saved token instead of the key. The server only checks its
+    // signature, so this never costs it a database lookup. Returns false when
+    // the key has to go through ValidateKey again.
+    private async Task<bool> CheckToken(string key, string token)
+    {
+        HttpResponseMessage response;
+        try
+        {
+            response = await httpClient.GetAsync($"{VERIFY_URL}?token={Uri.EscapeDataString(token)}");
+        }
+        catch (HttpRequestException ex)
+        {
+            // Only the server can check the token's signature, so its expiry
+            // means nothing offline; fall back to ValidateKey, which fails too
+            Console.WriteLine($"Could not reach the license server: {ex.Message}");
+            return false;
+        }
+
+        string status = ReadJsonString(await response.Content.ReadAsStringAsync(), "status");
+        if (status == "valid")
+        {
+            IsLicensed = true;
+            if (TokenExpiry(token) - DateTimeOffset.UtcNow < REFRESH_BEFORE)
+            {
+                await RefreshToken(key, token);
+            }
+            return true;
+        }
+        // An expired token can still be refreshed for a while after it expires
+        return status == "expired" && await RefreshToken(key, token);
+    }
+
+    private async Task<bool> RefreshToken(string key, string token)
+    {
+        try
+        {
+            var body = new StringContent($"{{\"tokens\": [\"{token}\"]}}", Encoding.UTF8, "application/json");
+            var response = await httpClient.PostAsync(REFRESH_URL, body);
+            string json = await response.Content.ReadAsStringAsync();
+            if (ReadJsonString(json, "status") != "valid")
+            {
+                return false;
+            }
+            IsLicensed = true;
+            SaveLicense(key, ReadJsonString(json, "token"));
+            return true;
+        }
+        catch (HttpRequestException ex)
+        {
+            Console.WriteLine($"Error refreshing license token: {ex.Message}");
+            return false;
+        }
+    }
+
+    private void SaveLicense(string key, string token)
+    {
+        File.WriteAllText(LICENSE_FILE, token == null ? key : $"{key}\n{token}");
+    }
+
+    // Tokens are base64url(payload) "." base64url(signature); the payload has
+    // the expiry as a little-endian uint32 of Unix seconds at byte 2
+    private static DateTimeOffset TokenExpiry(string token)
+    {
+        try
+        {
+            string payload = token.Split('.')[0].Replace('-', '+').Replace('_', '/');
+            payload = payload.PadRight(payload.Length + (4 - payload.Length % 4) % 4, '=');
+            byte[] bytes = Convert.FromBase64String(payload);
+            return DateTimeOffset.FromUnixTimeSeconds(BinaryPrimitives.ReadUInt32LittleEndian(bytes.AsSpan(2, 4)));
+        }
+        catch (Exception)
+        {
+            return DateTimeOffset.MinValue;
+        }
+    }
+
+    // Pulls one string field out of a JSON response. A stand-in for a real
+    // JSON library, like SimpleJson below.
+    private static string ReadJsonString(string json, string name)
+    {
+        var match = Regex.Match(json, $"\"{name}\"\\s*:\\s*\"([^\"]*)\"");
+        return match.Success ? match.Groups[1].Value : null;
+    }
+
     // --- Modding System Methods ---
     private void InitializeGameData()
     {
@@ -1,11 +1,39 @@
+import argparse
+import bz2
+import lzma
 import os
+import queue
+import shutil
+import string
+import tarfile
+import threading
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, repeat
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
 
 # --- Configuration ---
-# WARNING: A high length_factor (e.g., > 10000) will create VERY large files 
+# WARNING: A high length_factor (e.g., > 10000) will create VERY large files
 # and may take a long time to run. Start with a small number like 100.
-LENGTH_FACTOR = 5000 
+LENGTH_FACTOR = 5000
 OUTPUT_DIRECTORY = "longest_code_generated"
 
+# --- Output Settings ---
+# Lines are gathered in memory and handed to the file in chunks of about this
+# many bytes, so the cost is one write call per chunk instead of one per line.
+CHUNK_SIZE = 4 * 1024 * 1024
+# How many loop iterations are turned into text in one go
+LINES_PER_BATCH = 1000
+# "join" concatenates each chunk into one buffer and writes it with a single
+# system call. "writelines" hands the pieces to a buffered file instead, which
+# copies small pieces into its buffer and passes large ones straight through.
+WRITE_STRATEGY = "join"
+
 # --- Helper Function ---
 def create_output_directory():
     """Create the directory to store the generated code files."""
@@ -13,127 +41,720 @@ def create_output_directory():
         os.makedirs(OUTPUT_DIRECTORY)
         print(f"Created directory: {OUTPUT_DIRECTORY}")
 
+# --- Buffered Output ---
+class ChunkedWriter:
+    """
+    Writes a generated file in large chunks. Pieces passed to write() or
+    writelines() are kept in a list and only reach the file once CHUNK_SIZE
+    bytes have built up. write() takes str or bytes; writelines() takes
+    bytes-like pieces, including the memoryview slices loop indents are cut
+    from (see indent_slices), which are only copied when the chunk is joined.
+
+    Pass fileobj to write into an already open stream (such as a
+    CompressingFile) instead of opening filename; it is left open on close().
+    """
+    def __init__(self, filename, chunk_size=CHUNK_SIZE, strategy=None, fileobj=None):
+        self.filename = filename
+        self.chunk_size = chunk_size
+        self.strategy = strategy or WRITE_STRATEGY
+        self.bytes_written = 0
+        self._pending = []
+        self._pending_size = 0
+        self._owns_file = fileobj is None
+        if fileobj is not None:
+            self._file = fileobj
+        elif self.strategy == "writelines":
+            self._file = open(filename, 'wb', buffering=chunk_size)
+        else:
+            self._file = open(filename, 'wb', buffering=0)
+        self._start = time.perf_counter()
+        self.elapsed = 0.0
+
+    def write(self, data):
+        if isinstance(data, str):
+            data = data.encode()
+        self._pending.append(data)
+        self._pending_size += len(data)
+        if self._pending_size >= self.chunk_size:
+            self.flush()
+
+    def writelines(self, pieces):
+        """Adds a list of bytes/memoryview pieces in one call."""
+        self._pending.extend(pieces)
+        self._pending_size += sum(map(len, pieces))
+        if self._pending_size >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        if not self._pending:
+            return
+        if self.strategy == "writelines":
+            self._file.writelines(self._pending)
+        else:
+            data = b"".join(self._pending)
+            view = memoryview(data)
+            while view:
+                view = view[self._file.write(view):]
+        self.bytes_written += self._pending_size
+        self._pending = []
+        self._pending_size = 0
+
+    def close(self):
+        self.flush()
+        if self._owns_file:
+            self._file.close()
+        self.elapsed = time.perf_counter() - self._start
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def report(self):
+        megabytes = self.bytes_written / 1e6
+        rate = megabytes / self.elapsed if self.elapsed else float('inf')
+        print(f"Generated {self.filename} ({megabytes:,.1f} MB in {self.elapsed:.2f}s, {rate:,.1f} MB/s)")
+
+def batches(start, stop, size=LINES_PER_BATCH):
+    """Splits range(start, stop) into consecutive (start, stop) pairs."""
+    for batch_start in range(start, stop, size):
+        yield batch_start, min(batch_start + size, stop)
+
+# --- Generator Engine ---
+# A target is declared as a header, one or more loops and a footer, all
+# str.format templates. Headers and footers see {n} (LENGTH_FACTOR) plus any
+# `values` the target computes from n. A loop's template is written once per
+# iteration i and sees {i}, {n} and any `fields` the loop adds. Loops are
+# rendered a batch of iterations at a time, so a field is a function of
+# (start, stop, n) giving its values for iterations start..stop-1, usually a
+# range. `indents` are fields whose values are numbers of spaces; rather than
+# building a new string of spaces for every line, they are written as slices
+# of one shared run of spaces, since nested code can be mostly indentation.
+#
+# A batch of a template without indents is one %-format string, repeated for
+# the batch and filled in by a single % operation; lines with indents are
+# rendered by map() and interleaved with the indent slices. With range fields
+# no Python code runs per line.
+#
+# The loops' iterations, one after another, are the target's numbered "steps";
+# body(f, start, stop) writes exactly steps start..stop-1, which is what lets
+# shards of one file be written by different processes.
+
+# The run of spaces indents are sliced from, grown to the widest one so far
+_spaces = memoryview(b"")
+
+def indent_slices(widths):
+    global _spaces
+    widths = list(widths)
+    if widths and max(widths) > len(_spaces):
+        _spaces = memoryview(b" " * max(widths))
+    return map(_spaces.__getitem__, map(slice, widths))
+
+CONVERSIONS = {"s": str, "r": repr, "a": ascii}
+
+class Template:
+    """
+    A loop template compiled for rendering many iterations at once. It is
+    kept as parts: runs of text (a %-format string and the fields it takes)
+    separated by indent fields.
+    """
+    def __init__(self, text, fields, indents=None):
+        self.fields = fields
+        self.indents = dict(indents or {})
+        self.parts = []
+        pieces, args = [], []
+        for literal, name, spec, conversion in string.Formatter().parse(text):
+            pieces.append(literal.replace("%", "%%"))
+            if name is None:
+                continue
+            if name in self.indents:
+                self._add_text(pieces, args)
+                pieces, args = [], []
+                self.parts.append(("indent", name))
+                continue
+            if name not in fields:
+                raise ValueError(f"unknown field {{{name}}} in template {text!r}")
+            pieces.append("%s")
+            args.append((name, spec, conversion))
+        self._add_text(pieces, args)
+
+    def _add_text(self, pieces, args):
+        text = "".join(pieces)
+        if text:
+            self.parts.append(("text", text, args))
+
+    def _column(self, arg, n, start, stop):
+        name, spec, conversion = arg
+        values = self.fields[name](start, stop, n)
+        if conversion:
+            values = map(CONVERSIONS[conversion], values)
+        if spec:
+            values = map(format, values, repeat(spec))
+        return list(values)
+
+    def render(self, n, start, stop):
+        """The iterations start..stop-1, as a list of bytes-like pieces."""
+        count = stop - start
+        columns = {}
+        def column(arg):
+            if arg not in columns:
+                columns[arg] = self._column(arg, n, start, stop)
+            return columns[arg]
+
+        if len(self.parts) == 1 and self.parts[0][0] == "text":
+            # No indents: the whole batch is one % operation
+            _, text, args = self.parts[0]
+            if len(args) == 1:
+                values = column(args[0])
+            else:
+                values = chain.from_iterable(zip(*map(column, args)))
+            return [((text * count) % tuple(values)).encode()]
+
+        # Otherwise each part is rendered per line and the lines interleaved
+        lines = []
+        for part in self.parts:
+            if part[0] == "indent":
+                lines.append(indent_slices(self.indents[part[1]](start, stop, n)))
+            elif part[2]:
+                lines.append(map(str.encode, map(part[1].__mod__,
+                                                 zip(*map(column, part[2])))))
+            else:
+                lines.append(repeat((part[1] % ()).encode(), count))
+        return list(chain.from_iterable(zip(*lines)))
+
+class Loop:
+    """
+    One repeated block of a target, run count(n) times. If `every` is set,
+    `checkpoint` is written after each iteration i where i + 1 is a multiple
+    of it (a progress message, say).
+    """
+    def __init__(self, template, count=lambda n: n, fields=None, indents=None, every=None,
+                 checkpoint=""):
+        fields = dict(fields or {})
+        fields.setdefault("i", lambda start, stop, n: range(start, stop))
+        fields.setdefault("n", lambda start, stop, n: repeat(n, stop - start))
+        self.count = count
+        self.template = Template(template, fields, indents)
+        self.every = every
+        self.checkpoint = Template(checkpoint, fields, indents)
+
+    def write(self, f, n, start, stop):
+        batch_start = start
+        batch_size = LINES_PER_BATCH
+        while batch_start < stop:
+            batch_stop = min(stop, batch_start + batch_size)
+            if self.every:
+                batch_stop = min(batch_stop, (batch_start // self.every + 1) * self.every)
+            pieces = self.template.render(n, batch_start, batch_stop)
+            f.writelines(pieces)
+            # Lines can be tens of kilobytes long, so the next batch is sized
+            # from this one to stay around one output chunk
+            size = sum(map(len, pieces))
+            batch_size = max(1, min(LINES_PER_BATCH,
+                                    CHUNK_SIZE * (batch_stop - batch_start) // max(size, 1)))
+            if self.every and batch_stop % self.every == 0:
+                f.writelines(self.checkpoint.render(n, batch_stop - 1, batch_stop))
+            batch_start = batch_stop
+
+class Target:
+    def __init__(self, filename, header="", loops=(), footer="", values=None):
+        self.filename = filename
+        self.header_template = header
+        self.loops = list(loops)
+        self.footer_template = footer
+        self.values = dict(values or {})
+
+    def path(self):
+        return os.path.join(OUTPUT_DIRECTORY, self.filename)
+
+    def _fill(self, template):
+        n = LENGTH_FACTOR
+        return template.format(n=n, **{name: value(n) for name, value in self.values.items()})
+
+    def header(self, f):
+        f.write(self._fill(self.header_template))
+
+    def footer(self, f):
+        f.write(self._fill(self.footer_template))
+
+    def steps(self):
+        return sum(loop.count(LENGTH_FACTOR) for loop in self.loops)
+
+    def _locate(self, step):
+        for loop in self.loops:
+            count = loop.count(LENGTH_FACTOR)
+            if step < count:
+                return loop, step
+            step -= count
+        raise IndexError(step)
+
+    def step_bytes(self, step):
+        """How many bytes a step writes, for balancing shards."""
+        loop, i = self._locate(step)
+        return sum(map(len, loop.template.render(LENGTH_FACTOR, i, i + 1)))
+
+    def body(self, f, start, stop):
+        n = LENGTH_FACTOR
+        offset = 0
+        for loop in self.loops:
+            count = loop.count(n)
+            lo, hi = max(start - offset, 0), min(stop - offset, count)
+            if lo < hi:
+                loop.write(f, n, lo, hi)
+            offset += count
+
+TARGETS = {}
+
+def register_target(name, target):
+    """Adds a target to the ones --targets can choose from."""
+    TARGETS[name] = target
+    return target
+
 # --- Generator for Java ---
+register_target("java", Target(
+    "TheLongestJavaClass.java",
+    header=(
+        "public class TheLongestJavaClass {{\n"
+        "    public static void main(String[] args) {{\n"
+        "        long startTime = System.nanoTime();\n"
+        "        int x = 0;\n"
+    ),
+    loops=[
+        # Create deeply nested if statements
+        Loop("{indent}if (x == {i}) {{\n"
+             "{indent}    // Level {level}\n",
+             fields={"level": lambda start, stop, n: range(start + 1, stop + 1)},
+             indents={"indent": lambda start, stop, n: range(8 + start * 4, 8 + stop * 4, 4)}),
+        # Close all the braces
+        Loop("{indent}}}\n",
+             indents={"indent": lambda start, stop, n: range(8 + (n - 1 - start) * 4,
+                                                             8 + (n - 1 - stop) * 4, -4)}),
+    ],
+    footer=(
+        "        long endTime = System.nanoTime();\n"
+        "        long duration = (endTime - startTime) / 1000000; // milliseconds\n"
+        "        System.out.println(\"Navigated {n} nested ifs.\");\n"
+        "        System.out.println(\"Execution time: \" + duration + \" ms.\");\n"
+        "    }}\n"
+        "}}\n"
+    ),
+))
+
 def generate_java_code():
     """
     Generates a Java file with deeply nested if-else statements.
     This creates structural length and complexity. The JVM has limits on method size,
     so this will eventually fail to compile, which is part of the concept.
     """
-    filename = os.path.join(OUTPUT_DIRECTORY, "TheLongestJavaClass.java")
     print("Generating absurdly long Java code...")
-    with open(filename, 'w') as f:
-        f.write("public class TheLongestJavaClass {\n")
-        f.write("    public static void main(String[] args) {\n")
-        f.write("        long startTime = System.nanoTime();\n")
-        f.write("        int x = 0;\n")
-
-        # Create deeply nested if statements
-        for i in range(LENGTH_FACTOR):
-            indent = ' ' * (8 + i * 4)
-            f.write(f"{indent}if (x == {i}) {{\n")
-            f.write(f"{indent}    // Level {i + 1}\n")
-
-        # Close all the braces
-        for i in range(LENGTH_FACTOR):
-            indent = ' ' * (8 + (LENGTH_FACTOR - 1 - i) * 4)
-            f.write(f"{indent}}}\n")
-
-        f.write("        long endTime = System.nanoTime();\n")
-        f.write("        long duration = (endTime - startTime) / 1000000; // milliseconds\n")
-        f.write(f"        System.out.println(\"Navigated {LENGTH_FACTOR} nested ifs.\");\n")
-        f.write("        System.out.println(\"Execution time: \" + duration + \" ms.\");\n")
-        f.write("    }\n")
-        f.write("}\n")
-    print(f"Generated {filename}")
+    write_shard("java", LENGTH_FACTOR, TARGETS["java"].path(),
+                0, TARGETS["java"].steps(), True, True, report=True)
 
 # --- Generator for JavaScript ---
+register_target("javascript", Target(
+    "longest_array.js",
+    header=(
+        "// A structurally very long JavaScript file.\n"
+        "console.log('Starting to build the colossal array...');\n\n"
+        "let deepestArray = ['The Core'];\n"
+    ),
+    loops=[
+        # Nest the array inside itself thousands of times
+        Loop("deepestArray = [deepestArray, 'Layer {layer}'];\n",
+             fields={"layer": lambda start, stop, n: range(start + 1, stop + 1)},
+             every=1000,
+             checkpoint="console.log('Constructed layer {layer}...');\n"),
+    ],
+    footer=(
+        "\nconsole.log('Colossal array construction complete.');\n"
+        "console.log(`Total depth: {{LENGTH_FACTOR}}`);\n"
+        "console.log('To access the core, you would need ' + {n} + ' sets of [0]');\n"
+        "// Example: console.log(deepestArray{accessor}[0]);\n"
+        "console.log('Successfully created the longest JavaScript array literal program.');\n"
+    ),
+    # Create the accessor string dynamically
+    values={"accessor": lambda n: "[0]" * n},
+))
+
 def generate_javascript_code():
     """
     Generates a JavaScript file with a massively long, deeply nested array.
     Accessing an element deep inside this structure would be a challenge.
     """
-    filename = os.path.join(OUTPUT_DIRECTORY, "longest_array.js")
     print("Generating absurdly long JavaScript code...")
-    with open(filename, 'w') as f:
-        f.write("// A structurally very long JavaScript file.\n")
-        f.write("console.log('Starting to build the colossal array...');\n\n")
-        
-        f.write("let deepestArray = ['The Core'];\n")
-        
-        # Nest the array inside itself thousands of times
-        for i in range(LENGTH_FACTOR):
-            f.write(f"deepestArray = [deepestArray, 'Layer {i+1}'];\n")
-            if (i+1) % 1000 == 0:
-                f.write(f"console.log('Constructed layer {i+1}...');\n")
-
-        f.write("\nconsole.log('Colossal array construction complete.');\n")
-        f.write("console.log(`Total depth: {LENGTH_FACTOR}`);\n")
-        f.write("console.log('To access the core, you would need ' + " + str(LENGTH_FACTOR) + " + ' sets of [0]');\n")
-        
-        # Create the accessor string dynamically
-        accessor = ''.join(['[0]' for _ in range(LENGTH_FACTOR)])
-        f.write(f"// Example: console.log(deepestArray{accessor}[0]);\n")
-        f.write("console.log('Successfully created the longest JavaScript array literal program.');\n")
-    print(f"Generated {filename}")
+    write_shard("javascript", LENGTH_FACTOR, TARGETS["javascript"].path(),
+                0, TARGETS["javascript"].steps(), True, True, report=True)
 
 # --- Generator for C++ ---
+# The C++ file doesn't grow with LENGTH_FACTOR, so it is all header
+register_target("cpp", Target(
+    "longest_compile.cpp",
+    header=(
+        "#include <iostream>\n"
+        "#include <chrono>\n\n"
+        "// This code is long in terms of compile-time work and type name length.\n"
+        "// It computes a value using recursive templates.\n\n"
+
+        "template<int N>\n"
+        "struct LongestTypeName {{\n"
+        "    static const long long value = 1 + LongestTypeName<N - 1>::value;\n"
+        "}};\n\n"
+
+        "template<>\n"
+        "struct LongestTypeName<0> {{\n"
+        "    static const long long value = 1;\n"
+        "}};\n\n"
+
+        "int main() {{\n"
+        "    auto start = std::chrono::high_resolution_clock::now();\n\n"
+        "    // The type of 'result' is extremely long, e.g., LongestTypeName<...<LongestTypeName<0>>...>\n"
+        "    long long result = LongestTypeName<{n}>::value;\n\n"
+
+        "    auto stop = std::chrono::high_resolution_clock::now();\n"
+        "    auto duration = std::chrono::duration_cast<std::chrono::milliseconds>(stop - start);\n\n"
+
+        "    std::cout << \"This program forced the C++ compiler to instantiate {{LENGTH_FACTOR}} templates.\" << std::endl;\n"
+        "    std::cout << \"Calculated Value: \" << result << std::endl;\n"
+        "    std::cout << \"Runtime Execution took: \" << duration.count() << \" ms (most work was at compile time).\" << std::endl;\n"
+
+        "    return 0;\n"
+        "}}\n"
+    ),
+))
+
 def generate_cpp_code():
     """
     Generates C++ code that uses template metaprogramming to calculate a value
     at compile time. This creates an absurdly long type name and forces the compiler
     to work extremely hard, making the "code" long in terms of compile-time processing.
     """
-    filename = os.path.join(OUTPUT_DIRECTORY, "longest_compile.cpp")
     print("Generating absurdly long C++ code...")
-    with open(filename, 'w') as f:
-        f.write("#include <iostream>\n")
-        f.write("#include <chrono>\n\n")
-        f.write("// This code is long in terms of compile-time work and type name length.\n")
-        f.write("// It computes a value using recursive templates.\n\n")
-
-        f.write("template<int N>\n")
-        f.write("struct LongestTypeName {\n")
-        f.write("    static const long long value = 1 + LongestTypeName<N - 1>::value;\n")
-        f.write("};\n\n")
-
-        f.write("template<>\n")
-        f.write("struct LongestTypeName<0> {\n")
-        f.write("    static const long long value = 1;\n")
-        f.write("};\n\n")
-
-        f.write("int main() {\n")
-        f.write("    auto start = std::chrono::high_resolution_clock::now();\n\n")
-        f.write("    // The type of 'result' is extremely long, e.g., LongestTypeName<...<LongestTypeName<0>>...>\n")
-        f.write(f"    long long result = LongestTypeName<{LENGTH_FACTOR}>::value;\n\n")
-        
-        f.write("    auto stop = std::chrono::high_resolution_clock::now();\n")
-        f.write("    auto duration = std::chrono::duration_cast<std::chrono::milliseconds>(stop - start);\n\n")
-        
-        f.write("    std::cout << \"This program forced the C++ compiler to instantiate {LENGTH_FACTOR} templates.\" << std::endl;\n")
-        f.write("    std::cout << \"Calculated Value: \" << result << std::endl;\n")
-        f.write("    std::cout << \"Runtime Execution took: \" << duration.count() << \" ms (most work was at compile time).\" << std::endl;\n")
-        
-        f.write("    return 0;\n")
-        f.write("}\n")
-    print(f"Generated {filename}")
+    write_shard("cpp", LENGTH_FACTOR, TARGETS["cpp"].path(),
+                0, TARGETS["cpp"].steps(), True, True, report=True)
+
+# --- Parallel Generation ---
+# Bodies smaller than this are not worth splitting across processes
+MIN_SHARD_BYTES = 16 * 1024 * 1024
+
+def write_shard(name, length_factor, path, start, stop, with_header, with_footer,
+                report=False):
+    """
+    Writes body steps start..stop-1 of a target to path, plus its header and
+    footer if asked. Runs in worker processes, so it takes LENGTH_FACTOR as an
+    argument instead of relying on the parent's module state.
+    """
+    global LENGTH_FACTOR
+    LENGTH_FACTOR = length_factor
+    target = TARGETS[name]
+    with ChunkedWriter(path) as f:
+        if with_header:
+            target.header(f)
+        target.body(f, start, stop)
+        if with_footer:
+            target.footer(f)
+    if report:
+        f.report()
+    return f.bytes_written
+
+def plan_shards(target, jobs):
+    """
+    Cuts a target's body into up to `jobs` step ranges holding about the same
+    number of bytes each. Returns a list of (start, stop) pairs.
+    """
+    steps = target.steps()
+    block_costs = [(start, stop, target.step_bytes((start + stop) // 2) * (stop - start))
+                   for start, stop in batches(0, steps)]
+    total = sum(cost for _, _, cost in block_costs)
+    shards = max(1, min(jobs, total // MIN_SHARD_BYTES))
+    if shards == 1:
+        return [(0, steps)]
+    bounds = []
+    shard_start = 0
+    so_far = 0
+    for start, stop, cost in block_costs:
+        so_far += cost
+        if so_far >= total * (len(bounds) + 1) / shards and len(bounds) < shards - 1 \
+                and stop < steps:
+            bounds.append((shard_start, stop))
+            shard_start = stop
+    bounds.append((shard_start, steps))
+    return bounds
+
+def copy_into(src, dst):
+    """
+    Appends all of file object src to dst. Uses os.copy_file_range where the
+    OS has it, so the data moves inside the kernel (or is just re-linked on
+    filesystems that support it) instead of through Python.
+    """
+    remaining = os.fstat(src.fileno()).st_size
+    if hasattr(os, "copy_file_range"):
+        try:
+            while remaining > 0:
+                copied = os.copy_file_range(src.fileno(), dst.fileno(), remaining)
+                if copied == 0:
+                    break
+                remaining -= copied
+            return
+        except OSError:
+            # Not supported between these files; finish with a plain copy
+            pass
+    shutil.copyfileobj(src, dst, CHUNK_SIZE)
+
+def concatenate(path, parts):
+    with open(path, 'wb') as out:
+        for part in parts:
+            with open(part, 'rb') as src:
+                copy_into(src, out)
+            os.remove(part)
+
+def generate_parallel(names, jobs):
+    """
+    Generates the named targets at the same time in a pool of `jobs` processes.
+    Large bodies are split into shards written to numbered part files, which
+    are joined into the final file as soon as all of a target's shards are done.
+    """
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        pending = {}
+        for name in names:
+            target = TARGETS[name]
+            shards = plan_shards(target, jobs)
+            if len(shards) == 1:
+                parts = [target.path()]
+            else:
+                parts = [f"{target.path()}.part{n:03d}" for n in range(len(shards))]
+            futures = [
+                executor.submit(write_shard, name, LENGTH_FACTOR, part, start, stop,
+                                n == 0, n == len(shards) - 1)
+                for n, (part, (start, stop)) in enumerate(zip(parts, shards))
+            ]
+            pending[name] = (time.perf_counter(), parts, futures)
+            print(f"Generating {target.filename} in {len(shards)} shard(s)...")
+
+        for name, (started, parts, futures) in pending.items():
+            size = sum(future.result() for future in futures)
+            if len(parts) > 1:
+                concatenate(TARGETS[name].path(), parts)
+            elapsed = time.perf_counter() - started
+            print(f"Generated {TARGETS[name].path()} ({size / 1e6:,.1f} MB in {elapsed:.2f}s, "
+                  f"{size / 1e6 / elapsed:,.1f} MB/s)")
+
+# --- Compressed Output ---
+# The generated files are extremely repetitive, so they shrink enormously.
+# In compressed mode the generators' chunks go straight into a compressor
+# instead of to disk; nothing uncompressed is ever written.
+COMPRESSORS = {
+    # name: (file extension, factory for an object with compress()/flush())
+    "gzip": (".gz", lambda: zlib.compressobj(6, zlib.DEFLATED, 31)),
+    "bz2": (".bz2", lambda: bz2.BZ2Compressor(9)),
+    "xz": (".xz", lambda: lzma.LZMACompressor(preset=6)),
+    "zstd": (".zst", lambda: zstandard.ZstdCompressor(level=10).compressobj()),
+}
+# Chunks waiting for the compression thread. Bounds memory to roughly this
+# many CHUNK_SIZE chunks if the generator runs ahead of the compressor.
+COMPRESS_QUEUE_CHUNKS = 8
+TAR_NAME = "longest_code.tar"
+
+class CompressingFile:
+    """
+    A write-only file that compresses everything written to it on a
+    background thread. write() only queues the data, so the generator carries
+    on producing the next chunk while the previous one is compressed (zlib,
+    bz2 and lzma release the GIL while they work).
+    """
+    def __init__(self, path, method):
+        self.path = path
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self._raw = open(path, 'wb')
+        self._compressor = COMPRESSORS[method][1]()
+        self._queue = queue.Queue(COMPRESS_QUEUE_CHUNKS)
+        self._error = None
+        self._thread = threading.Thread(target=self._run, name="compressor", daemon=True)
+        self._thread.start()
+
+    def write(self, data):
+        if self._error is not None:
+            raise self._error
+        self._queue.put(data)
+        self.bytes_in += len(data)
+        return len(data)
+
+    def writelines(self, pieces):
+        self.write(b"".join(pieces))
+
+    def _run(self):
+        while True:
+            data = self._queue.get()
+            if data is None:
+                return
+            if self._error is not None:
+                # Keep draining so write() never blocks on a full queue
+                continue
+            try:
+                compressed = self._compressor.compress(data)
+                if compressed:
+                    self._raw.write(compressed)
+                    self.bytes_out += len(compressed)
+            except Exception as e:
+                self._error = e
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+        try:
+            if self._error is not None:
+                raise self._error
+            tail = self._compressor.flush()
+            self._raw.write(tail)
+            self.bytes_out += len(tail)
+        finally:
+            self._raw.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+class ByteCounter:
+    """Takes a generator's output in place of a ChunkedWriter and only counts it."""
+    def __init__(self):
+        self.bytes_written = 0
+
+    def write(self, data):
+        if isinstance(data, str):
+            data = data.encode()
+        self.bytes_written += len(data)
+
+    def writelines(self, pieces):
+        self.bytes_written += sum(map(len, pieces))
+
+def write_target(target, f):
+    target.header(f)
+    target.body(f, 0, target.steps())
+    target.footer(f)
+
+def write_compressed(name, length_factor, path, method):
+    """Generates one target straight into a compressed file. Returns (raw, compressed) sizes."""
+    global LENGTH_FACTOR
+    LENGTH_FACTOR = length_factor
+    with CompressingFile(path, method) as out:
+        with ChunkedWriter(path, fileobj=out) as f:
+            write_target(TARGETS[name], f)
+    return out.bytes_in, out.bytes_out
+
+def write_compressed_tar(names, path, method):
+    """
+    Generates the named targets as members of one compressed tar stream.
+    A tar header has to state the member's size before its data, and the
+    stream can't be rewound to fill it in afterwards, so each target is first
+    generated into a ByteCounter to measure it. That costs a second pass of
+    CPU but no disk.
+    """
+    with CompressingFile(path, method) as out:
+        for name in names:
+            target = TARGETS[name]
+            counter = ByteCounter()
+            write_target(target, counter)
+            info = tarfile.TarInfo(target.filename)
+            info.size = counter.bytes_written
+            info.mtime = int(time.time())
+            info.mode = 0o644
+            out.write(info.tobuf(tarfile.GNU_FORMAT))
+            with ChunkedWriter(path, fileobj=out) as f:
+                write_target(target, f)
+            out.write(b"\0" * (-info.size % tarfile.BLOCKSIZE))
+        # End of archive: two empty blocks, padded out to a whole record
+        out.write(b"\0" * (2 * tarfile.BLOCKSIZE))
+        out.write(b"\0" * (-out.bytes_in % tarfile.RECORDSIZE))
+    return out.bytes_in, out.bytes_out
+
+def report_compressed(path, raw, compressed, elapsed):
+    print(f"Generated {path} ({raw / 1e6:,.1f} MB -> {compressed / 1e6:,.1f} MB, "
+          f"{raw / max(compressed, 1):,.0f}x smaller, in {elapsed:.2f}s, "
+          f"{raw / 1e6 / elapsed:,.1f} MB/s)")
+
+def generate_compressed(names, method, tar, jobs):
+    """
+    Writes the named targets as compressed files, or as one compressed tar
+    of all of them. Separate files are compressed in parallel when jobs > 1.
+    """
+    extension = COMPRESSORS[method][0]
+    start = time.perf_counter()
+    if tar:
+        path = os.path.join(OUTPUT_DIRECTORY, TAR_NAME + extension)
+        print(f"Generating {path}...")
+        raw, compressed = write_compressed_tar(names, path, method)
+        report_compressed(path, raw, compressed, time.perf_counter() - start)
+        return
+
+    paths = {name: TARGETS[name].path() + extension for name in names}
+    if jobs <= 1:
+        for name in names:
+            print(f"Generating {paths[name]}...")
+            started = time.perf_counter()
+            raw, compressed = write_compressed(name, LENGTH_FACTOR, paths[name], method)
+            report_compressed(paths[name], raw, compressed, time.perf_counter() - started)
+        return
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = {name: executor.submit(write_compressed, name, LENGTH_FACTOR,
+                                         paths[name], method)
+                   for name in names}
+        for name, future in futures.items():
+            raw, compressed = future.result()
+            report_compressed(paths[name], raw, compressed, time.perf_counter() - start)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="The Ultimate Code Generator")
+    parser.add_argument("--targets", default=",".join(TARGETS),
+                        help=f"comma-separated targets to generate (default: {','.join(TARGETS)})")
+    parser.add_argument("--length-factor", type=int, default=LENGTH_FACTOR)
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1,
+                        help="worker processes; 1 generates everything in this process")
+    parser.add_argument("--output-dir", default=OUTPUT_DIRECTORY)
+    parser.add_argument("--compress", choices=sorted(COMPRESSORS),
+                        help="stream the output through this compressor instead of "
+                             "writing plain files")
+    parser.add_argument("--tar", action="store_true",
+                        help=f"with --compress, put every target in one {TAR_NAME} archive")
+    args = parser.parse_args()
+    if args.tar and not args.compress:
+        parser.error("--tar needs --compress")
+    if args.compress == "zstd" and zstandard is None:
+        parser.error("--compress zstd needs the zstandard package (pip install zstandard)")
+    args.targets = [t.strip() for t in args.targets.split(",") if t.strip()]
+    unknown = [t for t in args.targets if t not in TARGETS]
+    if unknown:
+        parser.error(f"unknown target(s): {', '.join(unknown)}")
+    return args
 
 # --- Main Execution ---
 if __name__ == "__main__":
+    args = parse_args()
+    LENGTH_FACTOR = args.length_factor
+    OUTPUT_DIRECTORY = args.output_dir
+
     print("--- The Ultimate Code Generator ---")
     print(f"Using a Length Factor of: {LENGTH_FACTOR}\n")
     create_output_directory()
     print("-" * 20)
-    
-    generate_java_code()
-    print("-" * 20)
-    
-    generate_javascript_code()
-    print("-" * 20)
-    
-    generate_cpp_code()
-    print("-" * 20)
-    
-    print("\nAll long source code files have been generated successfully!")
-    print(f"Check the '{OUTPUT_DIRECTORY}' directory.")
 
+    start = time.perf_counter()
+    if args.compress:
+        generate_compressed(args.targets, args.compress, args.tar, args.jobs)
+        print("-" * 20)
+    elif args.jobs <= 1:
+        for name in args.targets:
+            print(f"Generating {TARGETS[name].filename}...")
+            write_shard(name, LENGTH_FACTOR, TARGETS[name].path(),
+                        0, TARGETS[name].steps(), True, True, report=True)
+            print("-" * 20)
+    else:
+        generate_parallel(args.targets, args.jobs)
+        print("-" * 20)
+
+    print(f"\nAll long source code files have been generated successfully in {time.perf_counter() - start:.2f}s!")
+    print(f"Check the '{OUTPUT_DIRECTORY}' directory.")
@@ -1,6 +1,10 @@
+import argparse
 import pygame
 import sys
-import random
+import time
+
+import pong_core
+import replay
 
 # --- Initialization ---
 pygame.init()
@@ -20,136 +24,254 @@ bg_color = pygame.Color('grey12')
 light_grey = (200, 200, 200)
 font = pygame.font.Font(None, 64)
 
-# --- Game Objects (Rectangles) ---
-# The ball
-ball = pygame.Rect(screen_width / 2 - 15, screen_height / 2 - 15, 30, 30)
+# --- Game State ---
+# The ball, the paddles, their speeds and the score all live in one
+# PongState (see pong_core.py), which plays the game without needing pygame.
+game = pong_core.PongState(screen_width, screen_height)
+
+# The game logic advances in fixed steps of one 60 fps frame, however long
+# drawing takes, so a slow frame doesn't slow the game down with it.
+step_ms = 1000 / fps
+# Catch up at most this many steps per frame after a stall
+max_steps_per_frame = 5
+
+# --- Rendering ---
+# Everything that never moves, drawn once. Drawing a frame starts by copying
+# this (or, with dirty rects, the parts of it that objects moved off).
+background = pygame.Surface((screen_width, screen_height))
+background.fill(bg_color)
+
+# Center line
+pygame.draw.aaline(background, light_grey, (screen_width / 2, 0), (screen_width / 2, screen_height))
+
+# Rendered score text, kept until the score changes
+score_surfaces = {}
+
+# Frame-time overlay (main() turns it on with --frame-times)
+overlay_font = pygame.font.Font(None, 24)
+overlay_surface = None
+overlay_interval = 30
+
+def score_surface(score):
+    surface = score_surfaces.get(score)
+    if surface is None:
+        surface = score_surfaces[score] = font.render(f"{score}", True, light_grey)
+    return surface
+
+def current_labels():
+    """
+    The text on screen this frame, as (surface, rect) pairs.
+    """
+    labels = [
+        (score_surface(game.player_score), (screen_width / 2 + 20, screen_height / 2 - 32)),
+        (score_surface(game.opponent_score), (screen_width / 2 - 40, screen_height / 2 - 32)),
+    ]
+    if overlay_surface is not None:
+        labels.append((overlay_surface, (10, screen_height - 24)))
+    return [(surface, surface.get_rect(topleft=position)) for surface, position in labels]
 
-# The paddles
-player = pygame.Rect(screen_width - 20, screen_height / 2 - 70, 10, 140)
-opponent = pygame.Rect(10, screen_height / 2 - 70, 10, 140)
+def draw_objects():
+    pygame.draw.rect(screen, light_grey, game.player)
+    pygame.draw.rect(screen, light_grey, game.opponent)
+    pygame.draw.ellipse(screen, light_grey, game.ball)
+
+def draw():
+    """
+    Draws the current state of the game to the whole screen.
+    """
+    # Background and center line
+    screen.blit(background, (0, 0))
 
-# --- Game Variables ---
-ball_speed_x = 7 * random.choice((1, -1))
-ball_speed_y = 7 * random.choice((1, -1))
-player_speed = 0
-opponent_speed = 7
+    # Game objects
+    draw_objects()
 
-# --- Score Variables ---
-player_score = 0
-opponent_score = 0
+    # --- Score Display ---
+    for surface, rect in current_labels():
+        screen.blit(surface, rect)
 
-# --- Helper Functions ---
+# --- Dirty-Rect Rendering ---
+# Where the objects and labels were drawn last frame
+previous_rects = []
+previous_labels = []
 
-def ball_animation():
+def draw_dirty():
     """
-    Handles the movement and collision of the ball.
+    Redraws only the parts of the screen that changed since the last call and
+    returns them, for pygame.display.update().
     """
-    global ball_speed_x, ball_speed_y, player_score, opponent_score
-
-    # Move the ball
-    ball.x += ball_speed_x
-    ball.y += ball_speed_y
-
-    # --- Ball Collision Detection ---
-    # Top and bottom walls
-    if ball.top <= 0 or ball.bottom >= screen_height:
-        ball_speed_y *= -1
-
-    # Left and right walls (scoring)
-    if ball.left <= 0:
-        player_score += 1
-        ball_restart()
-    
-    if ball.right >= screen_width:
-        opponent_score += 1
-        ball_restart()
-
-    # Paddles
-    if ball.colliderect(player) or ball.colliderect(opponent):
-        ball_speed_x *= -1
-
-def player_animation():
+    global previous_rects, previous_labels
+    objects = [pygame.Rect(tuple(game.player)), pygame.Rect(tuple(game.opponent)),
+               pygame.Rect(tuple(game.ball))]
+    labels = current_labels()
+
+    if not previous_rects:
+        draw()
+        dirty = [screen.get_rect()]
+    else:
+        # Where the objects were and where they are now
+        dirty = previous_rects + objects
+
+        # A label that changed must be cleared from its old place and drawn
+        # anew; one that an object moved over must be drawn again on top.
+        redraw = []
+        for index, (surface, rect) in enumerate(labels):
+            if index >= len(previous_labels) or previous_labels[index][0] is not surface:
+                redraw.append(index)
+                if index < len(previous_labels):
+                    dirty.append(previous_labels[index][1])
+        dirty += [rect for _, rect in previous_labels[len(labels):]]
+        redraw += [index for index, (_, rect) in enumerate(labels)
+                   if index not in redraw and rect.collidelist(dirty) != -1]
+        dirty += [labels[index][1] for index in redraw]
+
+        # Copying from outside the background would shift the copied area
+        screen_rect = screen.get_rect()
+        dirty = [rect.clip(screen_rect) for rect in dirty]
+
+        for rect in dirty:
+            screen.blit(background, rect, rect)
+        draw_objects()
+        for index in redraw:
+            screen.blit(*labels[index])
+
+    previous_rects = objects
+    previous_labels = labels
+    return dirty
+
+def update_overlay(render_times, full_redraw, log):
     """
-    Updates the player's paddle position and keeps it on screen.
+    Shows (and with log, prints) the average time the last few frames spent
+    drawing and pushing pixels to the display.
     """
-    player.y += player_speed
-    if player.top <= 0:
-        player.top = 0
-    if player.bottom >= screen_height:
-        player.bottom = screen_height
+    global overlay_surface
+    average = sum(render_times) / len(render_times) * 1000
+    mode = "full redraw" if full_redraw else "dirty rects"
+    text = f"render {average:.2f} ms/frame ({mode})"
+    overlay_surface = overlay_font.render(text, True, light_grey)
+    if log:
+        print(text)
+
+# --- Recording and Replay ---
+# Each frame of a recording (see replay.py): the player's paddle speed after
+# that frame's input, and how many fixed logic steps the frame ran
+record_format = "<hB"
+profile_sections = ("update", "collision", "draw", "flip")
 
-def opponent_ai():
+def start_game(seed):
+    """Starts a fresh match whose serves come from the given seed."""
+    global game, previous_rects, previous_labels
+    game = pong_core.PongState(screen_width, screen_height, seed=seed)
+    previous_rects = []
+    previous_labels = []
+
+def run_frame(steps, full_redraw, profiler):
     """
-    A simple AI for the opponent's paddle. It tries to follow the ball.
+    Advances the game by `steps` logic steps and draws the result. Returns how
+    long drawing and updating the display took.
     """
-    if opponent.top < ball.y:
-        opponent.top += opponent_speed
-    if opponent.bottom > ball.y:
-        opponent.bottom -= opponent_speed
-    
-    # Keep the opponent on screen
-    if opponent.top <= 0:
-        opponent.top = 0
-    if opponent.bottom >= screen_height:
-        opponent.bottom = screen_height
-
-def ball_restart():
+    for _ in range(steps):
+        game.profiled_step(profiler)
+    profiler.lap("update")
+
+    render_start = time.perf_counter()
+    if full_redraw:
+        draw()
+        profiler.lap("draw")
+        pygame.display.flip()
+    else:
+        rects = draw_dirty()
+        profiler.lap("draw")
+        pygame.display.update(rects)
+    profiler.lap("flip")
+    return time.perf_counter() - render_start
+
+def replay_session(log):
     """
-    Resets the ball to the center after a score and gives it a random direction.
+    Plays a recorded session back as fast as possible and returns a
+    FrameProfiler with every frame's timings.
     """
-    global ball_speed_x, ball_speed_y
-    ball.center = (screen_width / 2, screen_height / 2)
-    ball_speed_y *= random.choice((1, -1))
-    ball_speed_x *= random.choice((1, -1))
+    start_game(log.seed)
+    full_redraw = log.metadata.get("full_redraw", False)
+    profiler = replay.FrameProfiler(profile_sections)
+    for player_speed, steps in log.frames():
+        profiler.start_frame()
+        game.player_speed = player_speed
+        run_frame(steps, full_redraw, profiler)
+        profiler.end_frame()
+    return profiler
 
 # --- Main Game Loop ---
-running = True
-while running:
-    # --- Event Handling ---
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            running = False
-        
-        # Player input for paddle movement
-        if event.type == pygame.KEYDOWN:
-            if event.key == pygame.K_DOWN:
-                player_speed += 7
-            if event.key == pygame.K_UP:
-                player_speed -= 7
-        if event.type == pygame.KEYUP:
-            if event.key == pygame.K_DOWN:
-                player_speed -= 7
-            if event.key == pygame.K_UP:
-                player_speed += 7
-
-    # --- Game Logic ---
-    ball_animation()
-    player_animation()
-    opponent_ai()
-
-    # --- Drawing ---
-    # Background
-    screen.fill(bg_color)
-    
-    # Game objects
-    pygame.draw.rect(screen, light_grey, player)
-    pygame.draw.rect(screen, light_grey, opponent)
-    pygame.draw.ellipse(screen, light_grey, ball)
-    
-    # Center line
-    pygame.draw.aaline(screen, light_grey, (screen_width / 2, 0), (screen_width / 2, screen_height))
+def main():
+    parser = argparse.ArgumentParser(description="Classic Pong")
+    parser.add_argument("--full-redraw", action="store_true",
+                        help="redraw and flip the whole screen every frame")
+    parser.add_argument("--frame-times", action="store_true",
+                        help="show and print how long each frame takes to render")
+    parser.add_argument("--record", metavar="FILE",
+                        help="record this session for replay.py")
+    parser.add_argument("--seed", type=int, help="seed for the serve directions")
+    parser.add_argument("--profile", action="store_true",
+                        help="print a per-frame timing breakdown on exit")
+    args = parser.parse_args()
 
-    # --- Score Display ---
-    player_text = font.render(f"{player_score}", True, light_grey)
-    screen.blit(player_text, (screen_width / 2 + 20, screen_height / 2 - 32))
+    seed = args.seed if args.seed is not None else replay.new_seed()
+    start_game(seed)
+    recorder = None
+    if args.record:
+        recorder = replay.Recorder(args.record, "pong", seed, record_format,
+                                   full_redraw=args.full_redraw)
+    profiler = replay.FrameProfiler(profile_sections) if args.profile else replay.NullProfiler()
+
+    running = True
+    lag = 0.0
+    render_times = []
+    clock.tick()
+    while running:
+        # --- Event Handling ---
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
+
+            # Player input for paddle movement
+            if event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_DOWN:
+                    game.player_speed += 7
+                if event.key == pygame.K_UP:
+                    game.player_speed -= 7
+            if event.type == pygame.KEYUP:
+                if event.key == pygame.K_DOWN:
+                    game.player_speed -= 7
+                if event.key == pygame.K_UP:
+                    game.player_speed += 7
+
+        # --- Game Logic ---
+        lag = min(lag + clock.tick(fps), step_ms * max_steps_per_frame)
+        steps = 0
+        while lag >= step_ms:
+            steps += 1
+            lag -= step_ms
+        if recorder is not None:
+            recorder.record(game.player_speed, steps)
+
+        # --- Update, Drawing and Display Update ---
+        profiler.start_frame()
+        render_times.append(run_frame(steps, args.full_redraw, profiler))
+        profiler.end_frame()
+
+        if len(render_times) == overlay_interval:
+            if args.frame_times:
+                update_overlay(render_times, args.full_redraw, log=True)
+            render_times = []
 
-    opponent_text = font.render(f"{opponent_score}", True, light_grey)
-    screen.blit(opponent_text, (screen_width / 2 - 40, screen_height / 2 - 32))
+    if recorder is not None:
+        recorder.close()
+        print(f"Recorded {recorder.frames:,} frames to {args.record}")
+    if args.profile:
+        profiler.report()
 
-    # --- Update Display ---
-    pygame.display.flip()
-    clock.tick(fps)
+    # --- Quit Pygame ---
+    pygame.quit()
+    sys.exit()
 
-# --- Quit Pygame ---
-pygame.quit()
-sys.exit()
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+"""
+Optional compiled inner loops for the headless game simulators.
+
+With Numba installed, the pure-arithmetic parts of pong_core.PongState.run()
+and flappy_batch.BatchFlappy.step() are JIT-compiled from the functions
+below. Without it, or with NO_JIT=1 in the environment, ENABLED is False and
+both classes run their own Python/NumPy code exactly as before. Nothing else
+changes: the compiled loops follow the same rules in the same order, use no
+random numbers of their own (serves and pipe heights are still drawn by the
+callers), and give identical trajectories.
+
+    python accel.py --check     (compiled and Python paths must match)
+    python accel.py --bench
+    python -m pytest test_accel.py
+"""
+
+import argparse
+import os
+import time
+
+# With NO_JIT=1 Numba isn't even imported, so the Python paths pay nothing
+numba = None
+if os.environ.get("NO_JIT") != "1":
+    try:
+        import numba
+        import numpy as np
+    except ImportError:
+        numba = None
+
+ENABLED = numba is not None
+
+def jit(function):
+    """Compiles function with Numba when it's enabled; otherwise leaves it alone."""
+    return numba.njit(cache=True)(function) if ENABLED else function
+
+
+# --- Pong ---
+@jit
+def overlap(ax, ay, aw, ah, bx, by, bw, bh):
+    """Rect.colliderect for two rects given as numbers."""
+    return (aw > 0 and ah > 0 and bw > 0 and bh > 0
+            and ax < bx + bw and bx < ax + aw and ay < by + bh and by < ay + ah)
+
+@jit
+def pong_frames(s, frames, width, height, ball_w, ball_h, paddle_w, paddle_h,
+                player_x, opponent_x, stage):
+    """
+    Runs up to `frames` frames of PongState.step() on the state packed into
+    s (ball x, y, speed x, speed y, player y, speed, opponent y, speed,
+    player score, opponent score, frame), starting partway through a frame
+    if stage says so. Returns the frames completed and the stage to resume
+    at: when a point is scored it stops right there (stage 1 after the left
+    wall, 2 after the right), so the caller can serve with its own random
+    numbers.
+    """
+    ball_x, ball_y, speed_x, speed_y = s[0], s[1], s[2], s[3]
+    player_y, player_speed, opponent_y, opponent_speed = s[4], s[5], s[6], s[7]
+    player_score, opponent_score, frame = s[8], s[9], s[10]
+    done = 0
+    while done < frames:
+        if stage == 0:
+            ball_x += speed_x
+            ball_y += speed_y
+            if ball_y <= 0 or ball_y + ball_h >= height:
+                speed_y = -speed_y
+            if ball_x <= 0:
+                player_score += 1
+                stage = 1
+                break
+        if stage <= 1 and ball_x + ball_w >= width:
+            opponent_score += 1
+            stage = 2
+            break
+
+        # Paddles
+        if (overlap(ball_x, ball_y, ball_w, ball_h, player_x, player_y, paddle_w, paddle_h)
+                or overlap(ball_x, ball_y, ball_w, ball_h,
+                           opponent_x, opponent_y, paddle_w, paddle_h)):
+            speed_x = -speed_x
+
+        player_y += player_speed
+        if player_y <= 0:
+            player_y = 0
+        if player_y + paddle_h >= height:
+            player_y = height - paddle_h
+
+        if opponent_y < ball_y:
+            opponent_y += opponent_speed
+        if opponent_y + paddle_h > ball_y:
+            opponent_y -= opponent_speed
+        if opponent_y <= 0:
+            opponent_y = 0
+        if opponent_y + paddle_h >= height:
+            opponent_y = height - paddle_h
+
+        stage = 0
+        frame += 1
+        done += 1
+
+    s[0], s[1], s[2], s[3] = ball_x, ball_y, speed_x, speed_y
+    s[4], s[5], s[6], s[7] = player_y, player_speed, opponent_y, opponent_speed
+    s[8], s[9], s[10] = player_score, opponent_score, frame
+    return done, stage
+
+def run_pong(game, frames):
+    """PongState.run(frames) through pong_frames()."""
+    ball, player = game.ball, game.player
+    s = np.array([ball.x, ball.y, game.ball_speed_x, game.ball_speed_y,
+                  player.y, game.player_speed, game.opponent.y, game.opponent_speed,
+                  game.player_score, game.opponent_score, game.frame], dtype=np.int64)
+    stage = 0
+    while frames or stage:
+        done, stage = pong_frames(s, frames, game.width, game.height, ball.w, ball.h,
+                                  player.w, player.h, player.x, game.opponent.x, stage)
+        frames -= done
+        if stage:
+            # Serve exactly as ball_restart() does, then finish the frame
+            ball.x, ball.y = int(s[0]), int(s[1])
+            game.ball_speed_x, game.ball_speed_y = int(s[2]), int(s[3])
+            game.ball_restart()
+            s[0], s[1], s[2], s[3] = ball.x, ball.y, game.ball_speed_x, game.ball_speed_y
+    ball.x, ball.y = int(s[0]), int(s[1])
+    player.y, game.opponent.y = int(s[4]), int(s[6])
+    (game.ball_speed_x, game.ball_speed_y, game.player_speed, game.opponent_speed,
+     game.player_score, game.opponent_score, game.frame) = (
+        int(s[2]), int(s[3]), int(s[5]), int(s[7]), int(s[8]), int(s[9]), int(s[10]))
+
+
+# --- Flappy Bird ---
+@jit
+def flappy_birds(bird_y, vel, clicked, alive, score, frames_alive, jump, scored, gaps,
+                 bird_h, ground_y, gravity, jump_strength,
+                 terminal_velocity, pipe_gap, pipe_h):
+    """
+    One BatchFlappy frame for every live bird: gravity, move, jump, a point
+    if scored, then death against the ceiling, the ground and the pipe
+    pairs whose gap centers are in gaps (the ones over the birds' column).
+    """
+    for i in range(bird_y.shape[0]):
+        if not alive[i]:
+            continue
+        v = vel[i] + gravity
+        if v > terminal_velocity:
+            v = terminal_velocity
+        y = bird_y[i]
+        if y + bird_h < ground_y:
+            y += int(v)
+        if jump[i] and not clicked[i]:
+            v = jump_strength
+        clicked[i] = jump[i]
+        if scored:
+            score[i] += 1
+
+        dead = y < 0 or y + bird_h >= ground_y
+        for gap_y in gaps:
+            if (y < gap_y - pipe_gap and gap_y - pipe_gap - pipe_h < y + bird_h) or (
+                    y < gap_y + pipe_gap + pipe_h and gap_y + pipe_gap < y + bird_h):
+                dead = True
+        vel[i] = v
+        bird_y[i] = y
+        if dead:
+            alive[i] = False
+        else:
+            frames_alive[i] += 1
+
+
+# --- Checks and Benchmark ---
+# These flip accel.ENABLED, the flag pong_core and flappy_batch read, rather
+# than this file's own copy when it is run as a script
+def check_pong(frames, seed):
+    import pong_core
+    compiled = pong_core.PongState(seed=seed)
+    python = pong_core.PongState(seed=seed)
+    # Sweep the player paddle so it hits and misses
+    for chunk in range(frames // 90):
+        speed = 7 if chunk % 2 == 0 else -7
+        compiled.player_speed = python.player_speed = speed
+        compiled.run(90)
+        for _ in range(90):
+            python.step()
+        if compiled.snapshot() != python.snapshot() or compiled.frame != python.frame:
+            print(f"Pong mismatch by frame {python.frame}:\n  compiled: {compiled.snapshot()}\n"
+                  f"  python:   {python.snapshot()}")
+            return False
+    print(f"Pong: identical for {python.frame:,} frames "
+          f"(score {python.opponent_score}-{python.player_score})")
+    return True
+
+def check_flappy(birds, frames, seed):
+    import accel
+    import flappy_batch
+    runs = []
+    enabled_before = accel.ENABLED
+    try:
+        for enabled in (True, False):
+            accel.ENABLED = enabled
+            batch = flappy_batch.BatchFlappy(birds, seed=seed)
+            offsets = np.random.default_rng(seed).uniform(0, 150, birds)
+            trace = []
+            for _ in range(frames):
+                batch.jump = flappy_batch.autopilot(batch.bird_y, batch.vel,
+                                                    batch.next_pipe(), offsets)
+                batch.step()
+                trace.append((batch.bird_y.copy(), batch.vel.copy(), batch.alive.copy(),
+                              batch.score.copy(), batch.frames_alive.copy()))
+            runs.append(trace)
+    finally:
+        accel.ENABLED = enabled_before
+    for frame, (compiled, python) in enumerate(zip(*runs)):
+        if not all(np.array_equal(a, b) for a, b in zip(compiled, python)):
+            print(f"Flappy Bird mismatch at frame {frame + 1}")
+            return False
+    print(f"Flappy Bird: identical for {birds:,} birds x {frames:,} frames "
+          f"({np.count_nonzero(runs[0][-1][2]):,} still alive)")
+    return True
+
+def bench(frames, birds, seed):
+    import accel
+    import flappy_batch
+    import pong_core
+    for name, enabled in (("python", False), ("compiled", True)):
+        accel.ENABLED = enabled
+        game = pong_core.PongState(seed=seed)
+        game.run(1000)   # compile first
+        start = time.perf_counter()
+        game.run(frames)
+        pong = frames / (time.perf_counter() - start)
+
+        batch = flappy_batch.BatchFlappy(birds, seed=seed)
+        offsets = np.random.default_rng(seed).uniform(0, 150, birds)
+        batch.step()
+        start = time.perf_counter()
+        for _ in range(2000):
+            batch.jump = flappy_batch.autopilot(batch.bird_y, batch.vel, batch.next_pipe(),
+                                                offsets)
+            batch.step()
+        flappy = birds * 2000 / (time.perf_counter() - start)
+        print(f"{name:<9} Pong {pong:>12,.0f} frames/s   "
+              f"Flappy Bird {flappy:>14,.0f} bird-steps/s")
+    accel.ENABLED = True
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--check", action="store_true",
+                        help="compare the compiled and Python paths")
+    parser.add_argument("--bench", action="store_true", help="time both paths")
+    parser.add_argument("--frames", type=int, default=200_000)
+    parser.add_argument("--birds", type=int, default=2_000)
+    parser.add_argument("--seed", type=int, default=1234)
+    args = parser.parse_args()
+    if not (args.check or args.bench):
+        parser.error("nothing to do; pass --check and/or --bench")
+    if not ENABLED:
+        print("Numba is not installed (or NO_JIT is set), so there is no compiled path to "
+              "check or time; test_accel.py skips for the same reason.")
+        return
+
+    if args.check:
+        ok = check_pong(args.frames, args.seed)
+        ok = check_flappy(args.birds, min(args.frames, 3000), args.seed) and ok
+        if not ok:
+            raise SystemExit(1)
+    if args.bench:
+        bench(args.frames, args.birds, args.seed)
+
+if __name__ == "__main__":
+    main()
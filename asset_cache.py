@@ -0,0 +1,190 @@
+"""
+A local cache for the images the games download, so they start quickly and
+work without a network connection.
+
+Looking up a URL tries, in order:
+
+    1. a bundled asset directory, holding files named like the URL's last
+       path segment (bluebird-midflap.png), meant to ship with the games
+    2. the on-disk cache: files stored under the SHA-256 of their contents,
+       plus an index mapping each URL to the digest it last had
+    3. the network, unless the cache is offline; whatever is downloaded is
+       added to the on-disk cache
+
+Cached files are checked against their digest when read, so a damaged file
+is fetched again rather than shown.
+
+Run the game once online to fill the cache, then:
+
+    python asset_cache.py --list
+    python asset_cache.py --bundle flappy_assets   (copy it all into a bundle)
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+# --- Settings ---
+BUNDLE_DIR = os.environ.get(
+    "ASSET_BUNDLE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "flappy_assets"))
+CACHE_DIR = os.environ.get(
+    "ASSET_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "esdgesfs", "assets"))
+DOWNLOAD_TIMEOUT = 10
+PREFETCH_WORKERS = 8
+
+
+def bundled_name(url):
+    """The file name a URL's asset has in the bundle directory."""
+    return os.path.basename(urlparse(url).path)
+
+def _write_atomically(path, data):
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+class AssetCache:
+    """
+    Looks assets up by URL in the bundle, the on-disk cache and, unless
+    offline, the network. Safe to use from several threads at once.
+    """
+    def __init__(self, cache_dir=CACHE_DIR, bundle_dir=BUNDLE_DIR, offline=False):
+        self.cache_dir = cache_dir
+        self.bundle_dir = bundle_dir
+        self.offline = offline
+        # Where each asset came from: bundled, cached, downloaded or missing
+        self.sources = Counter()
+        self._memory = {}
+        self._lock = threading.Lock()
+        self._index_path = os.path.join(cache_dir, "index.json")
+        try:
+            with open(self._index_path) as f:
+                self._index = json.load(f)
+        except (OSError, ValueError):
+            self._index = {}
+
+    def _object_path(self, digest):
+        return os.path.join(self.cache_dir, "objects", digest[:2], digest[2:])
+
+    def _read_bundled(self, url):
+        if self.bundle_dir is None:
+            return None
+        try:
+            with open(os.path.join(self.bundle_dir, bundled_name(url)), "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _read_cached(self, url):
+        digest = self._index.get(url)
+        if digest is None:
+            return None
+        try:
+            with open(self._object_path(digest), "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        if hashlib.sha256(data).hexdigest() != digest:
+            return None
+        return data
+
+    def _download(self, url):
+        import requests
+        try:
+            response = requests.get(url, timeout=DOWNLOAD_TIMEOUT)
+            response.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            print(f"Error downloading {url}: {e}")
+            return None
+        return response.content
+
+    def _store(self, url, data):
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._object_path(digest)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            _write_atomically(path, data)
+            with self._lock:
+                self._index[url] = digest
+                _write_atomically(self._index_path, json.dumps(self._index, indent=1).encode())
+        except OSError as e:
+            print(f"Could not cache {url}: {e}")
+
+    def get(self, url):
+        """The bytes of the asset at url, or None if it can't be found."""
+        if url in self._memory:
+            return self._memory[url]
+        source = "bundled"
+        data = self._read_bundled(url)
+        if data is None:
+            source = "cached"
+            data = self._read_cached(url)
+        if data is None and not self.offline:
+            source = "downloaded"
+            data = self._download(url)
+            if data is not None:
+                self._store(url, data)
+        with self._lock:
+            if url not in self._memory:
+                self.sources[source if data is not None else "missing"] += 1
+            # Remember misses too, so a missing image isn't looked for again
+            # (and possibly waited for) every time it is asked for
+            self._memory[url] = data
+        return data
+
+    def prefetch(self, urls, workers=PREFETCH_WORKERS):
+        """Fetches every URL at once on a thread pool, so later get()s are instant."""
+        urls = [url for url in dict.fromkeys(urls) if url not in self._memory]
+        if not urls:
+            return
+        with ThreadPoolExecutor(max_workers=min(workers, len(urls))) as executor:
+            list(executor.map(self.get, urls))
+
+    def summary(self):
+        parts = [f"{self.sources[s]} {s}"
+                 for s in ("bundled", "cached", "downloaded", "missing") if self.sources[s]]
+        mode = ", offline" if self.offline else ""
+        return (", ".join(parts) or "no assets") + mode
+
+    def cached_urls(self):
+        return list(self._index)
+
+
+# --- Main ---
+def main():
+    parser = argparse.ArgumentParser(description="Manage the game asset cache")
+    parser.add_argument("--list", action="store_true", help="show what the cache holds")
+    parser.add_argument("--bundle", metavar="DIR",
+                        help="copy every cached asset into DIR, ready to ship as a bundle")
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    args = parser.parse_args()
+    if not (args.list or args.bundle):
+        parser.error("nothing to do; pass --list and/or --bundle DIR")
+
+    cache = AssetCache(args.cache_dir, bundle_dir=None, offline=True)
+    if args.list:
+        for url in cache.cached_urls():
+            data = cache.get(url)
+            size = f"{len(data):>9,} bytes" if data is not None else "  damaged or missing"
+            print(f"{size}  {url}")
+
+    if args.bundle:
+        os.makedirs(args.bundle, exist_ok=True)
+        copied = 0
+        for url in cache.cached_urls():
+            data = cache.get(url)
+            if data is not None:
+                _write_atomically(os.path.join(args.bundle, bundled_name(url)), data)
+                copied += 1
+        print(f"Copied {copied} assets to {args.bundle}")
+
+if __name__ == "__main__":
+    main()
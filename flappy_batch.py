@@ -0,0 +1,262 @@
+"""
+Runs thousands of Flappy Birds at once with NumPy, without a display.
+
+BatchFlappy flies N birds through one shared stream of pipes and applies the
+rules of FlappyBird.py to all of them in one vectorized step: the same
+gravity, terminal velocity, jump, scrolling, pipe gap, hitboxes, scoring and
+deaths (pipes, the ceiling and the ground). Pipes come from a seeded random
+generator and spawn every pipe_interval frames rather than on a wall-clock
+timer, so a run depends only on the seed and the jumps. It is meant for
+training and tuning bots: set jump for every bird, call step(), read the
+arrays back. With Numba installed, the per-bird work runs compiled (see
+accel.py).
+
+Run this file with --check to confirm that a single bird flies exactly as it
+does in FlappyBird.py (this needs pygame and the game's images, bundled or
+cached; see asset_cache.py).
+
+Usage:
+    python flappy_batch.py --birds 10000 --frames 2000
+    python flappy_batch.py --check --offline
+"""
+
+import argparse
+import os
+import random
+import time
+from collections import deque
+
+import numpy as np
+
+import accel
+
+
+class BatchFlappy:
+    """N birds flying through the same pipes, advanced together one frame per step()."""
+    # Sizes and physics as in FlappyBird.py
+    SCREEN_WIDTH = 480
+    SCREEN_HEIGHT = 640
+    GROUND_HEIGHT = 64
+    BIRD_WIDTH = 34
+    BIRD_HEIGHT = 24
+    PIPE_WIDTH = 80
+    PIPE_HEIGHT = 400
+    # Half the gap between a top and bottom pipe
+    PIPE_GAP = 75
+    GRAVITY = 0.6
+    JUMP_STRENGTH = -10
+    TERMINAL_VELOCITY = 8
+
+    def __init__(self, birds, seed=None, scroll_speed=4, pipe_interval=90,
+                 bird_size=(BIRD_WIDTH, BIRD_HEIGHT)):
+        self.birds = birds
+        # The game's pipe heights come from the random module; a seeded
+        # Random gives the same heights from the same seed
+        self.rng = random.Random(seed)
+        self.scroll_speed = scroll_speed
+        # pipe_frequency (1.5 s) at 60 fps
+        self.pipe_interval = pipe_interval
+        self.bird_width, self.bird_height = bird_size
+        self.ground_y = self.SCREEN_HEIGHT - self.GROUND_HEIGHT
+
+        # Every bird starts centered at (100, half the screen height)
+        self.bird_x = 100 - self.bird_width // 2
+        self.bird_y = np.full(birds, self.SCREEN_HEIGHT // 2 - self.bird_height // 2,
+                              dtype=np.int64)
+        self.vel = np.zeros(birds)
+        self.clicked = np.zeros(birds, dtype=bool)
+        self.alive = np.ones(birds, dtype=bool)
+        self.score = np.zeros(birds, dtype=np.int64)
+        # The frame each bird died on (its fitness, with score)
+        self.frames_alive = np.zeros(birds, dtype=np.int64)
+        # Fill in one value per bird to make it jump (held jumps only count once)
+        self.jump = np.zeros(birds, dtype=bool)
+
+        # Pipe pairs as [x, gap_y], left to right; all birds share them
+        self.pipes = deque()
+        # How many pairs at the front the birds have flown past
+        self.passed = 0
+        self.frame = 0
+
+    def next_pipe(self):
+        """(x, gap_y) of the first pair the birds haven't passed, or None."""
+        if self.passed < len(self.pipes):
+            return tuple(self.pipes[self.passed])
+        return None
+
+    def _update_birds(self, alive):
+        # Gravity, then the move, then the jump, as Bird.update does them
+        self.vel[alive] += self.GRAVITY
+        np.minimum(self.vel, self.TERMINAL_VELOCITY, out=self.vel)
+        falling = alive & (self.bird_y + self.bird_height < self.ground_y)
+        self.bird_y[falling] += self.vel[falling].astype(np.int64)
+
+        jumps = alive & self.jump & ~self.clicked
+        self.vel[jumps] = self.JUMP_STRENGTH
+        self.clicked[alive] = self.jump[alive]
+
+    def _pass_pipe(self):
+        """Whether the birds got all the way past the next pair this frame."""
+        pair = self.next_pipe()
+        if pair is not None and self.bird_x > pair[0] + self.PIPE_WIDTH:
+            self.passed += 1
+            return True
+        return False
+
+    def _move_pipes(self):
+        if self.frame % self.pipe_interval == 0:
+            gap_y = self.SCREEN_HEIGHT // 2 + self.rng.randint(-100, 100)
+            self.pipes.append([self.SCREEN_WIDTH, gap_y])
+        for pair in self.pipes:
+            pair[0] -= self.scroll_speed
+        while self.pipes and self.pipes[0][0] + self.PIPE_WIDTH < 0:
+            self.pipes.popleft()
+            self.passed = max(self.passed - 1, 0)
+
+    def _gaps_over_birds(self):
+        """gap_y of every pair overlapping the birds' column; only these can be hit."""
+        gaps = []
+        left, right = self.bird_x, self.bird_x + self.bird_width
+        for i in range(max(self.passed - 1, 0), len(self.pipes)):
+            x, gap_y = self.pipes[i]
+            if x + self.PIPE_WIDTH <= left:
+                continue
+            if x >= right:
+                break
+            gaps.append(gap_y)
+        return gaps
+
+    def _collide(self):
+        top = self.bird_y
+        bottom = self.bird_y + self.bird_height
+        dead = (top < 0) | (bottom >= self.ground_y)
+        for gap_y in self._gaps_over_birds():
+            top_pipe = (top < gap_y - self.PIPE_GAP) & (gap_y - self.PIPE_GAP - self.PIPE_HEIGHT < bottom)
+            bottom_pipe = (top < gap_y + self.PIPE_GAP + self.PIPE_HEIGHT) & (gap_y + self.PIPE_GAP < bottom)
+            dead |= top_pipe | bottom_pipe
+        self.alive &= ~dead
+
+    def step(self):
+        """Advances every live bird, and the pipes, by one frame."""
+        if accel.ENABLED:
+            scored = self._pass_pipe()
+            self._move_pipes()
+            accel.flappy_birds(self.bird_y, self.vel, self.clicked, self.alive, self.score,
+                               self.frames_alive, np.asarray(self.jump, dtype=bool), scored,
+                               np.array(self._gaps_over_birds(), dtype=np.int64),
+                               self.bird_height, self.ground_y, self.GRAVITY,
+                               self.JUMP_STRENGTH, self.TERMINAL_VELOCITY,
+                               self.PIPE_GAP, self.PIPE_HEIGHT)
+            self.frame += 1
+            return
+        alive = self.alive.copy()
+        self._update_birds(alive)
+        if self._pass_pipe():
+            # A point for each pair the birds get all the way past
+            self.score += alive
+        self._move_pipes()
+        self._collide()
+        self.frame += 1
+        self.frames_alive += self.alive
+
+    def run(self, frames):
+        for _ in range(frames):
+            if not self.alive.any():
+                break
+            self.step()
+
+
+# --- Checks and Benchmark ---
+def autopilot(bird_y, vel, pipe, offset):
+    """A bot: flap when falling below `offset` pixels above the next gap's bottom."""
+    gap_bottom = pipe[1] + BatchFlappy.PIPE_GAP if pipe is not None else 360
+    return (bird_y + BatchFlappy.BIRD_HEIGHT > gap_bottom - offset) & (vel > 0)
+
+def check(frames, seed, lives):
+    """
+    Flies one bird in BatchFlappy and in FlappyBird.py from the same seeds,
+    with the same jumps, and compares them every frame until it dies.
+    """
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    import FlappyBird as game
+    import replay
+
+    profiler = replay.NullProfiler()
+    for life in range(lives):
+        # A fresh game, as at startup
+        game.reset_game()
+        game.flappy.rect.center = (100, game.screen_height // 2)
+        game.flappy.vel = 0
+        game.flappy.clicked = False
+        game.game_started = game.game_over = False
+        game.score = 0
+        random.seed(seed + life)
+        # Feed the game ticks that put exactly pipe_interval frames between pipes
+        interval = 90
+        game.last_pipe = -game.pipe_frequency - 1
+        batch = BatchFlappy(1, seed=seed + life, pipe_interval=interval,
+                            bird_size=game.flappy.rect.size)
+        # Vary the bot so lives end at different places
+        offset = 20 + 15 * (life % 4)
+        for frame in range(frames):
+            jump = bool(autopilot(batch.bird_y[0], batch.vel[0], batch.next_pipe(), offset))
+            batch.jump[0] = jump
+            game.controls = game.Controls(jump, False, (0, 0), frame == 0,
+                                          frame * game.pipe_frequency // (interval - 1))
+            game.run_frame(profiler)
+            batch.step()
+            expected = (game.score, game.flappy.rect.y, game.flappy.vel, not game.game_over
+                        and game.game_started)
+            got = (int(batch.score[0]), int(batch.bird_y[0]), float(batch.vel[0]),
+                   bool(batch.alive[0]))
+            if expected != got:
+                print(f"Life {life + 1}, frame {frame + 1}: mismatch\n"
+                      f"  batch: {got}\n  game:  {expected}")
+                return False
+            if not got[3]:
+                break
+        print(f"Life {life + 1}: identical for {frame + 1:,} frames (score {game.score})")
+    return True
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--birds", type=int, default=10_000)
+    parser.add_argument("--frames", type=int, default=2_000)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--check", action="store_true",
+                        help="compare single birds with FlappyBird.py instead of benchmarking")
+    parser.add_argument("--lives", type=int, default=20, help="games to compare with --check")
+    parser.add_argument("--offline", action="store_true",
+                        help="with --check, use only bundled and cached images")
+    args = parser.parse_args()
+
+    if args.check:
+        # FlappyBird loads its images when check() imports it
+        if args.offline:
+            os.environ["FLAPPY_OFFLINE"] = "1"
+        raise SystemExit(0 if check(args.frames, args.seed, args.lives) else 1)
+
+    # Load (and, with Numba, compile) step()'s kernel before the clock starts
+    BatchFlappy(1, seed=args.seed).step()
+
+    # One autopilot per bird, each with its own offset: a policy sweep
+    batch = BatchFlappy(args.birds, seed=args.seed)
+    offsets = np.random.default_rng(args.seed).uniform(0, 150, args.birds)
+    steps = 0
+    start = time.perf_counter()
+    for _ in range(args.frames):
+        if not batch.alive.any():
+            break
+        batch.jump = autopilot(batch.bird_y, batch.vel, batch.next_pipe(), offsets)
+        batch.step()
+        steps += int(np.count_nonzero(batch.alive))
+    elapsed = time.perf_counter() - start
+    best = int(np.argmax(batch.frames_alive))
+    print(f"{args.birds:,} birds x {batch.frame:,} frames in {elapsed:.2f}s: "
+          f"{args.birds * batch.frame / elapsed:,.0f} bird-steps/s "
+          f"({steps / elapsed:,.0f} live bird-steps/s)")
+    print(f"{np.count_nonzero(batch.alive):,} still alive; best offset {offsets[best]:.1f} "
+          f"lived {batch.frames_alive[best]:,} frames, score {batch.score[best]}")
+
+if __name__ == "__main__":
+    main()
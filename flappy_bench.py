@@ -0,0 +1,121 @@
+"""
+Benchmarks for FlappyBird.py.
+
+Times the bird's update and draw per frame, off-screen with SDL's dummy video
+driver and no frame cap: once rotating the bird with pygame.transform.rotate
+every frame, as the game used to, and once drawing from the rotation cache
+built at load time. The bird flaps through its whole velocity range while
+it is measured.
+
+Then times the per-frame collision and scoring checks with more and more
+pipes on screen (as faster or more frequent pipes would give): groupcollide
+against every pipe, as the game used to, against PipeWorld's check of the
+pairs next to the bird.
+
+Usage:
+    python flappy_bench.py --frames 100000
+    python flappy_bench.py --offline
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# Draw off-screen; this has to be set before FlappyBird starts pygame
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+
+# Imported by main() once it knows whether to load the images offline
+FlappyBird = None
+
+
+def rotate_every_frame(index, angle):
+    """Stands in for FlappyBird.rotated_bird: rotates on every call, as the game used to."""
+    return pygame.transform.rotate(FlappyBird.bird_images[index], angle), (0, 0), None
+
+def bench_bird(frames, cached):
+    """Seconds per frame to update and draw the bird."""
+    game = FlappyBird
+    game.game_started = True
+    game.game_over = False
+    bird = game.Bird(100, game.screen_height // 2)
+    screen = game.screen
+    cached_rotation = game.rotated_bird
+    if not cached:
+        game.rotated_bird = rotate_every_frame
+    try:
+        start = time.perf_counter()
+        for frame in range(frames):
+            # Jump every 30 frames, which sweeps vel from -10 up to 8 and back
+            game.controls = game.Controls(frame % 30 == 0, False, (0, 0), False, 0)
+            bird.rect.center = (100, game.screen_height // 2)
+            bird.update()
+            if cached:
+                bird.draw(screen)
+            else:
+                screen.blit(bird.image, bird.rect)
+        return (time.perf_counter() - start) / frames
+    finally:
+        game.rotated_bird = cached_rotation
+
+def bench_collisions(pairs, frames, world_model):
+    """Seconds per frame for the collision and scoring checks with `pairs` pipe pairs."""
+    game = FlappyBird
+    bird = game.Bird(100, game.screen_height // 2)
+    world = game.PipeWorld()
+    # Spread the pairs out from just behind the bird to the right edge
+    for i in range(pairs):
+        world.spawn(40 + i * (game.screen_width - 40) // pairs, game.screen_height // 2)
+    world.passed = 1
+    bird_group = pygame.sprite.Group(bird)
+    pipe_group = pygame.sprite.Group(*world.pipes())
+    start = time.perf_counter()
+    for _ in range(frames):
+        if world_model:
+            world.hits(bird)
+            pair = world.next_pair()
+            pair[0].rect.right < bird.rect.left
+        else:
+            pygame.sprite.groupcollide(bird_group, pipe_group, False, False)
+            bird_group.sprites()[0].rect.left > pipe_group.sprites()[0].rect.left
+            bird_group.sprites()[0].rect.right < pipe_group.sprites()[0].rect.right
+    elapsed = (time.perf_counter() - start) / frames
+    world.clear()
+    return elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--frames", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3, help="runs to take the best of")
+    parser.add_argument("--pairs", default="2,8,32",
+                        help="comma-separated pipe pair counts for the collision benchmark")
+    parser.add_argument("--offline", action="store_true",
+                        help="use only bundled and cached images, never the network")
+    args = parser.parse_args()
+
+    # FlappyBird loads its images as it is imported
+    if args.offline:
+        os.environ["FLAPPY_OFFLINE"] = "1"
+    global FlappyBird
+    import FlappyBird
+
+    print(f"Bird update + draw, best of {args.repeat} x {args.frames:,} frames:")
+    rotate = min(bench_bird(args.frames, cached=False) for _ in range(args.repeat))
+    cached = min(bench_bird(args.frames, cached=True) for _ in range(args.repeat))
+    print(f"  rotate every frame: {rotate * 1e6:8.2f} us/frame")
+    print(f"  rotation cache:     {cached * 1e6:8.2f} us/frame "
+          f"({rotate / cached:.1f}x faster, {len(FlappyBird.bird_rotations)} cached frames)")
+
+    print(f"\nCollision + scoring checks, best of {args.repeat} x {args.frames:,} frames:")
+    print(f"{'pairs':>7}{'groupcollide us':>17}{'PipeWorld us':>14}")
+    for pairs in map(int, args.pairs.split(",")):
+        group = min(bench_collisions(pairs, args.frames, False) for _ in range(args.repeat))
+        world = min(bench_collisions(pairs, args.frames, True) for _ in range(args.repeat))
+        print(f"{pairs:>7}{group * 1e6:17.2f}{world * 1e6:14.2f}")
+    pygame.quit()
+    sys.exit()
+
+if __name__ == "__main__":
+    main()
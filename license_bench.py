@@ -0,0 +1,333 @@
+"""
+Benchmarks for license_server.py.
+
+Builds a throwaway license database, fills it with keys and measures how many
+key validations per second the server's database layer can handle, and how
+the batch endpoints compare with issuing/validating one key at a time.
+
+--tokens instead simulates a fleet of games launching over several weeks and
+counts the SQL statements the server runs when every launch calls
+/validate_key, against launches that check a signed token (/verify_token)
+and only refresh it as it nears expiry.
+
+Usage:
+    python license_bench.py --keys 100000 --lookups 50000 --threads 4
+    python license_bench.py --batch-keys 50000 --batch-size 1000
+    python license_bench.py --schemas --schema-sizes 1000000,10000000
+    python license_bench.py --tokens --clients 2000 --days 30 --launches-per-day 2
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+
+import license_server
+
+
+# --- Setup ---
+def build_database(db_file, key_count):
+    """Creates the license table in db_file and fills it with random keys."""
+    license_server.pool = license_server.ConnectionPool(db_file)
+    license_server.DB_FILE = db_file
+    license_server.BLOOM_SNAPSHOT_FILE = db_file + ".bloom"
+    # init_db() loads the token secret; keep it beside the database, not in the cwd
+    license_server.TOKEN_KEY_FILE = db_file + ".token.key"
+    license_server.init_db()
+    keys = [str(uuid.uuid4()) for _ in range(key_count)]
+    license_server.insert_keys(keys)
+    return keys
+
+def teardown():
+    license_server.pool.close_all()
+    # Don't let the exit hook write a snapshot into the deleted temp directory
+    license_server.bloom = None
+
+def make_workload(keys, lookups, hit_ratio=0.5):
+    """A mix of issued keys and never-issued keys, like real launch traffic."""
+    workload = []
+    for _ in range(lookups):
+        if random.random() < hit_ratio:
+            workload.append(random.choice(keys))
+        else:
+            workload.append(str(uuid.uuid4()))
+    return workload
+
+# --- Validation Strategies ---
+def validate_unpooled(db_file, key):
+    """The original per-request code path: connect, query, close."""
+    conn = sqlite3.connect(db_file)
+    cursor = conn.cursor()
+    cursor.execute("SELECT * FROM license_keys WHERE key=?", (key,))
+    result = cursor.fetchone()
+    conn.close()
+    return result is not None
+
+def validate_pooled(db_file, key):
+    with license_server.pool.connection() as conn:
+        return conn.execute(license_server.SQL_SELECT_KEY,
+                            (license_server.encode_key(key),)).fetchone() is not None
+
+def validate_cached(db_file, key):
+    return license_server.key_exists(key)
+
+# --- Runner ---
+def run(validate, db_file, workload, threads):
+    """Splits the workload over threads and returns validations per second."""
+    chunks = [workload[i::threads] for i in range(threads)]
+
+    def worker(chunk):
+        for key in chunk:
+            validate(db_file, key)
+
+    workers = [threading.Thread(target=worker, args=(c,)) for c in chunks]
+    start = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - start
+    return len(workload) / elapsed
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+# --- Batch Endpoints ---
+def bench_batches(keys, batch_keys, batch_size):
+    """Keys/sec for one-at-a-time vs batched generation and validation."""
+    single_keys = [str(uuid.uuid4()) for _ in range(batch_keys)]
+    bulk_keys = [str(uuid.uuid4()) for _ in range(batch_keys)]
+
+    def generate_single():
+        for key in single_keys:
+            license_server.insert_key(key)
+
+    single = batch_keys / timed(generate_single)
+    report("generate_key x N", single, unit="keys")
+    bulk = batch_keys / timed(license_server.insert_keys, bulk_keys)
+    report("generate_keys (one txn)", bulk, single, unit="keys")
+
+    # The cache would answer everything after the first pass; switch it off
+    # so both paths do the same SQLite work.
+    license_server.cache = license_server.LicenseCache(0, 0, 0, 0)
+    workload = make_workload(keys, batch_keys)
+
+    def validate_single():
+        for key in workload:
+            license_server.key_exists(key)
+
+    def validate_batched():
+        for start in range(0, len(workload), batch_size):
+            license_server.keys_exist(workload[start:start + batch_size])
+
+    single = batch_keys / timed(validate_single)
+    report("validate_key x N", single, unit="keys")
+    batched = batch_keys / timed(validate_batched)
+    report(f"validate_keys ({batch_size}/batch)", batched, single, unit="keys")
+
+# --- Key Storage Schemas ---
+def fill_schema_database(db_file, schema, key_count, seed):
+    """
+    Creates db_file with the given key schema and key_count keys. The keys
+    come from a seeded generator so every schema gets exactly the same set.
+    Returns a sample of the keys for lookups.
+    """
+    rng = random.Random(seed)
+    license_server.KEY_SCHEMA = schema
+    license_server.pool = license_server.ConnectionPool(db_file)
+    license_server.BLOOM_SNAPSHOT_FILE = db_file + ".bloom"
+    # init_db() loads the token secret; keep it beside the database, not in the cwd
+    license_server.TOKEN_KEY_FILE = db_file + ".token.key"
+    license_server.init_db()
+    sample = []
+    batch = 100_000
+    with license_server.pool.connection() as conn:
+        for start in range(0, key_count, batch):
+            keys = [str(uuid.UUID(int=rng.getrandbits(128), version=4))
+                    for _ in range(min(batch, key_count - start))]
+            conn.executemany(license_server.SQL_INSERT_KEY,
+                             ((license_server.encode_key(k),) for k in keys))
+            sample.extend(rng.sample(keys, min(len(keys), 100)))
+        conn.commit()
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    license_server.pool.close_all()
+    return sample
+
+def lookup_latencies(keys):
+    latencies = []
+    with license_server.pool.connection() as conn:
+        for key in keys:
+            encoded = license_server.encode_key(key)
+            start = time.perf_counter()
+            conn.execute(license_server.SQL_SELECT_KEY, (encoded,)).fetchone()
+            latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return latencies
+
+def bench_schemas(sizes, seed):
+    """DB size, cold start and lookup latency for the TEXT and BLOB key schemas."""
+    print(f"{'keys':>12} {'schema':<7} {'db size':>11} {'cold start':>11} "
+          f"{'hit p50':>9} {'hit p99':>9} {'miss p50':>9}")
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            for schema in ("text", "blob"):
+                db_file = os.path.join(tmp, f"{schema}.db")
+                sample = fill_schema_database(db_file, schema, size, seed)
+                db_size = os.path.getsize(db_file)
+
+                # Cold start: a fresh process with no Bloom snapshot has to
+                # open the database and scan every key to build its filter.
+                os.remove(license_server.BLOOM_SNAPSHOT_FILE)
+                license_server.pool = license_server.ConnectionPool(db_file)
+                cold_start = timed(license_server.init_db)
+
+                hits = lookup_latencies(sample)
+                misses = lookup_latencies([str(uuid.uuid4()) for _ in sample])
+                print(f"{size:>12,} {schema:<7} {db_size / 1e6:>8,.1f} MB {cold_start:>10.2f}s "
+                      f"{hits[len(hits) // 2] * 1e6:>7.1f}us "
+                      f"{hits[int(len(hits) * 0.99)] * 1e6:>7.1f}us "
+                      f"{misses[len(misses) // 2] * 1e6:>7.1f}us")
+                teardown()
+    license_server.KEY_SCHEMA = "text"
+
+# --- Offline Tokens ---
+class CountingPool(license_server.ConnectionPool):
+    """A ConnectionPool that counts every SQL statement its connections run."""
+    statements = 0
+
+    def _connect(self):
+        conn = super()._connect()
+        conn.set_trace_callback(self._count)
+        return conn
+
+    def _count(self, sql):
+        self.statements += 1
+
+def launch_times(clients, days, launches_per_day, seed):
+    """(time, client) for every launch, in time order, starting at time 0."""
+    rng = random.Random(seed)
+    launches = [(day * 86400 + rng.uniform(0, 86400), client)
+                for day in range(days) for client in range(clients)
+                for _ in range(launches_per_day)]
+    launches.sort()
+    return launches
+
+def bench_tokens(clients, days, launches_per_day, refresh_before, seed):
+    """SQL statements and time for a fleet's launches, with and without tokens."""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_file = os.path.join(tmp, "bench_licenses.db")
+        keys = build_database(db_file, clients)
+        launches = launch_times(clients, days, launches_per_day, seed)
+        # Launches are hours apart, far beyond the cache TTL, so every
+        # /validate_key would reach SQLite anyway; leave the cache out of both
+        license_server.cache = license_server.LicenseCache(0, 0, 0, 0)
+        license_server.pool = CountingPool(db_file)
+        print(f"{clients:,} games x {days} days x {launches_per_day} launches/day = "
+              f"{len(launches):,} launches (token TTL {license_server.TOKEN_TTL / 86400:g} days, "
+              f"refreshed {refresh_before / 3600:g}h before expiry)\n")
+
+        def every_launch_validates():
+            for now, client in launches:
+                if license_server.key_exists(keys[client]):
+                    license_server.activations.record(keys[client])
+            # Count the write-behind activation updates too
+            license_server.activations.stop()
+
+        def tokens():
+            held = {}
+            for now, client in launches:
+                token, expires = held.get(client, (None, 0))
+                if token is None:
+                    # First launch: the key goes to /validate_key once
+                    if license_server.key_exists(keys[client]):
+                        license_server.activations.record(keys[client])
+                        issued = license_server.issue_token(keys[client], now)
+                        held[client] = (issued["token"], issued["expires"])
+                    continue
+                status, body = license_server.check_token(token, now)
+                if status != 200 or expires - now < refresh_before:
+                    result = license_server.refresh_tokens([token], now=now)[0]
+                    held[client] = (result["token"], result["expires"])
+            license_server.activations.stop()
+
+        rows = []
+        for name, run_launches in (("validate every launch", every_launch_validates),
+                                   ("tokens", tokens)):
+            license_server.pool.statements = 0
+            license_server.activations.start()
+            elapsed = timed(run_launches)
+            rows.append((name, license_server.pool.statements, elapsed))
+        teardown()
+
+    print(f"{'':<24}{'SQL statements':>16}{'per launch':>12}{'launches/s':>14}")
+    for name, statements, elapsed in rows:
+        print(f"{name:<24}{statements:>16,}{statements / len(launches):>12.3f}"
+              f"{len(launches) / elapsed:>14,.0f}")
+    before, after = rows[0][1], rows[1][1]
+    print(f"\nTokens avoid {1 - after / before:.1%} of the database statements")
+
+def report(name, qps, baseline=None, unit="validations"):
+    line = f"{name:<28} {qps:>12,.0f} {unit}/s"
+    if baseline:
+        line += f"  ({qps / baseline:.1f}x)"
+    print(line)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--keys", type=int, default=100_000, help="keys in the database")
+    parser.add_argument("--lookups", type=int, default=50_000, help="validations to run")
+    parser.add_argument("--threads", type=int, default=4, help="concurrent validating threads")
+    parser.add_argument("--batch-keys", type=int, default=20_000,
+                        help="keys to generate/validate in the batch comparison")
+    parser.add_argument("--batch-size", type=int, default=1_000,
+                        help="keys per /validate_keys request")
+    parser.add_argument("--schemas", action="store_true",
+                        help="compare the TEXT and BLOB key schemas instead")
+    parser.add_argument("--schema-sizes", default="1000000,10000000",
+                        help="comma-separated key counts for --schemas")
+    parser.add_argument("--tokens", action="store_true",
+                        help="measure the database load signed tokens avoid instead")
+    parser.add_argument("--clients", type=int, default=2_000, help="games for --tokens")
+    parser.add_argument("--days", type=int, default=30, help="days of launches for --tokens")
+    parser.add_argument("--launches-per-day", type=int, default=2)
+    parser.add_argument("--refresh-before", type=float, default=86400,
+                        help="seconds before expiry a game refreshes its token")
+    parser.add_argument("--seed", type=int, default=1234)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    if args.schemas:
+        bench_schemas([int(n) for n in args.schema_sizes.split(",")], args.seed)
+        return
+    if args.tokens:
+        bench_tokens(args.clients, args.days, args.launches_per_day, args.refresh_before,
+                     args.seed)
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        db_file = os.path.join(tmp, "bench_licenses.db")
+        print(f"Building database with {args.keys:,} keys...")
+        keys = build_database(db_file, args.keys)
+        workload = make_workload(keys, args.lookups)
+
+        print(f"Running {args.lookups:,} validations on {args.threads} thread(s)\n")
+        before = run(validate_unpooled, db_file, workload, args.threads)
+        report("before (connect per call)", before)
+        after = run(validate_pooled, db_file, workload, args.threads)
+        report("after (WAL connection pool)", after, before)
+        license_server.cache = license_server.LicenseCache()
+        run(validate_cached, db_file, workload, args.threads)  # warm the cache
+        cached = run(validate_cached, db_file, workload, args.threads)
+        report("pool + license cache (warm)", cached, before)
+
+        print(f"\nBatch endpoints, {args.batch_keys:,} keys\n")
+        bench_batches(keys, args.batch_keys, args.batch_size)
+        teardown()
+
+if __name__ == "__main__":
+    main()
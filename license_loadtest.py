@@ -0,0 +1,176 @@
+"""
+Load test for the license server.
+
+Opens many concurrent keep-alive connections to a license server on localhost,
+has each one hammer /validate_key with a mix of issued and never-issued keys
+the way launching GameManager.cs clients would, and reports throughput and
+latency percentiles.
+
+Usage:
+    python license_loadtest.py --spawn --connections 2000 --requests 50
+    python license_loadtest.py --spawn prefork --workers 8
+    python license_loadtest.py --port 5000   (against a server you started)
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+
+# --- HTTP Client ---
+async def send(reader, writer, method, path):
+    """Sends one keep-alive request and returns (status, body)."""
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\n"
+                 f"Content-Length: 0\r\n\r\n".encode())
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    status = int(lines[0].split(" ", 2)[1])
+    length = 0
+    for line in lines[1:]:
+        if line.lower().startswith("content-length:"):
+            length = int(line.split(":", 1)[1])
+    body = await reader.readexactly(length) if length else b""
+    return status, body
+
+async def generate_keys(host, port, count):
+    reader, writer = await asyncio.open_connection(host, port)
+    keys = []
+    for _ in range(count):
+        status, body = await send(reader, writer, "POST", "/generate_key")
+        keys.append(json.loads(body)["key"])
+    writer.close()
+    return keys
+
+async def client(host, port, keys, requests, invalid_ratio, latencies, errors, start_gate):
+    try:
+        reader, writer = await asyncio.open_connection(host, port)
+    except OSError:
+        errors.append("connect")
+        return
+    await start_gate.wait()
+    try:
+        for _ in range(requests):
+            if random.random() < invalid_ratio:
+                key, expected = str(uuid.uuid4()), 404
+            else:
+                key, expected = random.choice(keys), 200
+            start = time.perf_counter()
+            status, _ = await send(reader, writer, "GET", f"/validate_key?key={key}")
+            latencies.append(time.perf_counter() - start)
+            if status != expected:
+                errors.append(f"HTTP {status}")
+    except (OSError, asyncio.IncompleteReadError) as e:
+        errors.append(type(e).__name__)
+    finally:
+        writer.close()
+
+# --- Reporting ---
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return sorted_values[index]
+
+def report(latencies, errors, elapsed):
+    latencies.sort()
+    print(f"Requests:   {len(latencies):,} in {elapsed:.2f}s "
+          f"({len(latencies) / elapsed:,.0f} req/s)")
+    print(f"Errors:     {len(errors):,}" + (f" (first: {errors[0]})" if errors else ""))
+    for name, fraction in (("p50", 0.50), ("p90", 0.90), ("p99", 0.99), ("p99.9", 0.999)):
+        print(f"{name:<11} {percentile(latencies, fraction) * 1000:8.2f} ms")
+    if latencies:
+        print(f"{'max':<11} {latencies[-1] * 1000:8.2f} ms")
+
+# --- Server Process ---
+SERVER_SCRIPTS = {
+    "async": "license_server_async.py",
+    "prefork": "license_server_prefork.py",
+}
+
+def spawn_server(mode, port, workers, workdir):
+    """Starts the chosen server against a fresh database in workdir."""
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), SERVER_SCRIPTS[mode])
+    command = [sys.executable, script, "--port", str(port)]
+    if mode == "prefork":
+        command += ["--workers", str(workers)]
+    return subprocess.Popen(command, cwd=workdir, stdout=subprocess.DEVNULL)
+
+async def wait_for_server(host, port, timeout=10):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            _, writer = await asyncio.open_connection(host, port)
+            writer.close()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.1)
+
+def raise_fd_limit():
+    """Thousands of sockets need more than the usual 1024 file descriptors."""
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+# --- Main ---
+async def run(args):
+    await wait_for_server(args.host, args.port)
+    keys = await generate_keys(args.host, args.port, args.keys)
+
+    latencies, errors = [], []
+    start_gate = asyncio.Event()
+    tasks = [
+        asyncio.create_task(client(args.host, args.port, keys, args.requests,
+                                   args.invalid_ratio, latencies, errors, start_gate))
+        for _ in range(args.connections)
+    ]
+    # Let every connection open before timing starts
+    await asyncio.sleep(0.5)
+    start = time.perf_counter()
+    start_gate.set()
+    await asyncio.gather(*tasks)
+    report(latencies, errors, time.perf_counter() - start)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--connections", type=int, default=1000,
+                        help="concurrent keep-alive connections")
+    parser.add_argument("--requests", type=int, default=20, help="requests per connection")
+    parser.add_argument("--keys", type=int, default=100, help="keys to generate before the run")
+    parser.add_argument("--invalid-ratio", type=float, default=0.5,
+                        help="fraction of requests using never-issued keys")
+    parser.add_argument("--spawn", nargs="?", const="async", choices=sorted(SERVER_SCRIPTS),
+                        help="start a server of this kind on a throwaway database")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="worker processes for --spawn prefork")
+    parser.add_argument("--seed", type=int, default=1234)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    raise_fd_limit()
+    print(f"{args.connections:,} connections x {args.requests} requests "
+          f"against http://{args.host}:{args.port}\n")
+    if not args.spawn:
+        asyncio.run(run(args))
+        return
+    with tempfile.TemporaryDirectory() as workdir:
+        proc = spawn_server(args.spawn, args.port, args.workers, workdir)
+        try:
+            asyncio.run(run(args))
+        finally:
+            proc.terminate()
+            proc.wait()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""
+Prometheus-style metrics and an on-demand sampling profiler for the license
+server.
+
+Metrics are plain in-process counters, gauges and histograms. Recording one is
+a dict lookup and a few additions, cheap enough to do on every request.
+render() turns everything registered into the Prometheus text format for a
+/metrics endpoint.
+
+The profiler samples every thread's Python stack at a fixed interval and
+returns "collapsed" stacks (one `frame;frame;frame count` line per distinct
+stack), which flamegraph.pl, speedscope and similar tools read directly.
+"""
+
+import bisect
+import os
+import sys
+import threading
+import time
+from collections import Counter as _Tally
+
+# Latency buckets in seconds, from sub-millisecond cache hits to slow writes
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                   0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+_registry = []
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+               for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+# --- Metric Types ---
+class Counter:
+    """
+    A value that only goes up, optionally split by label values. Pass a
+    callback returning {label values tuple: value} to report a number that is
+    already counted elsewhere; it is called at scrape time.
+    """
+    kind = "counter"
+
+    def __init__(self, name, help_text, labels=(), callback=None):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self.callback = callback
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def samples(self):
+        if self.callback is not None:
+            items = self.callback().items()
+        else:
+            with self._lock:
+                items = list(self._values.items())
+        for label_values, value in items:
+            yield self.name, _format_labels(self.labels, label_values), value
+
+
+class Gauge(Counter):
+    """A value that goes up and down."""
+    kind = "gauge"
+
+    def dec(self, *label_values, amount=1):
+        self.inc(*label_values, amount=-amount)
+
+    def set(self, *label_values, value):
+        with self._lock:
+            self._values[label_values] = value
+
+
+class Histogram:
+    """Counts observations into cumulative buckets, like a Prometheus histogram."""
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts..., +Inf count, sum]
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def observe(self, *label_values, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._values.get(label_values)
+            if counts is None:
+                counts = self._values[label_values] = [0] * (len(self.buckets) + 2)
+            counts[index] += 1
+            counts[-1] += value
+
+    def time(self, *label_values):
+        """Context manager that observes how long its block took."""
+        return _Timer(self, label_values)
+
+    def samples(self):
+        with self._lock:
+            items = [(k, list(v)) for k, v in self._values.items()]
+        for label_values, counts in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                yield (f"{self.name}_bucket",
+                       _format_labels(self.labels, label_values, [("le", le)]), cumulative)
+            yield f"{self.name}_sum", _format_labels(self.labels, label_values), counts[-1]
+            yield f"{self.name}_count", _format_labels(self.labels, label_values), cumulative
+
+
+class _Timer:
+    __slots__ = ("histogram", "label_values", "start")
+
+    def __init__(self, histogram, label_values):
+        self.histogram = histogram
+        self.label_values = label_values
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(*self.label_values, value=time.perf_counter() - self.start)
+        return False
+
+
+def render():
+    """Every registered metric in the Prometheus text exposition format."""
+    lines = []
+    for metric in _registry:
+        lines.append(f"# HELP {metric.name} {metric.help_text}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for name, labels, value in metric.samples():
+            lines.append(f"{name}{labels} {value}")
+    return "\n".join(lines) + "\n"
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+# --- Sampling Profiler ---
+MAX_PROFILE_SECONDS = 60
+
+def _collapse(frame):
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+        frame = frame.f_back
+    stack.reverse()
+    return ";".join(stack)
+
+def sample_stacks(seconds, interval=0.005):
+    """
+    Samples the stack of every other thread every `interval` seconds for
+    `seconds` and returns the collapsed stacks as text, hottest first.
+    """
+    seconds = min(max(seconds, 0.0), MAX_PROFILE_SECONDS)
+    me = threading.get_ident()
+    names = {t.ident: t.name for t in threading.enumerate()}
+    tally = _Tally()
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        for ident, frame in sys._current_frames().items():
+            if ident == me:
+                continue
+            thread = names.get(ident)
+            if thread is None:
+                names = {t.ident: t.name for t in threading.enumerate()}
+                thread = names.get(ident, str(ident))
+            tally[f"{thread};{_collapse(frame)}"] += 1
+        time.sleep(interval)
+    return "".join(f"{stack} {count}\n" for stack, count in tally.most_common())
@@ -0,0 +1,107 @@
+"""
+Converts a license database between the two key storage schemas.
+
+    text: key TEXT PRIMARY KEY          (36-byte UUID strings, the original)
+    blob: key BLOB PRIMARY KEY, WITHOUT ROWID  (16 raw bytes per UUID)
+
+Stop the license server before migrating. All other columns are copied as-is.
+
+Usage:
+    python license_migrate.py --to blob
+    python license_migrate.py --db licenses.db --to text
+"""
+
+import argparse
+import os
+import sqlite3
+import time
+
+import license_server
+
+# The converted table is built next to the old one, then renamed over it
+NEW_TABLE = "license_keys_new"
+
+
+def table_columns(conn, table):
+    """[(name, declared type), ...] for table, in column order."""
+    return [(row[1], row[2]) for row in conn.execute(f"PRAGMA table_info({table})")]
+
+def database_size(db_file):
+    """Size of the database file with the WAL folded back into it."""
+    conn = sqlite3.connect(db_file)
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.close()
+    return os.path.getsize(db_file)
+
+def migrate(db_file, target):
+    conn = sqlite3.connect(db_file, isolation_level=None)
+    try:
+        if conn.execute(license_server.SQL_TABLE_DEFINITION).fetchone() is None:
+            raise SystemExit(f"{db_file} has no license_keys table")
+        current = "blob" if license_server.uses_blob_schema(conn) else "text"
+        if current == target:
+            print(f"{db_file} already uses the {target} schema.")
+            return False
+
+        if target == "blob":
+            create_sql = license_server.SQL_CREATE_BLOB_TABLE
+            convert = "key_to_blob"
+        else:
+            create_sql = license_server.SQL_CREATE_TEXT_TABLE
+            convert = "blob_to_key"
+        conn.create_function("key_to_blob", 1, license_server.key_to_blob, deterministic=True)
+        conn.create_function("blob_to_key", 1, license_server.blob_to_key, deterministic=True)
+
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute(f"DROP TABLE IF EXISTS {NEW_TABLE}")
+        conn.execute(create_sql.replace("license_keys", NEW_TABLE, 1))
+        # Carry over any columns added to the table after it was created
+        new_names = {name for name, _ in table_columns(conn, NEW_TABLE)}
+        old_columns = table_columns(conn, "license_keys")
+        for name, declared_type in old_columns:
+            if name not in new_names:
+                conn.execute(f"ALTER TABLE {NEW_TABLE} ADD COLUMN {name} {declared_type}")
+
+        names = [name for name, _ in old_columns]
+        selects = [f"{convert}(key)" if name == "key" else name for name in names]
+        conn.execute(f"INSERT INTO {NEW_TABLE} ({', '.join(names)}) "
+                     f"SELECT {', '.join(selects)} FROM license_keys")
+        conn.execute("DROP TABLE license_keys")
+        conn.execute(f"ALTER TABLE {NEW_TABLE} RENAME TO license_keys")
+        conn.execute("COMMIT")
+        # Give the freed pages back to the filesystem
+        conn.execute("VACUUM")
+        return True
+    except BaseException:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--db", default=license_server.DB_FILE)
+    parser.add_argument("--to", choices=("blob", "text"), required=True)
+    parser.add_argument("--bloom-snapshot", default=license_server.BLOOM_SNAPSHOT_FILE,
+                        help="Bloom filter snapshot to discard, since its rowid bookmark "
+                             "no longer matches the table")
+    args = parser.parse_args()
+
+    size_before = database_size(args.db)
+    start = time.perf_counter()
+    if not migrate(args.db, args.to):
+        return
+    elapsed = time.perf_counter() - start
+    if os.path.exists(args.bloom_snapshot):
+        os.remove(args.bloom_snapshot)
+
+    conn = sqlite3.connect(args.db)
+    count = conn.execute(license_server.SQL_COUNT_KEYS).fetchone()[0]
+    conn.close()
+    size_after = database_size(args.db)
+    print(f"Migrated {count:,} keys to the {args.to} schema in {elapsed:.1f}s")
+    print(f"Database size: {size_before / 1e6:,.1f} MB -> {size_after / 1e6:,.1f} MB")
+
+if __name__ == "__main__":
+    main()
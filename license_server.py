@@ -1,6 +1,4 @@
-
-
-/*
+"""
 ================================================================================
 ||                                                                            ||
 ||                      LICENSE SERVER (PYTHON - FLASK)                         ||
@@ -14,68 +12,1009 @@ with it over the internet.
 --------------------------------------------------------------------------------
 -- File: license_server.py
 --------------------------------------------------------------------------------
-*/
+"""
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify
+from collections import OrderedDict
+from contextlib import contextmanager
+import atexit
+import hashlib
+import json
+import math
+import os
+import queue
+import signal
 import sqlite3
+import struct
+import sys
+import threading
+import time
 import uuid
 
+import license_metrics
+import license_tokens
+
 app = Flask(__name__)
 DB_FILE = "licenses.db"
 
+# --- Connection Pool Settings ---
+# How many SQLite connections each server process keeps open
+POOL_SIZE = int(os.environ.get("LICENSE_POOL_SIZE", 8))
+# How long (in milliseconds) a connection waits on a locked database before
+# giving up with "database is locked"
+BUSY_TIMEOUT_MS = int(os.environ.get("LICENSE_BUSY_TIMEOUT_MS", 5000))
+# How many prepared statements each connection keeps compiled
+STATEMENT_CACHE_SIZE = 64
+
+# --- License Cache Settings ---
+# Valid keys almost never change, so they can be cached for a long time.
+# Unknown keys are cached for less time and in a separate, bounded table so a
+# flood of brute-force guesses can't push the real customers out of the cache.
+VALID_CACHE_SIZE = int(os.environ.get("LICENSE_VALID_CACHE_SIZE", 100_000))
+VALID_CACHE_TTL = float(os.environ.get("LICENSE_VALID_CACHE_TTL", 300))
+INVALID_CACHE_SIZE = int(os.environ.get("LICENSE_INVALID_CACHE_SIZE", 50_000))
+INVALID_CACHE_TTL = float(os.environ.get("LICENSE_INVALID_CACHE_TTL", 30))
+
+# --- Negative Filter Settings ---
+# A Bloom filter of every issued key answers "definitely never issued" without
+# touching SQLite. It is saved next to the database so restarts don't have to
+# rescan the whole table. A process only learns about keys it inserted itself,
+# so only one process may write keys to a database (one threaded or async
+# server, or the prefork server's writer); keys another writer adds are
+# rejected here until this process restarts.
+BLOOM_SNAPSHOT_FILE = os.environ.get("LICENSE_BLOOM_SNAPSHOT", "licenses.bloom")
+BLOOM_FALSE_POSITIVE_RATE = float(os.environ.get("LICENSE_BLOOM_FP_RATE", 0.01))
+BLOOM_MIN_CAPACITY = 100_000
+
+# --- Key Storage Settings ---
+# "text" stores keys as their 36-character UUID strings (the original schema).
+# "blob" stores them as 16 raw bytes in a WITHOUT ROWID table, which makes the
+# table and its index several times smaller. This only picks the schema for a
+# brand new database; existing ones are converted with license_migrate.py.
+KEY_SCHEMA = os.environ.get("LICENSE_KEY_SCHEMA", "text")
+
+# --- Activation Log Settings ---
+# Validations record who used a key and when without waiting on a write: the
+# update goes on a queue and a background thread applies queued updates in
+# batched transactions.
+ACTIVATION_QUEUE_SIZE = int(os.environ.get("LICENSE_ACTIVATION_QUEUE_SIZE", 100_000))
+ACTIVATION_BATCH_SIZE = 1_000
+# Longest an activation waits in the queue before it is written
+ACTIVATION_FLUSH_INTERVAL = float(os.environ.get("LICENSE_ACTIVATION_FLUSH_INTERVAL", 1.0))
+
+# --- Token Settings ---
+# Valid keys get a signed, expiring token (see license_tokens.py) that later
+# launches can check with /verify_token instead of a database lookup. Every
+# server process must use the same key file.
+TOKEN_KEY_FILE = os.environ.get("LICENSE_TOKEN_KEY_FILE", "license_token.key")
+TOKEN_TTL = float(os.environ.get("LICENSE_TOKEN_TTL", 7 * 24 * 3600))
+# How long after expiring a token can still be refreshed; after that the game
+# has to send its key to /validate_key again
+TOKEN_REFRESH_GRACE = float(os.environ.get("LICENSE_TOKEN_REFRESH_GRACE", 30 * 24 * 3600))
+
+# --- Profiler Settings ---
+# /debug/profile samples live stacks for flamegraphs. It can stall a request
+# thread for up to a minute, so it is off unless explicitly enabled.
+PROFILER_ENABLED = os.environ.get("LICENSE_PROFILER") == "1"
+
+# --- Batch Endpoint Limits ---
+MAX_GENERATE_BATCH = 1_000_000
+MAX_VALIDATE_BATCH = 10_000
+MAX_REFRESH_BATCH = 10_000
+# SQLite's default limit on "?" parameters in one statement is 999 on older builds
+SQL_IN_CHUNK = 500
+
+# --- SQL Statements ---
+# Keeping the SQL text in one place means every call passes the exact same
+# string, so sqlite3's per-connection statement cache can reuse the compiled
+# statement instead of re-preparing it for each request.
+# A simple table: key is the unique license, is_used is a flag
+SQL_CREATE_TEXT_TABLE = '''
+    CREATE TABLE IF NOT EXISTS license_keys (
+        key TEXT PRIMARY KEY,
+        is_used INTEGER DEFAULT 0,
+        customer_id TEXT
+    )
+'''
+# The same table with keys as 16-byte BLOBs, clustered on the key itself
+SQL_CREATE_BLOB_TABLE = '''
+    CREATE TABLE IF NOT EXISTS license_keys (
+        key BLOB PRIMARY KEY,
+        is_used INTEGER DEFAULT 0,
+        customer_id TEXT
+    ) WITHOUT ROWID
+'''
+SQL_SELECT_KEY = "SELECT 1 FROM license_keys WHERE key=?"
+SQL_INSERT_KEY = "INSERT INTO license_keys (key) VALUES (?)"
+SQL_DELETE_KEY = "DELETE FROM license_keys WHERE key=?"
+SQL_KEYS_SINCE = "SELECT rowid, key FROM license_keys WHERE rowid > ?"
+SQL_ALL_KEYS = "SELECT 0, key FROM license_keys"
+SQL_COUNT_KEYS = "SELECT COUNT(*) FROM license_keys"
+SQL_MAX_ROWID = "SELECT MAX(rowid) FROM license_keys"
+SQL_TABLE_DEFINITION = "SELECT sql FROM sqlite_master WHERE type='table' AND name='license_keys'"
+# A random id given to each database when it is created, so a Bloom filter
+# snapshot can tell whether it was built from this database
+SQL_CREATE_META_TABLE = '''
+    CREATE TABLE IF NOT EXISTS license_meta (
+        name TEXT PRIMARY KEY,
+        value BLOB
+    )
+'''
+SQL_INSERT_DATABASE_ID = "INSERT OR IGNORE INTO license_meta (name, value) VALUES ('database_id', ?)"
+SQL_SELECT_DATABASE_ID = "SELECT value FROM license_meta WHERE name='database_id'"
+# Activation tracking columns, added to existing tables by init_db()
+ACTIVATION_COLUMNS = [
+    ("first_seen", "REAL"),
+    ("last_seen", "REAL"),
+    ("use_count", "INTEGER DEFAULT 0"),
+]
+# A key stays bound to the first customer that activated it
+SQL_RECORD_ACTIVATION = """
+    UPDATE license_keys
+    SET is_used = 1,
+        use_count = COALESCE(use_count, 0) + ?,
+        first_seen = COALESCE(first_seen, ?),
+        last_seen = MAX(COALESCE(last_seen, 0), ?),
+        customer_id = COALESCE(customer_id, ?)
+    WHERE key = ?
+"""
+
+
+# --- Metrics ---
+REQUESTS = license_metrics.Counter(
+    "license_http_requests_total", "HTTP requests served", ("route", "method", "status"))
+REQUEST_LATENCY = license_metrics.Histogram(
+    "license_http_request_duration_seconds", "Time spent handling a request", ("route",))
+IN_FLIGHT = license_metrics.Gauge(
+    "license_http_requests_in_flight", "Requests currently being handled")
+QUERY_LATENCY = license_metrics.Histogram(
+    "license_sqlite_query_duration_seconds", "Time spent in SQLite per query kind", ("query",))
+BLOOM_REJECTIONS = license_metrics.Counter(
+    "license_bloom_rejections_total", "Keys rejected by the Bloom filter without a query")
+TOKEN_CHECKS = license_metrics.Counter(
+    "license_token_checks_total", "License tokens verified or refreshed, by outcome",
+    ("endpoint", "status"))
+
+
+# --- Connection Pool ---
+class ConnectionPool:
+    """
+    A small per-process pool of SQLite connections.
+    Connections are opened lazily, put in WAL mode so readers never block the
+    writer, and handed back to the pool instead of being closed after use.
+    """
+    def __init__(self, db_file, size=POOL_SIZE, busy_timeout_ms=BUSY_TIMEOUT_MS):
+        self.db_file = db_file
+        self.size = size
+        self.busy_timeout_ms = busy_timeout_ms
+        self._reset()
+
+    def _reset(self):
+        # The owning pid lets a forked child notice it inherited the parent's
+        # pool; SQLite connections must never be shared across a fork.
+        self._pid = os.getpid()
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        conn = sqlite3.connect(
+            self.db_file,
+            timeout=self.busy_timeout_ms / 1000,
+            check_same_thread=False,
+            cached_statements=STATEMENT_CACHE_SIZE,
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        # NORMAL is durable in WAL mode except for the last commits on power loss
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+        return conn
+
+    def acquire(self):
+        if self._pid != os.getpid():
+            self._reset()
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                try:
+                    return self._connect()
+                except sqlite3.Error:
+                    self._created -= 1
+                    raise
+        # Every connection is busy, wait for one to be handed back
+        return self._idle.get(timeout=self.busy_timeout_ms / 1000)
+
+    def release(self, conn):
+        if self._pid != os.getpid():
+            return
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            # Don't hand a broken connection to the next request
+            self._discard(conn)
+            return
+        self._idle.put(conn)
+
+    def _discard(self, conn):
+        with self._lock:
+            self._created -= 1
+        conn.close()
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close_all(self):
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(conn)
+
+
+pool = ConnectionPool(DB_FILE)
+
+
+# --- License Cache ---
+class LRUCache:
+    """
+    A bounded, thread-safe LRU map whose entries also expire after ttl seconds.
+    """
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, key):
+        with self._lock:
+            expires = self._entries.get(key)
+            if expires is None:
+                self.misses += 1
+                return False
+            if expires < time.monotonic():
+                del self._entries[key]
+                self.misses += 1
+                return False
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True
+
+    def add(self, key):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = time.monotonic() + self.ttl
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def discard(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+class LicenseCache:
+    """
+    Remembers the outcome of recent key lookups, both valid and invalid.
+    Returns True/False for a cached answer, or None when SQLite must be asked.
+    """
+    def __init__(self, valid_size=VALID_CACHE_SIZE, valid_ttl=VALID_CACHE_TTL,
+                 invalid_size=INVALID_CACHE_SIZE, invalid_ttl=INVALID_CACHE_TTL):
+        self.valid = LRUCache(valid_size, valid_ttl)
+        self.invalid = LRUCache(invalid_size, invalid_ttl)
+        # Bumped on every invalidation so a lookup that raced with an insert
+        # or revoke doesn't cache the answer it read before the change.
+        self.generation = 0
+
+    def lookup(self, key):
+        if key in self.valid:
+            return True
+        if key in self.invalid:
+            return False
+        return None
+
+    def store(self, key, is_valid, generation):
+        if generation != self.generation:
+            return
+        if is_valid:
+            self.valid.add(key)
+        else:
+            self.invalid.add(key)
+
+    def invalidate(self, key):
+        """Forget anything cached about key; call after inserting or revoking it."""
+        self.generation += 1
+        self.valid.discard(key)
+        self.invalid.discard(key)
+
+    def stats(self):
+        return {"valid": self.valid.stats(), "invalid": self.invalid.stats()}
+
+
+cache = LicenseCache()
+
+def _cache_metric(field):
+    def read():
+        return {(name,): stats[field] for name, stats in cache.stats().items()}
+    return read
+
+license_metrics.Counter("license_cache_hits_total", "License cache hits", ("cache",),
+                        callback=_cache_metric("hits"))
+license_metrics.Counter("license_cache_misses_total", "License cache misses", ("cache",),
+                        callback=_cache_metric("misses"))
+license_metrics.Gauge("license_cache_hit_ratio", "License cache hit rate since start", ("cache",),
+                      callback=_cache_metric("hit_rate"))
+license_metrics.Gauge("license_cache_entries", "Entries in the license cache", ("cache",),
+                      callback=_cache_metric("size"))
+
+
+# --- Negative Filter ---
+class BloomFilter:
+    """
+    A Bloom filter over license keys. might_contain() is never wrong about a
+    key that was added, and wrong about an absent key only at the configured
+    false positive rate, in which case SQLite gets the final say.
+    """
+    HEADER = struct.Struct("<4sIQIQq16s")
+    MAGIC = b"LKBF"
+    VERSION = 2
+
+    def __init__(self, capacity, fp_rate=BLOOM_FALSE_POSITIVE_RATE, database_id=bytes(16)):
+        capacity = max(capacity, 1)
+        self.capacity = capacity
+        self.fp_rate = fp_rate
+        self.num_bits = max(8, int(-capacity * math.log(fp_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+        # Highest license_keys rowid folded into the filter, so a snapshot
+        # only has to catch up on keys inserted after it was written. Always 0
+        # for the BLOB schema, which has no rowids.
+        self.max_rowid = 0
+        # The database the filter was built from (see SQL_CREATE_META_TABLE)
+        self.database_id = database_id
+        self._lock = threading.Lock()
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1, h2 = struct.unpack("<QQ", digest)
+        h2 |= 1
+        num_bits = self.num_bits
+        return [(h1 + i * h2) % num_bits for i in range(self.num_hashes)]
+
+    def add(self, key, rowid=None):
+        positions = self._positions(key)
+        with self._lock:
+            bits = self.bits
+            added = False
+            for pos in positions:
+                mask = 1 << (pos & 7)
+                if not bits[pos >> 3] & mask:
+                    bits[pos >> 3] |= mask
+                    added = True
+            # Re-adding a key is a no-op, so re-scanning the table on startup
+            # doesn't inflate the count that decides when to grow the filter.
+            if added:
+                self.count += 1
+            if rowid is not None and rowid > self.max_rowid:
+                self.max_rowid = rowid
+
+    def might_contain(self, key):
+        bits = self.bits
+        for pos in self._positions(key):
+            if not bits[pos >> 3] & (1 << (pos & 7)):
+                return False
+        return True
+
+    def is_full(self):
+        return self.count > self.capacity
+
+    def save(self, path):
+        """Writes the filter to path atomically (write to a temp file, then rename)."""
+        tmp_path = f"{path}.tmp"
+        with self._lock, open(tmp_path, "wb") as f:
+            f.write(self.HEADER.pack(self.MAGIC, self.VERSION, self.num_bits,
+                                     self.num_hashes, self.count, self.max_rowid,
+                                     self.database_id))
+            f.write(self.bits)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """Reads a filter written by save(). Returns None if it is missing or unusable."""
+        try:
+            with open(path, "rb") as f:
+                header = f.read(cls.HEADER.size)
+                bits = f.read()
+        except OSError:
+            return None
+        if len(header) != cls.HEADER.size:
+            return None
+        magic, version, num_bits, num_hashes, count, max_rowid, database_id = cls.HEADER.unpack(header)
+        if magic != cls.MAGIC or version != cls.VERSION or len(bits) != (num_bits + 7) // 8:
+            return None
+        bloom = cls.__new__(cls)
+        bloom.num_bits = num_bits
+        bloom.num_hashes = num_hashes
+        bloom.capacity = max(1, round(num_bits * (math.log(2) ** 2) / -math.log(BLOOM_FALSE_POSITIVE_RATE)))
+        bloom.fp_rate = BLOOM_FALSE_POSITIVE_RATE
+        bloom.bits = bytearray(bits)
+        bloom.count = count
+        bloom.max_rowid = max_rowid
+        bloom.database_id = database_id
+        bloom._lock = threading.Lock()
+        return bloom
+
+
+bloom = None
+# Inserts and filter rebuilds take this lock so a rebuild can't miss a key that
+# is halfway through being inserted.
+_bloom_write_lock = threading.RLock()
+
+def _fill_bloom(target, conn):
+    """Adds every key newer than target.max_rowid to the filter."""
+    if blob_keys:
+        rows = conn.execute(SQL_ALL_KEYS)
+    else:
+        rows = conn.execute(SQL_KEYS_SINCE, (target.max_rowid,))
+    for rowid, key in rows:
+        target.add(decode_key(key), rowid)
+
+def build_bloom():
+    """
+    Loads the Bloom filter snapshot and catches it up with the database, or
+    rebuilds it from license_keys if there is no usable snapshot. Only a
+    snapshot of this database (same database_id) whose rowid bookmark the
+    table hasn't gone back past is caught up; anything else, or a filter that
+    is over capacity once caught up, is rebuilt with room to grow.
+    """
+    global bloom
+    with _bloom_write_lock, pool.connection() as conn:
+        total = conn.execute(SQL_COUNT_KEYS).fetchone()[0]
+        max_rowid = 0 if blob_keys else conn.execute(SQL_MAX_ROWID).fetchone()[0] or 0
+        new_bloom = BloomFilter.load(BLOOM_SNAPSHOT_FILE)
+        if (new_bloom is not None and new_bloom.database_id == database_id
+                and new_bloom.max_rowid <= max_rowid):
+            # Keys revoked since the snapshot stay in it (and in its count):
+            # still correct, just less selective until the next rebuild
+            _fill_bloom(new_bloom, conn)
+            if new_bloom.is_full():
+                new_bloom = None
+        else:
+            new_bloom = None
+        if new_bloom is None:
+            new_bloom = BloomFilter(max(BLOOM_MIN_CAPACITY, total * 2), database_id=database_id)
+            _fill_bloom(new_bloom, conn)
+    bloom = new_bloom
+    save_bloom()
+
+def save_bloom():
+    if bloom is not None:
+        bloom.save(BLOOM_SNAPSHOT_FILE)
+
+atexit.register(save_bloom)
+
+
+# --- Activation Log ---
+class ActivationLog:
+    """
+    Write-behind log of key activations. record() only appends to a bounded
+    in-memory queue, so validation stays read-only; a flusher thread folds
+    queued activations of the same key together and writes each batch in
+    one transaction. stop() drains everything still queued before returning.
+    """
+    _STOP = object()
+
+    def __init__(self, max_queue=ACTIVATION_QUEUE_SIZE, batch_size=ACTIVATION_BATCH_SIZE,
+                 flush_interval=ACTIVATION_FLUSH_INTERVAL):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(max_queue)
+        self._thread = None
+        self.enqueued = 0
+        self.dropped = 0
+        self.flushed = 0
+        self.batches = 0
+        self.failed_batches = 0
+        self.last_flush_seconds = 0.0
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="activation-log", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Writes out every queued activation and stops the flusher."""
+        if self._thread is None or not self._thread.is_alive():
+            return
+        self._queue.put(self._STOP)
+        self._thread.join()
+
+    def record(self, key, customer_id=None, seen=None):
+        """
+        Queues an activation seen at `seen` (default now). Never blocks; drops
+        it if the queue is full.
+        """
+        try:
+            self._queue.put_nowait((key, customer_id, time.time() if seen is None else seen))
+            self.enqueued += 1
+        except queue.Full:
+            self.dropped += 1
+
+    def stats(self):
+        return {
+            "queue_depth": self._queue.qsize(),
+            "queue_capacity": self._queue.maxsize,
+            "enqueued": self.enqueued,
+            "dropped": self.dropped,
+            "flushed": self.flushed,
+            "batches": self.batches,
+            "failed_batches": self.failed_batches,
+            "last_flush_seconds": self.last_flush_seconds,
+        }
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            batch = []
+            deadline = None
+            while len(batch) < self.batch_size:
+                timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is self._STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+            if stopping:
+                # Drain whatever arrived before the stop marker
+                while True:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is not self._STOP:
+                        batch.append(item)
+            if batch:
+                self._flush(batch)
+
+    def _flush(self, batch):
+        # key -> [uses, first seen, last seen, customer]
+        merged = {}
+        for key, customer_id, seen in batch:
+            entry = merged.get(key)
+            if entry is None:
+                merged[key] = [1, seen, seen, customer_id]
+            else:
+                entry[0] += 1
+                entry[1] = min(entry[1], seen)
+                entry[2] = max(entry[2], seen)
+                if entry[3] is None:
+                    entry[3] = customer_id
+        rows = [(uses, first, last, customer, encode_key(key))
+                for key, (uses, first, last, customer) in merged.items()]
+        start = time.perf_counter()
+        try:
+            with pool.connection() as conn, QUERY_LATENCY.time("record_activations"):
+                conn.executemany(SQL_RECORD_ACTIVATION, rows)
+                conn.commit()
+        except sqlite3.Error as e:
+            self.failed_batches += 1
+            print(f"Failed to write {len(batch)} activations: {e}")
+            return
+        self.last_flush_seconds = time.perf_counter() - start
+        self.flushed += len(batch)
+        self.batches += 1
+
+
+activations = ActivationLog()
+atexit.register(activations.stop)
+
+license_metrics.Gauge("license_activation_queue_depth", "Activations waiting to be written",
+                      callback=lambda: {(): activations.stats()["queue_depth"]})
+license_metrics.Counter("license_activations_written_total", "Activations written to SQLite",
+                        callback=lambda: {(): activations.flushed})
+license_metrics.Counter("license_activations_dropped_total",
+                        "Activations dropped because the queue was full",
+                        callback=lambda: {(): activations.dropped})
+
+
+# --- Key Encoding ---
+# True when license_keys uses the BLOB schema; set by init_db()
+blob_keys = False
+# This database's 16-byte id from license_meta; set by init_db()
+database_id = bytes(16)
+
+def key_to_blob(key):
+    """
+    The BLOB-schema form of a key: the 16 raw bytes of a canonical UUID.
+    Anything else is stored as TEXT, which SQLite never considers equal to a
+    BLOB, so odd hand-made keys still work.
+    """
+    try:
+        parsed = uuid.UUID(key)
+    except ValueError:
+        return key
+    return parsed.bytes if str(parsed) == key else key
+
+def blob_to_key(value):
+    if isinstance(value, bytes):
+        return str(uuid.UUID(bytes=value))
+    return value
+
+def encode_key(key):
+    """Converts a key string to the value stored in the current schema."""
+    return key_to_blob(key) if blob_keys else key
+
+def decode_key(value):
+    return blob_to_key(value) if blob_keys else value
+
+def uses_blob_schema(conn):
+    """True if the license_keys table in conn is the WITHOUT ROWID BLOB schema."""
+    row = conn.execute(SQL_TABLE_DEFINITION).fetchone()
+    return row is not None and "WITHOUT ROWID" in row[0].upper()
+
 # --- Database Setup ---
 def init_db():
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-    # A simple table: key is the unique license, is_used is a flag
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS license_keys (
-            key TEXT PRIMARY KEY,
-            is_used INTEGER DEFAULT 0,
-            customer_id TEXT
-        )
-    ''')
-    conn.commit()
-    conn.close()
+    global blob_keys, database_id
+    with pool.connection() as conn:
+        cursor = conn.cursor()
+        if KEY_SCHEMA == "blob":
+            cursor.execute(SQL_CREATE_BLOB_TABLE)
+        else:
+            cursor.execute(SQL_CREATE_TEXT_TABLE)
+        cursor.execute(SQL_CREATE_META_TABLE)
+        cursor.execute(SQL_INSERT_DATABASE_ID, (uuid.uuid4().bytes,))
+        existing = {row[1] for row in conn.execute("PRAGMA table_info(license_keys)")}
+        for name, declared_type in ACTIVATION_COLUMNS:
+            if name not in existing:
+                cursor.execute(f"ALTER TABLE license_keys ADD COLUMN {name} {declared_type}")
+        conn.commit()
+        blob_keys = uses_blob_schema(conn)
+        database_id = conn.execute(SQL_SELECT_DATABASE_ID).fetchone()[0]
+    build_bloom()
+    load_signer()
+    activations.start()
+
+# --- Database Helpers ---
+def insert_key(new_key):
+    """Stores a freshly generated key."""
+    insert_keys([new_key])
+
+def insert_keys(new_keys):
+    """Stores a batch of freshly generated keys in a single transaction."""
+    with _bloom_write_lock:
+        # The filter learns about the keys before they are committed, so it
+        # never rejects a key that a concurrent request can already see.
+        if bloom is not None:
+            for new_key in new_keys:
+                bloom.add(new_key)
+        with pool.connection() as conn, QUERY_LATENCY.time("insert_keys"):
+            conn.executemany(SQL_INSERT_KEY, ((encode_key(k),) for k in new_keys))
+            rowid = 0 if blob_keys else conn.execute(SQL_MAX_ROWID).fetchone()[0] or 0
+            conn.commit()
+        for new_key in new_keys:
+            cache.invalidate(new_key)
+        if bloom is not None:
+            bloom.max_rowid = max(bloom.max_rowid, rowid)
+            if bloom.is_full():
+                build_bloom()
+
+def delete_key(key_to_revoke):
+    """Removes a key from the license table. Returns True if it existed."""
+    with pool.connection() as conn, QUERY_LATENCY.time("delete_key"):
+        deleted = conn.execute(SQL_DELETE_KEY, (encode_key(key_to_revoke),)).rowcount
+        conn.commit()
+    cache.invalidate(key_to_revoke)
+    return deleted > 0
+
+def key_exists_in_memory(key_to_check):
+    """
+    Answers from the cache or Bloom filter alone, without touching SQLite.
+    Returns True/False, or None when only the database can tell.
+    """
+    cached = cache.lookup(key_to_check)
+    if cached is not None:
+        return cached
+    if bloom is not None and not bloom.might_contain(key_to_check):
+        BLOOM_REJECTIONS.inc()
+        return False
+    return None
+
+def key_exists_in_db(key_to_check):
+    """Looks the key up in SQLite and caches the answer."""
+    generation = cache.generation
+    with pool.connection() as conn, QUERY_LATENCY.time("select_key"):
+        found = conn.execute(SQL_SELECT_KEY, (encode_key(key_to_check),)).fetchone() is not None
+    cache.store(key_to_check, found, generation)
+    return found
+
+def key_exists(key_to_check):
+    """Returns True if the key is in the license table."""
+    found = key_exists_in_memory(key_to_check)
+    if found is None:
+        found = key_exists_in_db(key_to_check)
+    return found
+
+def keys_exist(keys_to_check):
+    """
+    Batch version of key_exists. Returns a list of booleans in the same order.
+    Keys the cache or Bloom filter can't answer are looked up with chunked
+    IN (...) queries instead of one query per key.
+    """
+    results = {}
+    pending = []
+    for key in keys_to_check:
+        if key in results:
+            continue
+        found = key_exists_in_memory(key)
+        results[key] = bool(found)
+        if found is None:
+            pending.append(key)
+
+    if pending:
+        generation = cache.generation
+        found = set()
+        with pool.connection() as conn, QUERY_LATENCY.time("select_keys_batch"):
+            for start in range(0, len(pending), SQL_IN_CHUNK):
+                chunk = [encode_key(k) for k in pending[start:start + SQL_IN_CHUNK]]
+                placeholders = ",".join("?" * len(chunk))
+                rows = conn.execute(
+                    f"SELECT key FROM license_keys WHERE key IN ({placeholders})", chunk)
+                found.update(decode_key(row[0]) for row in rows)
+        for key in pending:
+            results[key] = key in found
+            cache.store(key, key in found, generation)
+
+    return [results[key] for key in keys_to_check]
+
+# --- License Tokens ---
+# Set by init_db() from TOKEN_KEY_FILE
+signer = None
+
+def load_signer():
+    global signer
+    signer = license_tokens.TokenSigner.from_key_file(TOKEN_KEY_FILE)
+
+def issue_token(key, now=None):
+    """The token fields added to a "valid" response for key."""
+    token, expires = signer.issue(key, TOKEN_TTL, now)
+    return {"token": token, "expires": expires}
+
+def check_token(token, now=None):
+    """
+    Checks a token's signature and expiry, without looking its key up.
+    Returns (HTTP status, response body).
+    """
+    now = time.time() if now is None else now
+    read = signer.read(token)
+    if read is None:
+        status, code, body = "invalid", 404, {"status": "invalid"}
+    elif read[1] <= now:
+        status, code, body = "expired", 404, {"status": "expired", "expires": read[1]}
+    else:
+        status, code, body = "valid", 200, {"status": "valid", "key": read[0], "expires": read[1]}
+    TOKEN_CHECKS.inc("verify", status)
+    return code, body
+
+def refresh_tokens(tokens, exists=None, now=None, record=None):
+    """
+    Reissues a batch of tokens, expired ones included, after checking that
+    their keys still exist. exists defaults to keys_exist, so the cache,
+    Bloom filter and one IN (...) query per chunk answer the whole batch.
+    Each refresh counts as an activation, passed to record(key), which
+    defaults to activations.record. Returns one response body per token,
+    in order.
+    """
+    exists = keys_exist if exists is None else exists
+    record = activations.record if record is None else record
+    now = time.time() if now is None else now
+    results = []
+    # Index in tokens -> key, for tokens worth looking up
+    keys = {}
+    for i, token in enumerate(tokens):
+        read = signer.read(token)
+        if read is None:
+            results.append({"status": "invalid"})
+        elif read[1] + TOKEN_REFRESH_GRACE <= now:
+            # Too old to refresh blind; the game has to send its key again
+            results.append({"status": "expired", "expires": read[1]})
+        else:
+            results.append(None)
+            keys[i] = read[0]
+    for (i, key), found in zip(keys.items(), exists(list(keys.values()))):
+        if found:
+            record(key)
+            results[i] = {"status": "valid", **issue_token(key, now)}
+        else:
+            results[i] = {"status": "invalid"}
+    for result in results:
+        TOKEN_CHECKS.inc("refresh", result["status"])
+    return results
+
+# --- Request Metrics Middleware ---
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+    IN_FLIGHT.inc()
+
+@app.after_request
+def record_request_metrics(response):
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    REQUESTS.inc(route, request.method, str(response.status_code))
+    REQUEST_LATENCY.observe(route, value=time.perf_counter() - g.request_start)
+    return response
+
+@app.teardown_request
+def end_request(exc):
+    IN_FLIGHT.dec()
 
 # --- API Endpoints ---
 
 # This is for YOU, the developer, to generate keys. Not for the public.
 @app.route('/generate_key', methods=['POST'])
 def generate_key():
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
     new_key = str(uuid.uuid4()) # Generate a random UUID as the key
-    cursor.execute("INSERT INTO license_keys (key) VALUES (?)", (new_key,))
-    conn.commit()
-    conn.close()
+    insert_key(new_key)
     print(f"Generated new key: {new_key}")
     return jsonify({"status": "success", "key": new_key})
 
+# Bulk version for retail partners: /generate_keys?count=N (POST).
+# All keys are inserted in one transaction, then streamed back one JSON
+# object per line (NDJSON) so huge batches never sit in memory as one document.
+@app.route('/generate_keys', methods=['POST'])
+def generate_keys():
+    try:
+        count = int(request.args.get('count', ''))
+    except ValueError:
+        return jsonify({"status": "error", "message": "count must be an integer"}), 400
+    if not 1 <= count <= MAX_GENERATE_BATCH:
+        return jsonify({"status": "error",
+                        "message": f"count must be between 1 and {MAX_GENERATE_BATCH}"}), 400
+
+    new_keys = [str(uuid.uuid4()) for _ in range(count)]
+    insert_keys(new_keys)
+    print(f"Generated {count} new keys")
+
+    def stream():
+        for new_key in new_keys:
+            yield json.dumps({"key": new_key}) + "\n"
+
+    return Response(stream(), mimetype='application/x-ndjson')
+
+# Also for the developer: takes a key out of circulation (e.g. a chargeback).
+@app.route('/revoke_key', methods=['POST'])
+def revoke_key():
+    key_to_revoke = request.args.get('key')
+    if not key_to_revoke:
+        return jsonify({"status": "error", "message": "No key provided"}), 400
+
+    if delete_key(key_to_revoke):
+        print(f"Revoked key: {key_to_revoke}")
+        return jsonify({"status": "success"})
+    else:
+        return jsonify({"status": "error", "message": "Unknown key"}), 404
+
+# Hit/miss counters for the in-memory license cache.
+@app.route('/cache_stats', methods=['GET'])
+def cache_stats():
+    return jsonify(cache.stats())
+
+# Queue depth and throughput of the write-behind activation log.
+@app.route('/activation_stats', methods=['GET'])
+def activation_stats():
+    return jsonify(activations.stats())
+
+# Prometheus scrape endpoint
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return Response(license_metrics.render(), mimetype=license_metrics.CONTENT_TYPE)
+
+# Samples live stacks for ?seconds=N and returns them collapsed for a
+# flamegraph, e.g. curl .../debug/profile?seconds=10 | flamegraph.pl > out.svg
+@app.route('/debug/profile', methods=['GET'])
+def debug_profile():
+    if not PROFILER_ENABLED:
+        return jsonify({"status": "error", "message": "Set LICENSE_PROFILER=1 to enable"}), 404
+    try:
+        seconds = float(request.args.get('seconds', 10))
+    except ValueError:
+        return jsonify({"status": "error", "message": "seconds must be a number"}), 400
+    return Response(license_metrics.sample_stacks(seconds), mimetype='text/plain')
+
 # This is the public endpoint your GAME will call.
+# An optional customer_id binds the key to that customer on first use.
 @app.route('/validate_key', methods=['GET'])
 def validate_key():
     key_to_check = request.args.get('key')
     if not key_to_check:
         return jsonify({"status": "error", "message": "No key provided"}), 400
 
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM license_keys WHERE key=?", (key_to_check,))
-    result = cursor.fetchone()
-    conn.close()
-
-    if result:
-        return jsonify({"status": "valid"})
+    if key_exists(key_to_check):
+        activations.record(key_to_check, request.args.get('customer_id'))
+        return jsonify({"status": "valid", **issue_token(key_to_check)})
     else:
         return jsonify({"status": "invalid"}), 404
 
+# Checks a token from /validate_key without a database lookup, so games can
+# call this on every launch. Expired tokens get {"status": "expired"}.
+@app.route('/verify_token', methods=['GET'])
+def verify_token():
+    token = request.args.get('token')
+    if not token:
+        return jsonify({"status": "error", "message": "No token provided"}), 400
+    status, body = check_token(token)
+    return jsonify(body), status
+
+# Swaps tokens (expired ones too, within TOKEN_REFRESH_GRACE) for fresh ones
+# if their keys haven't been revoked. Body: {"tokens": ["...", "..."]}
+@app.route('/refresh_tokens', methods=['POST'])
+def refresh_tokens_endpoint():
+    body = request.get_json(silent=True)
+    tokens = body.get('tokens') if isinstance(body, dict) else None
+    if not isinstance(tokens, list) or not all(isinstance(t, str) for t in tokens):
+        return jsonify({"status": "error", "message": "Expected a JSON list of tokens"}), 400
+    if len(tokens) > MAX_REFRESH_BATCH:
+        return jsonify({"status": "error",
+                        "message": f"At most {MAX_REFRESH_BATCH} tokens per request"}), 400
+    return jsonify({"results": refresh_tokens(tokens)})
+
+# Batch version of /validate_key. Body: {"keys": ["...", "..."]}
+@app.route('/validate_keys', methods=['POST'])
+def validate_keys():
+    body = request.get_json(silent=True)
+    keys_to_check = body.get('keys') if isinstance(body, dict) else None
+    if not isinstance(keys_to_check, list) or not all(isinstance(k, str) for k in keys_to_check):
+        return jsonify({"status": "error", "message": "Expected a JSON list of keys"}), 400
+    if len(keys_to_check) > MAX_VALIDATE_BATCH:
+        return jsonify({"status": "error",
+                        "message": f"At most {MAX_VALIDATE_BATCH} keys per request"}), 400
+
+    results = keys_exist(keys_to_check)
+    return jsonify({"results": [
+        {"key": key, "status": "valid" if valid else "invalid"}
+        for key, valid in zip(keys_to_check, results)
+    ]})
+
 if __name__ == '__main__':
     init_db()
     # To generate your first key, you can run a separate script or use a tool
     # like Postman to send a POST request to /generate_key
     print("License server is running. Use /generate_key (POST) to create keys.")
-    print("Use /validate_key?key=... (GET) to check them.")
+    print("Use /validate_key?key=... (GET) to check them, and /verify_token?token=... (GET)")
+    print("for the tokens it hands out.")
+    # Exit through atexit on SIGTERM too, so queued activations get written
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
     app.run(port=5000, debug=True)
-
-/*
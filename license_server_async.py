@@ -0,0 +1,313 @@
+"""
+================================================================================
+||                                                                            ||
+||                   LICENSE SERVER (PYTHON - ASYNCIO MODE)                     ||
+||                                                                            ||
+================================================================================
+
+An asyncio front end for license_server.py. It serves the same /validate_key
+and /generate_key contract as the Flask app, but one event loop handles
+thousands of keep-alive connections from game clients at once instead of
+Flask's dev server answering one blocking request at a time.
+
+Lookups that the license cache or Bloom filter can answer never leave the
+event loop. Everything that needs SQLite is handed to a dedicated database
+thread through a request queue, so a slow query never stalls other clients.
+
+    python license_server_async.py --port 5000
+
+--------------------------------------------------------------------------------
+-- File: license_server_async.py
+--------------------------------------------------------------------------------
+"""
+
+import argparse
+import asyncio
+import json
+import queue
+import signal
+import threading
+import time
+import uuid
+from urllib.parse import parse_qs, urlsplit
+
+import license_metrics
+import license_server
+
+# --- Server Settings ---
+# Idle keep-alive connections are closed after this many seconds
+KEEP_ALIVE_TIMEOUT = 75
+# Largest request head or body we are willing to read
+MAX_REQUEST_BYTES = 64 * 1024
+LISTEN_BACKLOG = 4096
+
+STATUS_TEXT = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    500: "Internal Server Error",
+}
+
+
+# --- Database Thread ---
+class DatabaseThread:
+    """
+    Runs blocking license_server database calls on one background thread.
+    Coroutines call `await db.run(fn, *args)` and get the result back on the
+    event loop when the thread has finished the call.
+    """
+    def __init__(self):
+        self._requests = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._serve, name="license-db", daemon=True)
+        self._thread.start()
+
+    def _serve(self):
+        while True:
+            job = self._requests.get()
+            if job is None:
+                return
+            loop, future, fn, args = job
+            try:
+                result = fn(*args)
+            except Exception as e:
+                loop.call_soon_threadsafe(_set_exception, future, e)
+            else:
+                loop.call_soon_threadsafe(_set_result, future, result)
+
+    def run(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._requests.put((loop, future, fn, args))
+        return future
+
+    def stop(self):
+        self._requests.put(None)
+        self._thread.join()
+
+def _set_result(future, result):
+    if not future.cancelled():
+        future.set_result(result)
+
+def _set_exception(future, exc):
+    if not future.cancelled():
+        future.set_exception(exc)
+
+
+# --- Request Handlers ---
+# Each handler returns (status code, JSON-serialisable body), mirroring the
+# Flask endpoints in license_server.py.
+async def handle_validate_key(db, method, params, body):
+    if method != "GET":
+        return 405, {"status": "error", "message": "Use GET"}
+    key_to_check = params.get("key", [""])[0]
+    if not key_to_check:
+        return 400, {"status": "error", "message": "No key provided"}
+
+    found = license_server.key_exists_in_memory(key_to_check)
+    if found is None:
+        found = await db.run(license_server.key_exists_in_db, key_to_check)
+    if found:
+        license_server.activations.record(key_to_check, params.get("customer_id", [None])[0])
+        return 200, {"status": "valid", **license_server.issue_token(key_to_check)}
+    else:
+        return 404, {"status": "invalid"}
+
+async def handle_verify_token(db, method, params, body):
+    if method != "GET":
+        return 405, {"status": "error", "message": "Use GET"}
+    token = params.get("token", [""])[0]
+    if not token:
+        return 400, {"status": "error", "message": "No token provided"}
+    # Only a signature check; it never needs the database thread
+    return license_server.check_token(token)
+
+async def handle_refresh_tokens(db, method, params, body):
+    if method != "POST":
+        return 405, {"status": "error", "message": "Use POST"}
+    try:
+        tokens = json.loads(body or b"{}").get("tokens")
+    except (ValueError, AttributeError):
+        tokens = None
+    if not isinstance(tokens, list) or not all(isinstance(t, str) for t in tokens):
+        return 400, {"status": "error", "message": "Expected a JSON list of tokens"}
+    if len(tokens) > license_server.MAX_REFRESH_BATCH:
+        return 400, {"status": "error",
+                     "message": f"At most {license_server.MAX_REFRESH_BATCH} tokens per request"}
+    return 200, {"results": await db.run(license_server.refresh_tokens, tokens)}
+
+async def handle_generate_key(db, method, params, body):
+    if method != "POST":
+        return 405, {"status": "error", "message": "Use POST"}
+    new_key = str(uuid.uuid4())
+    await db.run(license_server.insert_key, new_key)
+    print(f"Generated new key: {new_key}")
+    return 200, {"status": "success", "key": new_key}
+
+async def handle_metrics(db, method, params, body):
+    return 200, license_metrics.render()
+
+async def handle_debug_profile(db, method, params, body):
+    if not license_server.PROFILER_ENABLED:
+        return 404, {"status": "error", "message": "Set LICENSE_PROFILER=1 to enable"}
+    try:
+        seconds = float(params.get("seconds", ["10"])[0])
+    except ValueError:
+        return 400, {"status": "error", "message": "seconds must be a number"}
+    # Sample from a helper thread so the event loop keeps running (and shows
+    # up in the profile)
+    return 200, await asyncio.to_thread(license_metrics.sample_stacks, seconds)
+
+ROUTES = {
+    "/validate_key": handle_validate_key,
+    "/generate_key": handle_generate_key,
+    "/verify_token": handle_verify_token,
+    "/refresh_tokens": handle_refresh_tokens,
+    "/metrics": handle_metrics,
+    "/debug/profile": handle_debug_profile,
+}
+
+
+# --- HTTP/1.1 Connection Handling ---
+def build_response(status, payload, keep_alive):
+    # Handlers return text (metrics, profiles) as a str; everything else is JSON
+    if isinstance(payload, str):
+        body = payload.encode()
+        content_type = license_metrics.CONTENT_TYPE
+    else:
+        body = json.dumps(payload).encode()
+        content_type = "application/json"
+    head = (
+        f"HTTP/1.1 {status} {STATUS_TEXT.get(status, 'OK')}\r\n"
+        f"Content-Type: {content_type}\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+        f"\r\n"
+    )
+    return head.encode() + body
+
+async def read_request(reader):
+    """
+    Reads one request off the connection.
+    Returns (method, target, version, headers, body), or None if the client
+    went away or sent something we can't parse.
+    """
+    try:
+        head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), KEEP_ALIVE_TIMEOUT)
+    except (asyncio.IncompleteReadError, asyncio.LimitOverrunError,
+            asyncio.TimeoutError, ConnectionError):
+        return None
+
+    lines = head.decode("latin-1").split("\r\n")
+    try:
+        method, target, version = lines[0].split(" ", 2)
+    except ValueError:
+        return None
+    headers = {}
+    for line in lines[1:]:
+        if ":" in line:
+            name, value = line.split(":", 1)
+            headers[name.strip().lower()] = value.strip()
+
+    body = b""
+    try:
+        length = int(headers.get("content-length", 0) or 0)
+    except ValueError:
+        return None
+    if length < 0 or length > MAX_REQUEST_BYTES:
+        return None
+    if length:
+        try:
+            body = await reader.readexactly(length)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            return None
+    return method, target, version, headers, body
+
+def wants_keep_alive(version, headers):
+    connection = headers.get("connection", "").lower()
+    if version == "HTTP/1.0":
+        return connection == "keep-alive"
+    return connection != "close"
+
+async def handle_connection(routes, db, reader, writer):
+    """
+    Serves requests on one client connection until it closes. Handlers in
+    routes are called as handler(db, method, params, body).
+    """
+    try:
+        while True:
+            request = await read_request(reader)
+            if request is None:
+                break
+            method, target, version, headers, body = request
+            url = urlsplit(target)
+            handler = routes.get(url.path)
+            route = url.path if handler is not None else "unmatched"
+            start = time.perf_counter()
+            license_server.IN_FLIGHT.inc()
+            if handler is None:
+                status, payload = 404, {"status": "error", "message": "Not found"}
+            else:
+                try:
+                    status, payload = await handler(db, method, parse_qs(url.query), body)
+                except Exception as e:
+                    print(f"Error handling {method} {url.path}: {e}")
+                    status, payload = 500, {"status": "error", "message": "Internal error"}
+            license_server.IN_FLIGHT.dec()
+            license_server.REQUESTS.inc(route, method, str(status))
+            license_server.REQUEST_LATENCY.observe(route, value=time.perf_counter() - start)
+
+            keep_alive = wants_keep_alive(version, headers)
+            writer.write(build_response(status, payload, keep_alive))
+            await writer.drain()
+            if not keep_alive:
+                break
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+# --- Entry Point ---
+async def serve_until_terminated(server):
+    """
+    Serves until the process gets SIGTERM, then returns normally so callers'
+    cleanup (like draining the activation log) runs.
+    """
+    stop = asyncio.Event()
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stop.set)
+    async with server:
+        await stop.wait()
+
+async def serve(host, port):
+    db = DatabaseThread()
+    # init_db builds the Bloom filter; run it on the DB thread like every
+    # other SQLite call.
+    await db.run(license_server.init_db)
+
+    def on_connect(reader, writer):
+        return handle_connection(ROUTES, db, reader, writer)
+
+    server = await asyncio.start_server(on_connect, host, port, limit=MAX_REQUEST_BYTES,
+                                        backlog=LISTEN_BACKLOG)
+    try:
+        await serve_until_terminated(server)
+    finally:
+        db.stop()
+        license_server.activations.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description="Asyncio license server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5000)
+    args = parser.parse_args()
+
+    print(f"Async license server listening on http://{args.host}:{args.port}")
+    print("Use /generate_key (POST) to create keys and /validate_key?key=... (GET) to check them.")
+    try:
+        asyncio.run(serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
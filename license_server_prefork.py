@@ -0,0 +1,466 @@
+"""
+================================================================================
+||                                                                            ||
+||                  LICENSE SERVER (PYTHON - PRE-FORK MODE)                     ||
+||                                                                            ||
+================================================================================
+
+Runs N worker processes that all accept /validate_key requests on the same
+listening socket, so validation scales across every core instead of being
+capped by one Python process.
+
+Workers never open the database. They answer from a shared, read-only key
+index: a file of sorted 16-byte key entries that every worker memory-maps, so
+the operating system keeps a single copy of it in the page cache however many
+workers there are. A lookup is a binary search over that mapping.
+
+All writes go through one writer process (the parent). Workers forward
+/generate_key to it over a Unix socket. The writer inserts the key, merges it
+into a new copy of the index and atomically swaps the file in before
+answering, so a key is valid on every worker as soon as the client sees it.
+Workers also batch up the activations they see (validations and token
+refreshes) and send them to the writer, which queues them on its activation
+log like any other server. On shutdown the writer stops every worker, which
+sends whatever activations it still holds, before it stops listening.
+
+    python license_server_prefork.py --workers 8 --port 5000
+
+Pre-fork mode needs os.fork, so it runs on Linux/macOS only.
+--------------------------------------------------------------------------------
+-- File: license_server_prefork.py
+--------------------------------------------------------------------------------
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import mmap
+import os
+import signal
+import socket
+import struct
+import time
+import uuid
+
+import license_server
+import license_server_async
+
+# --- Pre-fork Settings ---
+INDEX_FILE = os.environ.get("LICENSE_INDEX_FILE", "licenses.idx")
+WRITER_SOCKET = os.environ.get("LICENSE_WRITER_SOCKET", "licenses.writer.sock")
+# How long the writer waits to gather more new keys into one republish
+PUBLISH_DELAY = 0.05
+# Workers look for a newer index at most this often on lookups that hit
+INDEX_RECHECK_INTERVAL = 1.0
+# Workers send their activations to the writer this often, and hold at most
+# ACTIVATION_QUEUE_SIZE of them while the writer can't be reached
+ACTIVATION_FORWARD_INTERVAL = license_server.ACTIVATION_FLUSH_INTERVAL
+
+
+# --- Key Index File ---
+# Layout: header, then `count` 16-byte entries in ascending byte order.
+INDEX_HEADER = struct.Struct("<4sIQQ")   # magic, version, generation, count
+INDEX_MAGIC = b"LKIX"
+INDEX_VERSION = 1
+ENTRY_SIZE = 16
+
+def index_entry(key):
+    """
+    The 16 bytes a key is stored as in the index. Generated keys are UUIDs, so
+    their raw bytes are used directly; anything else is hashed to 16 bytes.
+    """
+    try:
+        parsed = uuid.UUID(key)
+    except ValueError:
+        parsed = None
+    if parsed is not None and str(parsed) == key:
+        return parsed.bytes
+    return hashlib.blake2b(key.encode(), digest_size=ENTRY_SIZE).digest()
+
+def _search(buf, count, entry):
+    """Index of the first entry >= entry in a sorted entry buffer."""
+    lo, hi = 0, count
+    offset = INDEX_HEADER.size
+    while lo < hi:
+        mid = (lo + hi) // 2
+        start = offset + mid * ENTRY_SIZE
+        if buf[start:start + ENTRY_SIZE] < entry:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+def _write_index(path, generation, count, write_entries):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(INDEX_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, generation, count))
+        write_entries(f)
+    os.replace(tmp_path, path)
+
+def build_index(path):
+    """Writes a fresh index of every key in the license table."""
+    with license_server.pool.connection() as conn:
+        entries = {index_entry(license_server.decode_key(key))
+                   for (key,) in conn.execute("SELECT key FROM license_keys")}
+    entries = sorted(entries)
+    _write_index(path, 1, len(entries), lambda f: f.writelines(entries))
+    return len(entries)
+
+def merge_into_index(path, new_keys):
+    """
+    Publishes a new index that also contains new_keys. The existing index is
+    copied across in large slices between the insertion points, so the cost is
+    one sequential rewrite of the file however many keys are added.
+    """
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as old:
+        _, _, generation, count = INDEX_HEADER.unpack_from(old)
+        additions = []
+        for entry in sorted({index_entry(k) for k in new_keys}):
+            pos = _search(old, count, entry)
+            start = INDEX_HEADER.size + pos * ENTRY_SIZE
+            if old[start:start + ENTRY_SIZE] != entry:
+                additions.append((pos, entry))
+
+        def write_entries(out):
+            copied = 0
+            for pos, entry in additions:
+                out.write(old[INDEX_HEADER.size + copied * ENTRY_SIZE:
+                              INDEX_HEADER.size + pos * ENTRY_SIZE])
+                out.write(entry)
+                copied = pos
+            out.write(old[INDEX_HEADER.size + copied * ENTRY_SIZE:
+                          INDEX_HEADER.size + count * ENTRY_SIZE])
+
+        _write_index(path, generation + 1, count + len(additions), write_entries)
+
+
+def _file_identity(st):
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+class KeyIndex:
+    """
+    A worker's read-only view of the published key index. The file is
+    replaced (never modified in place) on every publish, so the worker
+    re-maps it whenever the path points at a new file.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.generation = 0
+        self.count = 0
+        self._mm = None
+        self._identity = None
+        self._last_check = 0.0
+        self.refresh()
+
+    def refresh(self):
+        """Maps the current index file if it changed. Returns True if it did."""
+        self._last_check = time.monotonic()
+        if _file_identity(os.stat(self.path)) == self._identity:
+            return False
+        with open(self.path, "rb") as f:
+            identity = _file_identity(os.fstat(f.fileno()))
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, generation, count = INDEX_HEADER.unpack_from(mm)
+        if magic != INDEX_MAGIC or version != INDEX_VERSION:
+            mm.close()
+            raise ValueError(f"{self.path} is not a license key index")
+        old, self._mm = self._mm, mm
+        self._identity = identity
+        self.generation = generation
+        self.count = count
+        if old is not None:
+            old.close()
+        return True
+
+    def _contains(self, entry):
+        pos = _search(self._mm, self.count, entry)
+        start = INDEX_HEADER.size + pos * ENTRY_SIZE
+        return pos < self.count and self._mm[start:start + ENTRY_SIZE] == entry
+
+    def __contains__(self, key):
+        entry = index_entry(key)
+        if time.monotonic() - self._last_check > INDEX_RECHECK_INTERVAL:
+            self.refresh()
+        if self._contains(entry):
+            return True
+        # A miss might be a key published a moment ago; make sure we are
+        # looking at the newest index before saying no.
+        return self.refresh() and self._contains(entry)
+
+
+# --- Worker Processes ---
+async def forward_to_writer(method, path, body=b""):
+    """Relays a write request to the writer process and returns its answer."""
+    reader, writer = await asyncio.open_unix_connection(WRITER_SOCKET)
+    try:
+        writer.write(f"{method} {path} HTTP/1.1\r\nConnection: close\r\n"
+                     f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+        response = await reader.read()
+    finally:
+        writer.close()
+    head, _, body = response.partition(b"\r\n\r\n")
+    status = int(head.split(b" ", 2)[1])
+    return status, json.loads(body)
+
+def _activation_bodies(records):
+    """
+    Splits records into JSON request bodies no bigger than the writer will
+    read. Yields (body, number of records in it).
+    """
+    batch, size = [], 2
+    for record in records:
+        encoded = json.dumps(record)
+        if batch and size + len(encoded) + 1 > license_server_async.MAX_REQUEST_BYTES:
+            yield f"[{','.join(batch)}]".encode(), len(batch)
+            batch, size = [], 2
+        batch.append(encoded)
+        size += len(encoded) + 1
+    if batch:
+        yield f"[{','.join(batch)}]".encode(), len(batch)
+
+class ActivationForwarder:
+    """
+    A worker's activations, sent to the writer every
+    ACTIVATION_FORWARD_INTERVAL. Like license_server.ActivationLog, record()
+    never waits; activations are dropped (and counted) when too many are
+    waiting or the writer can't take them.
+    """
+    def __init__(self):
+        self._pending = []
+        self._flush_task = None
+        self.dropped = 0
+
+    def record(self, key, customer_id=None):
+        if len(self._pending) >= license_server.ACTIVATION_QUEUE_SIZE:
+            self.dropped += 1
+            return
+        self._pending.append((key, customer_id, time.time()))
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(ACTIVATION_FORWARD_INTERVAL)
+        self._flush_task = None
+        await self.flush()
+
+    async def flush(self):
+        """Sends every waiting activation to the writer now."""
+        records, self._pending = self._pending, []
+        for body, count in _activation_bodies(records):
+            try:
+                status, _ = await forward_to_writer("POST", "/record_activations", body)
+                error = None if status == 200 else f"status {status}"
+            except (OSError, ValueError, IndexError) as e:
+                error = e
+            if error is not None:
+                self.dropped += count
+                print(f"Failed to forward {count} activations to the writer: {error}")
+
+async def worker_validate_key(ctx, method, params, body):
+    index, forwarder = ctx
+    if method != "GET":
+        return 405, {"status": "error", "message": "Use GET"}
+    key_to_check = params.get("key", [""])[0]
+    if not key_to_check:
+        return 400, {"status": "error", "message": "No key provided"}
+
+    if key_to_check in index:
+        forwarder.record(key_to_check, params.get("customer_id", [None])[0])
+        return 200, {"status": "valid", **license_server.issue_token(key_to_check)}
+    else:
+        return 404, {"status": "invalid"}
+
+async def worker_refresh_tokens(ctx, method, params, body):
+    index, forwarder = ctx
+    if method != "POST":
+        return 405, {"status": "error", "message": "Use POST"}
+    try:
+        tokens = json.loads(body or b"{}").get("tokens")
+    except (ValueError, AttributeError):
+        tokens = None
+    if not isinstance(tokens, list) or not all(isinstance(t, str) for t in tokens):
+        return 400, {"status": "error", "message": "Expected a JSON list of tokens"}
+    if len(tokens) > license_server.MAX_REFRESH_BATCH:
+        return 400, {"status": "error",
+                     "message": f"At most {license_server.MAX_REFRESH_BATCH} tokens per request"}
+    results = license_server.refresh_tokens(
+        tokens, exists=lambda keys: [key in index for key in keys], record=forwarder.record)
+    return 200, {"results": results}
+
+async def worker_generate_key(ctx, method, params, body):
+    if method != "POST":
+        return 405, {"status": "error", "message": "Use POST"}
+    return await forward_to_writer("POST", "/generate_key")
+
+WORKER_ROUTES = {
+    "/validate_key": worker_validate_key,
+    "/generate_key": worker_generate_key,
+    # Token checks need no index or database at all
+    "/verify_token": license_server_async.handle_verify_token,
+    "/refresh_tokens": worker_refresh_tokens,
+}
+
+async def run_worker(listen_sock):
+    ctx = (KeyIndex(INDEX_FILE), ActivationForwarder())
+
+    def on_connect(reader, writer):
+        return license_server_async.handle_connection(WORKER_ROUTES, ctx, reader, writer)
+
+    server = await asyncio.start_server(on_connect, sock=listen_sock,
+                                        limit=license_server_async.MAX_REQUEST_BYTES)
+    await license_server_async.serve_until_terminated(server)
+    # The writer keeps listening until every worker has exited
+    await ctx[1].flush()
+
+def worker_main(listen_sock):
+    # Ctrl-C reaches every process; the writer tells workers when to stop, so
+    # they can hand over their activations first
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    try:
+        asyncio.run(run_worker(listen_sock))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        # Skip the parent's atexit hooks; the writer owns the database files
+        os._exit(0)
+
+
+# --- Writer Process ---
+class IndexPublisher:
+    """
+    Gathers keys inserted within PUBLISH_DELAY of each other and publishes
+    them to the index in one merge, then wakes everyone who was waiting.
+    """
+    def __init__(self, db, path):
+        self.db = db
+        self.path = path
+        self._pending = []
+        self._waiters = []
+        self._flush_task = None
+
+    async def publish(self, key):
+        waiter = asyncio.get_running_loop().create_future()
+        self._pending.append(key)
+        self._waiters.append(waiter)
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_later())
+        await waiter
+
+    async def _flush_later(self):
+        await asyncio.sleep(PUBLISH_DELAY)
+        keys, waiters = self._pending, self._waiters
+        self._pending, self._waiters, self._flush_task = [], [], None
+        try:
+            await self.db.run(merge_into_index, self.path, keys)
+        except Exception as e:
+            for waiter in waiters:
+                waiter.set_exception(e)
+        else:
+            for waiter in waiters:
+                waiter.set_result(None)
+
+async def writer_generate_key(ctx, method, params, body):
+    db, publisher = ctx
+    if method != "POST":
+        return 405, {"status": "error", "message": "Use POST"}
+    new_key = str(uuid.uuid4())
+    await db.run(license_server.insert_key, new_key)
+    await publisher.publish(new_key)
+    print(f"Generated new key: {new_key}")
+    return 200, {"status": "success", "key": new_key}
+
+async def writer_record_activations(ctx, method, params, body):
+    if method != "POST":
+        return 405, {"status": "error", "message": "Use POST"}
+    try:
+        records = [(str(key), customer_id, float(seen))
+                   for key, customer_id, seen in json.loads(body or b"[]")]
+    except (ValueError, TypeError):
+        return 400, {"status": "error", "message": "Expected a JSON list of activations"}
+    for key, customer_id, seen in records:
+        license_server.activations.record(key, customer_id, seen)
+    return 200, {"status": "success", "recorded": len(records)}
+
+WRITER_ROUTES = {
+    "/generate_key": writer_generate_key,
+    "/record_activations": writer_record_activations,
+}
+
+def stop_workers(workers):
+    """Stops every worker and waits for it to exit."""
+    for pid in workers:
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+    for pid in workers:
+        os.waitpid(pid, 0)
+    workers.clear()
+
+async def run_writer(writer_sock, workers):
+    db = license_server_async.DatabaseThread()
+    publisher = IndexPublisher(db, INDEX_FILE)
+
+    def on_connect(reader, writer):
+        return license_server_async.handle_connection(WRITER_ROUTES, (db, publisher),
+                                                      reader, writer)
+
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
+    server = await asyncio.start_unix_server(on_connect, sock=writer_sock)
+    try:
+        async with server:
+            await stop.wait()
+            # Workers send their last activations on the way out
+            await loop.run_in_executor(None, stop_workers, workers)
+    finally:
+        db.stop()
+
+
+# --- Entry Point ---
+def main():
+    parser = argparse.ArgumentParser(description="Pre-fork license server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    license_server.init_db()
+    count = build_index(INDEX_FILE)
+    # No SQLite handles may be open across the fork
+    license_server.pool.close_all()
+    print(f"Published index of {count:,} keys to {INDEX_FILE}")
+
+    listen_sock = socket.create_server((args.host, args.port),
+                                       backlog=license_server_async.LISTEN_BACKLOG)
+    if os.path.exists(WRITER_SOCKET):
+        os.unlink(WRITER_SOCKET)
+    writer_sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    writer_sock.bind(WRITER_SOCKET)
+    writer_sock.listen(license_server_async.LISTEN_BACKLOG)
+
+    workers = []
+    for _ in range(args.workers):
+        pid = os.fork()
+        if pid == 0:
+            writer_sock.close()
+            worker_main(listen_sock)
+        workers.append(pid)
+    listen_sock.close()
+
+    print(f"License server running with {args.workers} workers on "
+          f"http://{args.host}:{args.port}")
+    try:
+        asyncio.run(run_writer(writer_sock, workers))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop_workers(workers)
+        if os.path.exists(WRITER_SOCKET):
+            os.unlink(WRITER_SOCKET)
+
+if __name__ == '__main__':
+    main()
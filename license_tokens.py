@@ -0,0 +1,117 @@
+"""
+Signed, expiring license tokens.
+
+When /validate_key accepts a key it also hands the game a token: the key and
+an expiry time, signed with HMAC-SHA256 under a secret only the server holds.
+On later launches the game sends the token to /verify_token, which checks the
+signature and expiry and never touches the license database; only refreshing
+a token looks the key up again. Revoking a key therefore takes effect when its
+tokens expire, so the token lifetime bounds how long a revoked key keeps
+working.
+
+Token layout (base64url, no padding):
+
+    payload "." mac
+    payload = version (1 byte), key kind (1 byte), expiry (uint32, unix
+              seconds), then the key: 16 raw bytes for a canonical UUID,
+              UTF-8 text for anything else
+    mac     = the first 16 bytes of HMAC-SHA256(secret, payload)
+
+A token is 53 characters for a UUID key. The secret is 32 random bytes
+in a key file, created on first use; every server process signing or
+checking tokens for the same games must share it.
+"""
+
+import base64
+import binascii
+import hashlib
+import hmac
+import os
+import struct
+import time
+import uuid
+
+TOKEN_VERSION = 1
+PAYLOAD_HEADER = struct.Struct("<BBI")   # version, key kind, expiry
+KEY_UUID = 0
+KEY_TEXT = 1
+MAC_SIZE = 16
+SECRET_SIZE = 32
+
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+def load_secret(path):
+    """
+    Reads the signing secret from path, creating it (readable only by its
+    owner) if it doesn't exist yet.
+    """
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        pass
+    else:
+        with os.fdopen(fd, "wb") as f:
+            f.write(os.urandom(SECRET_SIZE))
+    with open(path, "rb") as f:
+        secret = f.read()
+    if len(secret) < SECRET_SIZE:
+        raise ValueError(f"{path} is not a token key file (expected {SECRET_SIZE} bytes)")
+    return secret
+
+
+class TokenSigner:
+    """Issues and checks license tokens with one secret."""
+    def __init__(self, secret):
+        self._secret = secret
+
+    @classmethod
+    def from_key_file(cls, path):
+        return cls(load_secret(path))
+
+    def _mac(self, payload):
+        return hmac.new(self._secret, payload, hashlib.sha256).digest()[:MAC_SIZE]
+
+    def issue(self, key, ttl, now=None):
+        """A token for key that expires ttl seconds from now. Returns (token, expires)."""
+        expires = int((time.time() if now is None else now) + ttl)
+        try:
+            parsed = uuid.UUID(key)
+        except ValueError:
+            parsed = None
+        if parsed is not None and str(parsed) == key:
+            kind, key_bytes = KEY_UUID, parsed.bytes
+        else:
+            kind, key_bytes = KEY_TEXT, key.encode()
+        payload = PAYLOAD_HEADER.pack(TOKEN_VERSION, kind, expires) + key_bytes
+        return f"{_b64encode(payload)}.{_b64encode(self._mac(payload))}", expires
+
+    def read(self, token):
+        """
+        The (key, expires) a token was issued for, or None if it is malformed
+        or its signature doesn't match. Expiry is left to the caller.
+        """
+        payload_text, _, mac_text = token.partition(".")
+        try:
+            payload = _b64decode(payload_text)
+            mac = _b64decode(mac_text)
+        except (binascii.Error, ValueError):
+            return None
+        if len(payload) < PAYLOAD_HEADER.size or not hmac.compare_digest(mac, self._mac(payload)):
+            return None
+        version, kind, expires = PAYLOAD_HEADER.unpack_from(payload)
+        key_bytes = payload[PAYLOAD_HEADER.size:]
+        if version != TOKEN_VERSION:
+            return None
+        if kind == KEY_UUID and len(key_bytes) == 16:
+            return str(uuid.UUID(bytes=key_bytes)), expires
+        if kind == KEY_TEXT:
+            try:
+                return key_bytes.decode(), expires
+            except UnicodeDecodeError:
+                return None
+        return None
@@ -0,0 +1,180 @@
+"""
+Benchmarks for LongestCode.py.
+
+Runs each generator across a sweep of LENGTH_FACTOR values and records, per
+run, the wall time, bytes written, Python heap peak (tracemalloc), peak
+resident set size and read/write system call counts, then saves everything as
+JSON so runs can be compared over time.
+
+Every measurement happens in a freshly spawned process, so peak RSS and the
+/proc/self/io counters belong to that one generator run alone.
+
+Usage:
+    python longest_code_bench.py --factors 10,100,1000,10000 --output bench.json
+    python longest_code_bench.py --targets java --baseline bench.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import LongestCode
+
+
+# --- Measurement (runs in the child process) ---
+def read_proc_io():
+    """The kernel's I/O counters for this process, or {} off Linux."""
+    try:
+        with open("/proc/self/io") as f:
+            return {name: int(value) for name, value in
+                    (line.split(":") for line in f if ":" in line)}
+    except OSError:
+        return {}
+
+def generate(target, factor, path):
+    LongestCode.write_shard(target, factor, path, 0,
+                            LongestCode.TARGETS[target].steps(), True, True)
+
+def measure(target, factor, workdir, repeat, trace):
+    """Generates one target `repeat` times and returns its numbers."""
+    LongestCode.LENGTH_FACTOR = factor
+    path = os.path.join(workdir, LongestCode.TARGETS[target].filename)
+
+    best = None
+    io_before = read_proc_io()
+    for _ in range(repeat):
+        start = time.perf_counter()
+        generate(target, factor, path)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    io_after = read_proc_io()
+    size = os.path.getsize(path)
+    max_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # tracemalloc slows allocation down a lot, so it gets a run of its own
+    # that isn't timed
+    heap_peak = None
+    if trace:
+        tracemalloc.start()
+        generate(target, factor, path)
+        heap_peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    os.remove(path)
+
+    def per_run(name):
+        if name not in io_after:
+            return None
+        return (io_after[name] - io_before[name]) // repeat
+
+    return {
+        "target": target,
+        "length_factor": factor,
+        "wall_seconds": best,
+        "bytes_written": size,
+        "mb_per_second": size / 1e6 / best if best else None,
+        "tracemalloc_peak_bytes": heap_peak,
+        "max_rss_kb": max_rss_kb,
+        "read_syscalls": per_run("syscr"),
+        "write_syscalls": per_run("syscw"),
+    }
+
+
+# --- Sweep ---
+def run_sweep(targets, factors, repeat, trace):
+    results = []
+    spawn = get_context("spawn")
+    with tempfile.TemporaryDirectory() as workdir:
+        for target in targets:
+            for factor in factors:
+                # A new process per run keeps RSS and I/O counters separate
+                with ProcessPoolExecutor(max_workers=1, mp_context=spawn) as executor:
+                    result = executor.submit(measure, target, factor, workdir,
+                                             repeat, trace).result()
+                results.append(result)
+                report(result)
+    return results
+
+def report(result):
+    heap = result["tracemalloc_peak_bytes"]
+    heap = f"{heap / 1e6:8.1f} MB heap" if heap is not None else " " * 16
+    syscalls = result["write_syscalls"]
+    syscalls = f"{syscalls:>8,} writes" if syscalls is not None else ""
+    print(f"{result['target']:<11} N={result['length_factor']:<8,} "
+          f"{result['wall_seconds']:8.3f}s {result['bytes_written'] / 1e6:10.1f} MB "
+          f"{result['mb_per_second'] or 0:8.1f} MB/s {heap} "
+          f"{result['max_rss_kb'] / 1024:8.1f} MB RSS {syscalls}")
+
+def compare(results, baseline_file, tolerance):
+    """
+    Prints every run that got slower than the baseline by more than
+    `tolerance` (a fraction) and returns how many there were.
+    """
+    with open(baseline_file) as f:
+        baseline = {(r["target"], r["length_factor"]): r for r in json.load(f)["results"]}
+    regressions = 0
+    for result in results:
+        old = baseline.get((result["target"], result["length_factor"]))
+        if old is None:
+            continue
+        change = result["wall_seconds"] / old["wall_seconds"] - 1
+        if change > tolerance:
+            regressions += 1
+            print(f"REGRESSION {result['target']} N={result['length_factor']:,}: "
+                  f"{old['wall_seconds']:.3f}s -> {result['wall_seconds']:.3f}s "
+                  f"({change:+.0%})")
+        if result["bytes_written"] != old["bytes_written"]:
+            regressions += 1
+            print(f"OUTPUT CHANGED {result['target']} N={result['length_factor']:,}: "
+                  f"{old['bytes_written']:,} -> {result['bytes_written']:,} bytes")
+    return regressions
+
+
+# --- Main ---
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--targets", default=",".join(LongestCode.TARGETS),
+                        help="comma-separated generators to benchmark")
+    parser.add_argument("--factors", default="10,100,1000,10000",
+                        help="comma-separated LENGTH_FACTOR values to sweep")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="timed runs per point; the fastest is kept")
+    parser.add_argument("--no-tracemalloc", action="store_true",
+                        help="skip the extra run that measures the Python heap peak")
+    parser.add_argument("--output", default="longest_code_bench.json")
+    parser.add_argument("--baseline", help="earlier results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="slowdown against the baseline that counts as a regression")
+    args = parser.parse_args()
+
+    targets = [t.strip() for t in args.targets.split(",") if t.strip()]
+    unknown = [t for t in targets if t not in LongestCode.TARGETS]
+    if unknown:
+        parser.error(f"unknown target(s): {', '.join(unknown)}")
+    factors = [int(n) for n in args.factors.split(",")]
+
+    results = run_sweep(targets, factors, args.repeat, not args.no_tracemalloc)
+    with open(args.output, "w") as f:
+        json.dump({
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "write_strategy": LongestCode.WRITE_STRATEGY,
+            "chunk_size": LongestCode.CHUNK_SIZE,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "results": results,
+        }, f, indent=2)
+    print(f"\nWrote {len(results)} results to {args.output}")
+
+    if args.baseline and compare(results, args.baseline, args.tolerance):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
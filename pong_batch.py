@@ -0,0 +1,192 @@
+"""
+Runs thousands of Pong matches at once with NumPy.
+
+BatchPong keeps the ball and paddle state of N independent matches in arrays
+and applies the rules of pong_core.PongState (the same walls, paddles,
+scoring and opponent AI) to all of them in one vectorized step. It is meant
+for training and evaluating paddle AIs against opponent_ai: set player_speed
+for every match, call step(), read the arrays back.
+
+Serve directions come from a seedable numpy Generator, drawn in the same
+order as ball_restart() draws them (vertical, then horizontal). With one
+match, BatchPong and a PongState given NumpyChoice(the same seed) play
+identical games; run this file with --check to confirm it.
+
+Usage:
+    python pong_batch.py --games 10000 --frames 1000
+    python pong_batch.py --check --frames 100000
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+import pong_core
+
+
+class NumpyChoice:
+    """
+    Lets a PongState draw its serves from a numpy Generator, the same way
+    BatchPong does, in place of the random module.
+    """
+    def __init__(self, generator):
+        self.generator = generator
+
+    def choice(self, options):
+        return options[int(self.generator.integers(2))]
+
+def random_signs(rng, count):
+    """count draws of choice((1, -1)), as an array."""
+    return np.where(rng.integers(2, size=count) == 0, 1, -1)
+
+
+class BatchPong:
+    """N matches of Pong advanced together, one frame per step()."""
+    BALL_SIZE = 30
+    PADDLE_WIDTH = 10
+    PADDLE_HEIGHT = 140
+
+    def __init__(self, games, width=800, height=600, seed=None, opponent_speed=7):
+        self.games = games
+        self.width = width
+        self.height = height
+        self.rng = np.random.default_rng(seed)
+        self.opponent_speed = opponent_speed
+
+        # Same starting layout as PongState, truncated to ints like pygame.Rect
+        self.ball_start_x = int(width / 2 - 15)
+        self.ball_start_y = int(height / 2 - 15)
+        self.player_x = int(width - 20)
+        self.opponent_x = 10
+        paddle_start_y = int(height / 2 - 70)
+
+        self.ball_x = np.full(games, self.ball_start_x, dtype=np.int64)
+        self.ball_y = np.full(games, self.ball_start_y, dtype=np.int64)
+        self.ball_speed_x = 7 * random_signs(self.rng, games)
+        self.ball_speed_y = 7 * random_signs(self.rng, games)
+        self.player_y = np.full(games, paddle_start_y, dtype=np.int64)
+        self.opponent_y = np.full(games, paddle_start_y, dtype=np.int64)
+        # Fill in one value per match to move the player paddles
+        self.player_speed = np.zeros(games, dtype=np.int64)
+        self.player_score = np.zeros(games, dtype=np.int64)
+        self.opponent_score = np.zeros(games, dtype=np.int64)
+        self.frame = 0
+
+    def _ball_restart(self, mask):
+        """ball_restart() for every match where mask is set."""
+        count = int(np.count_nonzero(mask))
+        if not count:
+            return
+        # Center: pygame places the ball at center - size // 2
+        self.ball_x[mask] = int(self.width / 2) - self.BALL_SIZE // 2
+        self.ball_y[mask] = int(self.height / 2) - self.BALL_SIZE // 2
+        self.ball_speed_y[mask] *= random_signs(self.rng, count)
+        self.ball_speed_x[mask] *= random_signs(self.rng, count)
+
+    def _hits_paddle(self, paddle_x, paddle_y):
+        """Rect.colliderect between each ball and its paddle."""
+        return ((self.ball_x < paddle_x + self.PADDLE_WIDTH)
+                & (paddle_x < self.ball_x + self.BALL_SIZE)
+                & (self.ball_y < paddle_y + self.PADDLE_HEIGHT)
+                & (paddle_y < self.ball_y + self.BALL_SIZE))
+
+    def ball_animation(self):
+        # Move the ball
+        self.ball_x += self.ball_speed_x
+        self.ball_y += self.ball_speed_y
+
+        # Top and bottom walls
+        wall = (self.ball_y <= 0) | (self.ball_y + self.BALL_SIZE >= self.height)
+        self.ball_speed_y[wall] *= -1
+
+        # Left and right walls (scoring). The right wall is checked after the
+        # left-wall restarts, just as in PongState.
+        left = self.ball_x <= 0
+        self.player_score += left
+        self._ball_restart(left)
+        right = self.ball_x + self.BALL_SIZE >= self.width
+        self.opponent_score += right
+        self._ball_restart(right)
+
+        # Paddles
+        hit = (self._hits_paddle(self.player_x, self.player_y)
+               | self._hits_paddle(self.opponent_x, self.opponent_y))
+        self.ball_speed_x[hit] *= -1
+
+    def player_animation(self):
+        self.player_y += self.player_speed
+        np.clip(self.player_y, 0, self.height - self.PADDLE_HEIGHT, out=self.player_y)
+
+    def opponent_ai(self):
+        speed = self.opponent_speed
+        self.opponent_y += speed * (self.opponent_y < self.ball_y)
+        self.opponent_y -= speed * (self.opponent_y + self.PADDLE_HEIGHT > self.ball_y)
+        np.clip(self.opponent_y, 0, self.height - self.PADDLE_HEIGHT, out=self.opponent_y)
+
+    def step(self):
+        """Advances every match by one frame."""
+        self.ball_animation()
+        self.player_animation()
+        self.opponent_ai()
+        self.frame += 1
+
+    def run(self, frames):
+        for _ in range(frames):
+            self.step()
+
+    def snapshot(self, game):
+        """The same tuple PongState.snapshot() gives, for one match."""
+        ball = self.BALL_SIZE
+        return ((int(self.ball_x[game]), int(self.ball_y[game]), ball, ball),
+                (self.player_x, int(self.player_y[game]), self.PADDLE_WIDTH, self.PADDLE_HEIGHT),
+                (self.opponent_x, int(self.opponent_y[game]), self.PADDLE_WIDTH,
+                 self.PADDLE_HEIGHT),
+                int(self.ball_speed_x[game]), int(self.ball_speed_y[game]),
+                int(self.player_speed[game]),
+                int(self.player_score[game]), int(self.opponent_score[game]))
+
+
+# --- Checks and Benchmark ---
+def check(frames, seed):
+    """
+    Plays one match in BatchPong and in PongState from the same seed, with the
+    player paddle sweeping up and down, and compares them every frame.
+    """
+    batch = BatchPong(1, seed=seed)
+    single = pong_core.PongState(rng=NumpyChoice(np.random.default_rng(seed)))
+    for frame in range(frames):
+        speed = 7 if (frame // 90) % 2 == 0 else -7
+        batch.player_speed[:] = speed
+        single.player_speed = speed
+        batch.step()
+        single.step()
+        if batch.snapshot(0) != single.snapshot():
+            print(f"Mismatch at frame {frame + 1}:\n  batch:  {batch.snapshot(0)}\n"
+                  f"  single: {single.snapshot()}")
+            return False
+    print(f"Identical for {frames:,} frames (score {single.opponent_score}-{single.player_score})")
+    return True
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--games", type=int, default=10_000)
+    parser.add_argument("--frames", type=int, default=1_000)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--check", action="store_true",
+                        help="compare one batched match with PongState instead of benchmarking")
+    args = parser.parse_args()
+
+    if args.check:
+        raise SystemExit(0 if check(args.frames, args.seed) else 1)
+
+    batch = BatchPong(args.games, seed=args.seed)
+    start = time.perf_counter()
+    batch.run(args.frames)
+    elapsed = time.perf_counter() - start
+    steps = args.games * args.frames
+    print(f"{args.games:,} games x {args.frames:,} frames in {elapsed:.2f}s: "
+          f"{steps / elapsed:,.0f} game-frames/s")
+
+if __name__ == "__main__":
+    main()
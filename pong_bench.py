@@ -0,0 +1,77 @@
+"""
+Benchmarks for Pong.py.
+
+Measures how many frames per second the game logic runs at on its own
+(pong_core.PongState, no pygame) and with Pong.py's drawing added, both as a
+full redraw and with dirty rects, rendered off-screen with SDL's dummy video
+driver and no frame cap.
+
+Usage:
+    python pong_bench.py --frames 1000000
+    python pong_bench.py --frames 200000 --rendered-frames 5000
+"""
+
+import argparse
+import os
+import time
+
+import pong_core
+
+
+def bench_headless(frames, seed):
+    # Load (and, with Numba, compile) run()'s loop before the clock starts
+    pong_core.PongState(seed=seed).run(1000)
+    game = pong_core.PongState(seed=seed)
+    start = time.perf_counter()
+    game.run(frames)
+    elapsed = time.perf_counter() - start
+    return frames / elapsed, game
+
+def bench_rendered(frames, seed, dirty):
+    """
+    Steps and draws `frames` frames through Pong.py itself, redrawing either
+    the whole screen or only dirty rects. Needs pygame.
+    """
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    try:
+        import pygame
+        import Pong
+    except ImportError as e:
+        print(f"Skipping the rendered benchmark: {e}")
+        return None
+    Pong.game = pong_core.PongState(Pong.screen_width, Pong.screen_height, seed=seed)
+    Pong.previous_rects = []
+    start = time.perf_counter()
+    for _ in range(frames):
+        Pong.game.step()
+        if dirty:
+            pygame.display.update(Pong.draw_dirty())
+        else:
+            Pong.draw()
+            pygame.display.flip()
+    elapsed = time.perf_counter() - start
+    return frames / elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--frames", type=int, default=1_000_000,
+                        help="frames to simulate headless")
+    parser.add_argument("--rendered-frames", type=int, default=2_000,
+                        help="frames to simulate and draw")
+    parser.add_argument("--seed", type=int, default=1234)
+    args = parser.parse_args()
+
+    headless, game = bench_headless(args.frames, args.seed)
+    print(f"Headless:    {headless:>10,.0f} frames/s "
+          f"({args.frames:,} frames, final score {game.opponent_score}-{game.player_score})")
+    full = bench_rendered(args.rendered_frames, args.seed, dirty=False)
+    if full is None:
+        return
+    dirty = bench_rendered(args.rendered_frames, args.seed, dirty=True)
+    print(f"Full redraw: {full:>10,.0f} frames/s ({1000 / full:.3f} ms/frame)")
+    print(f"Dirty rects: {dirty:>10,.0f} frames/s ({1000 / dirty:.3f} ms/frame, "
+          f"saves {1000 / full - 1000 / dirty:.3f} ms/frame)")
+    print(f"Headless is {headless / dirty:,.0f}x faster than dirty-rect rendering")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+"""
+The game logic of Pong.py without pygame.
+
+PongState holds everything one match needs and advances it one frame per
+step(), with exactly the rules Pong.py has always used. Nothing here touches a
+display, so matches can be simulated as fast as the CPU allows, for tuning
+paddle AIs or checking that a rules change didn't alter a recorded game.
+
+Rect copies the parts of pygame.Rect the game relies on, including its integer
+coordinates: positions are truncated to ints when set, exactly as pygame does.
+"""
+
+import random
+
+
+# --- Rect ---
+class Rect:
+    """An integer rectangle with pygame.Rect's edge and collision semantics."""
+    __slots__ = ("x", "y", "w", "h")
+
+    def __init__(self, x, y, w, h):
+        self.x = int(x)
+        self.y = int(y)
+        self.w = int(w)
+        self.h = int(h)
+
+    @property
+    def top(self):
+        return self.y
+
+    @top.setter
+    def top(self, value):
+        self.y = int(value)
+
+    @property
+    def bottom(self):
+        return self.y + self.h
+
+    @bottom.setter
+    def bottom(self, value):
+        self.y = int(value) - self.h
+
+    @property
+    def left(self):
+        return self.x
+
+    @left.setter
+    def left(self, value):
+        self.x = int(value)
+
+    @property
+    def right(self):
+        return self.x + self.w
+
+    @right.setter
+    def right(self, value):
+        self.x = int(value) - self.w
+
+    @property
+    def center(self):
+        return (self.x + self.w // 2, self.y + self.h // 2)
+
+    @center.setter
+    def center(self, value):
+        self.x = int(value[0]) - self.w // 2
+        self.y = int(value[1]) - self.h // 2
+
+    def colliderect(self, other):
+        # Same test as pygame: overlapping interiors, and empty rects never collide
+        return (self.w > 0 and self.h > 0 and other.w > 0 and other.h > 0
+                and self.x < other.x + other.w and other.x < self.x + self.w
+                and self.y < other.y + other.h and other.y < self.y + self.h)
+
+    # pygame.draw and friends accept any sequence of four numbers as a rect
+    def __len__(self):
+        return 4
+
+    def __getitem__(self, index):
+        return (self.x, self.y, self.w, self.h)[index]
+
+    def __iter__(self):
+        return iter((self.x, self.y, self.w, self.h))
+
+    def __eq__(self, other):
+        return tuple(self) == tuple(other)
+
+    def __repr__(self):
+        return f"<Rect({self.x}, {self.y}, {self.w}, {self.h})>"
+
+
+# --- Game State ---
+class PongState:
+    """
+    One match of Pong. step() advances it by one frame (1/60 s in Pong.py).
+
+    rng supplies the random serve directions. It defaults to the random
+    module itself, as the original script used; pass seed (or your own
+    random.Random) to get a reproducible match.
+    """
+    def __init__(self, width=800, height=600, seed=None, rng=None):
+        if rng is None:
+            rng = random.Random(seed) if seed is not None else random
+        self.rng = rng
+        self.width = width
+        self.height = height
+
+        # The ball
+        self.ball = Rect(width / 2 - 15, height / 2 - 15, 30, 30)
+
+        # The paddles
+        self.player = Rect(width - 20, height / 2 - 70, 10, 140)
+        self.opponent = Rect(10, height / 2 - 70, 10, 140)
+
+        self.ball_speed_x = 7 * rng.choice((1, -1))
+        self.ball_speed_y = 7 * rng.choice((1, -1))
+        self.player_speed = 0
+        self.opponent_speed = 7
+
+        self.player_score = 0
+        self.opponent_score = 0
+        self.frame = 0
+
+    def ball_animation(self):
+        """
+        Handles the movement and collision of the ball.
+        """
+        self.move_ball()
+        self.ball_collisions()
+
+    def move_ball(self):
+        self.ball.x += self.ball_speed_x
+        self.ball.y += self.ball_speed_y
+
+    def ball_collisions(self):
+        """Bounces the ball off the walls and paddles, and scores when it gets past one."""
+        ball = self.ball
+
+        # --- Ball Collision Detection ---
+        # Top and bottom walls
+        if ball.y <= 0 or ball.y + ball.h >= self.height:
+            self.ball_speed_y *= -1
+
+        # Left and right walls (scoring)
+        if ball.x <= 0:
+            self.player_score += 1
+            self.ball_restart()
+
+        if ball.x + ball.w >= self.width:
+            self.opponent_score += 1
+            self.ball_restart()
+
+        # Paddles
+        if ball.colliderect(self.player) or ball.colliderect(self.opponent):
+            self.ball_speed_x *= -1
+
+    def player_animation(self):
+        """
+        Updates the player's paddle position and keeps it on screen.
+        """
+        player = self.player
+        player.y += self.player_speed
+        if player.y <= 0:
+            player.y = 0
+        if player.y + player.h >= self.height:
+            player.y = self.height - player.h
+
+    def opponent_ai(self):
+        """
+        A simple AI for the opponent's paddle. It tries to follow the ball.
+        """
+        opponent = self.opponent
+        ball_y = self.ball.y
+        if opponent.y < ball_y:
+            opponent.y += self.opponent_speed
+        if opponent.y + opponent.h > ball_y:
+            opponent.y -= self.opponent_speed
+
+        # Keep the opponent on screen
+        if opponent.y <= 0:
+            opponent.y = 0
+        if opponent.y + opponent.h >= self.height:
+            opponent.y = self.height - opponent.h
+
+    def ball_restart(self):
+        """
+        Resets the ball to the center after a score and gives it a random direction.
+        """
+        self.ball.center = (self.width / 2, self.height / 2)
+        self.ball_speed_y *= self.rng.choice((1, -1))
+        self.ball_speed_x *= self.rng.choice((1, -1))
+
+    def step(self):
+        """Advances the match by one frame."""
+        self.ball_animation()
+        self.player_animation()
+        self.opponent_ai()
+        self.frame += 1
+
+    def profiled_step(self, profiler):
+        """
+        step(), with the ball's collision checks charged to the profiler's
+        "collision" section and everything else to "update".
+        """
+        self.move_ball()
+        profiler.lap("update")
+        self.ball_collisions()
+        profiler.lap("collision")
+        self.player_animation()
+        self.opponent_ai()
+        self.frame += 1
+        profiler.lap("update")
+
+    def run(self, frames):
+        """
+        Advances the match by `frames` frames, in compiled code when accel
+        has Numba to compile it with.
+        """
+        # Imported here so the game itself doesn't pay for loading Numba
+        import accel
+        if accel.ENABLED and type(self).step is PongState.step:
+            accel.run_pong(self, frames)
+            return
+        step = self.step
+        for _ in range(frames):
+            step()
+
+    def snapshot(self):
+        """Everything that determines the rest of the match except the RNG, as a tuple."""
+        return (tuple(self.ball), tuple(self.player), tuple(self.opponent),
+                self.ball_speed_x, self.ball_speed_y, self.player_speed,
+                self.player_score, self.opponent_score)
@@ -0,0 +1,190 @@
+"""
+Input recording, headless replay and per-frame profiling for Pong.py and
+FlappyBird.py.
+
+While recording, a game writes the seed its random numbers come from and,
+every frame, the inputs that frame used, packed with struct into a
+zlib-compressed stream (a few bytes a frame before compression, next to
+nothing after, since most frames repeat the one before). Replaying feeds
+those inputs back to the same game code, so the session plays out exactly
+as it did live.
+
+Replays run off-screen through SDL's dummy video driver, with no frame cap,
+and time every frame's subsystems separately (update, collision, draw,
+flip), so slow frames can be found and looked at offline.
+
+    python Pong.py --record pong.rpl
+    python FlappyBird.py --record flappy.rpl --seed 42
+    python replay.py pong.rpl --hot 10
+
+Log layout: "RPLY", a version, the length of a JSON metadata block, the
+metadata (game, seed, frame struct format and anything game specific), then
+the compressed frames.
+"""
+
+import argparse
+import importlib
+import json
+import os
+import struct
+import time
+import zlib
+
+LOG_MAGIC = b"RPLY"
+LOG_VERSION = 1
+LOG_HEADER = struct.Struct("<4sHI")   # magic, version, metadata length
+# Compressed frames are flushed to disk this often, so a crash loses at most
+# this many frames of the log
+FLUSH_FRAMES = 600
+
+# Game name in the log -> module that plays it
+GAMES = {
+    "pong": "Pong",
+    "flappy": "FlappyBird",
+}
+
+def new_seed():
+    return int.from_bytes(os.urandom(4), "little")
+
+
+# --- Recording ---
+class Recorder:
+    """Writes one frame of inputs per record() call to a replay log."""
+    def __init__(self, path, game, seed, frame_format, **metadata):
+        self.frame = struct.Struct(frame_format)
+        self.frames = 0
+        self._file = open(path, "wb")
+        meta = json.dumps(dict(metadata, game=game, seed=seed,
+                               frame_format=frame_format)).encode()
+        self._file.write(LOG_HEADER.pack(LOG_MAGIC, LOG_VERSION, len(meta)))
+        self._file.write(meta)
+        self._compressor = zlib.compressobj(9)
+        self._pending = bytearray()
+
+    def record(self, *fields):
+        self._pending += self.frame.pack(*fields)
+        self.frames += 1
+        if self.frames % FLUSH_FRAMES == 0:
+            self.flush()
+
+    def flush(self):
+        self._file.write(self._compressor.compress(bytes(self._pending)))
+        # A sync flush makes everything so far decompressible on its own
+        self._file.write(self._compressor.flush(zlib.Z_SYNC_FLUSH))
+        self._file.flush()
+        self._pending.clear()
+
+    def close(self):
+        self._file.write(self._compressor.compress(bytes(self._pending)))
+        self._file.write(self._compressor.flush())
+        self._file.close()
+        self._pending.clear()
+
+
+# --- Replaying ---
+class ReplayLog:
+    """A recorded session: its metadata and its frames."""
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            magic, version, meta_length = LOG_HEADER.unpack(f.read(LOG_HEADER.size))
+            if magic != LOG_MAGIC or version != LOG_VERSION:
+                raise ValueError(f"{path} is not a replay log")
+            self.metadata = json.loads(f.read(meta_length))
+            compressed = f.read()
+        self.game = self.metadata["game"]
+        self.seed = self.metadata["seed"]
+        self.frame = struct.Struct(self.metadata["frame_format"])
+        # decompressobj copes with a log cut short by a crash
+        data = zlib.decompressobj().decompress(compressed)
+        self._data = data[:len(data) - len(data) % self.frame.size]
+
+    def __len__(self):
+        return len(self._data) // self.frame.size
+
+    def frames(self):
+        """Each frame's recorded fields, as tuples."""
+        return self.frame.iter_unpack(self._data)
+
+
+# --- Profiling ---
+class FrameProfiler:
+    """
+    Splits every frame's time between named sections. Call start_frame(),
+    then lap(section) after each piece of work to charge the time since the
+    previous lap to that section, then end_frame().
+    """
+    def __init__(self, sections):
+        self.sections = list(sections)
+        self._index = {name: i for i, name in enumerate(self.sections)}
+        self.frames = []
+        self._current = None
+        self._last = 0.0
+
+    def start_frame(self):
+        self._current = [0.0] * len(self.sections)
+        self._last = time.perf_counter()
+
+    def lap(self, section):
+        now = time.perf_counter()
+        self._current[self._index[section]] += now - self._last
+        self._last = now
+
+    def end_frame(self):
+        self.frames.append(self._current)
+
+    def report(self, hot=10):
+        if not self.frames:
+            print("No frames recorded.")
+            return
+        totals = [sum(frame) for frame in self.frames]
+        total = sum(totals)
+        print(f"{len(self.frames):,} frames in {total:.2f}s "
+              f"({len(self.frames) / total:,.0f} frames/s, "
+              f"{total / len(self.frames) * 1000:.3f} ms/frame)\n")
+        print(f"{'section':<12}{'mean ms':>10}{'p99 ms':>10}{'max ms':>10}{'share':>8}")
+        for i, name in enumerate(self.sections):
+            times = sorted(frame[i] for frame in self.frames)
+            share = sum(times) / total if total else 0.0
+            p99 = times[min(len(times) - 1, int(0.99 * len(times)))]
+            print(f"{name:<12}{sum(times) / len(times) * 1000:10.3f}{p99 * 1000:10.3f}"
+                  f"{times[-1] * 1000:10.3f}{share:8.1%}")
+
+        if hot:
+            print(f"\nSlowest {hot} frames:")
+            slowest = sorted(range(len(totals)), key=totals.__getitem__, reverse=True)[:hot]
+            for number in slowest:
+                parts = ", ".join(f"{name} {t * 1000:.3f}"
+                                  for name, t in zip(self.sections, self.frames[number]))
+                print(f"  frame {number:>7,}: {totals[number] * 1000:8.3f} ms ({parts})")
+
+class NullProfiler:
+    """Stands in for a FrameProfiler when nobody is profiling."""
+    def start_frame(self):
+        pass
+
+    def lap(self, section):
+        pass
+
+    def end_frame(self):
+        pass
+
+
+# --- Main ---
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded game session headlessly")
+    parser.add_argument("log", help="replay log written with --record")
+    parser.add_argument("--hot", type=int, default=10, help="slowest frames to list")
+    args = parser.parse_args()
+
+    log = ReplayLog(args.log)
+    # Draw off-screen; this has to be set before the game module starts pygame
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    game = importlib.import_module(GAMES[log.game])
+    print(f"Replaying {len(log):,} frames of {log.game} (seed {log.seed})")
+    profiler = game.replay_session(log)
+    print()
+    profiler.report(args.hot)
+
+if __name__ == "__main__":
+    main()
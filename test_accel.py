@@ -0,0 +1,33 @@
+"""
+Parity tests for accel.py: the compiled loops must give exactly the same
+trajectories as the Python paths they stand in for, from the same seeds.
+They are skipped when Numba isn't installed or NO_JIT=1 is set, since then
+there is only the Python path.
+
+    python -m pytest test_accel.py
+    python -m unittest test_accel
+"""
+
+import unittest
+
+import accel
+
+SEEDS = (1, 1234, 2024)
+
+
+@unittest.skipUnless(accel.ENABLED, "needs Numba, with NO_JIT unset")
+class CompiledParityTest(unittest.TestCase):
+    def test_pong_matches_python(self):
+        for seed in SEEDS:
+            with self.subTest(seed=seed):
+                self.assertTrue(accel.check_pong(30_000, seed))
+
+    def test_flappy_matches_python(self):
+        for seed in SEEDS:
+            with self.subTest(seed=seed):
+                self.assertTrue(accel.check_flappy(500, 2_000, seed))
+        self.assertTrue(accel.ENABLED)
+
+
+if __name__ == "__main__":
+    unittest.main()